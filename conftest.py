@@ -1,10 +1,12 @@
 import datetime
+from pathlib import Path
+import pickle
 
 import pytest
 from schema import Or, Optional, Regex, Schema
 
 from schemas import atlas_matrix, atlas_obj, website_submission
-from tools.create_matrix import load_atlas_data
+from tools.create_matrix import BuildCache, load_atlas_data, sha256_digest, write_atomic_bytes
 
 """
 Defines global pytest fixtures for ATLAS data and schemas.
@@ -66,6 +68,13 @@ def text_to_be_spellchecked(request):
     """
     return request.param
 
+@pytest.fixture(scope='session')
+def spellcheck_corpus(request):
+    """Represents all text fields that can be spellchecked, as (text identifier, text) tuples,
+    for tests that process every text at once.
+    """
+    return load_test_data(request.config)['text_to_be_spellchecked']
+
 @pytest.fixture(scope='session')
 def all_data_objects(request):
     """Represents IDs in data objects, such as tactics, techniques, and case studies. """
@@ -78,7 +87,7 @@ def procedure_steps(request):
 
 @pytest.fixture(scope='session')
 def technique_id_to_tactic_ids(request):
-    """Represents a dictionary of technique ID to a list of tactic IDs."""
+    """Represents a dictionary of technique ID to a list of tactic IDs, those of the parent technique for subtechniques."""
     return request.param
 
 #endregion
@@ -96,41 +105,58 @@ def add_label_entries(collection, obj, keys):
             entry = (label, value)
             collection.append(entry)
 
-def pytest_generate_tests(metafunc):
-    """Enables test functions that use the above fixtures to operate on a
-    single dictionary, where each test function is automatically run once
-    for each dictionary in the tactics/techniques/case studies lists.
-
-    Loads in the ATLAS data and sets up the pytest scheme to yield one
-    dictionary for each above fixture, as well as other test fixtures.
+# Path to the ATLAS data entry point, relative to the project root
+DATA_FILEPATH = 'data/data.yaml'
 
-    https://docs.pytest.org/en/stable/parametrize.html#basic-pytest-generate-tests-example
-    """
-    # Only load ATLAS data if any of the data-driven fixtures are requested by the test
-    data_driven_fixtures = {
-        'output_data', 'matrix', 'tactics', 'techniques', 'case_studies', 'mitigations',
-        'text_with_possible_markdown_syntax', 'text_to_be_spellchecked', 'all_data_objects',
-        'procedure_steps', 'technique_id_to_tactic_ids'
-    }
-    if not any(name in metafunc.fixturenames for name in data_driven_fixtures):
-        return
+def pytest_addoption(parser):
+    parser.addoption('--atlas-data', default=DATA_FILEPATH,
+        help='Path to the data.yaml to run the data-driven tests against, i.e. a generated benchmark corpus')
 
-    # Read the YAML files in this repository and create the nested dictionary
-    path_to_data_file = 'data/data.yaml'
-    data = load_atlas_data(path_to_data_file)
+# ATLAS data and derived parametrization lists, loaded once per test session, see load_test_data
+_test_data = None
 
-    # Parametrize when called for via test signature
-    if 'output_data' in metafunc.fixturenames:
-        # Only one arg, wrap in list
-        metafunc.parametrize('output_data', [data], indirect=True, scope='session')
-    if 'matrix' in metafunc.fixturenames:
-        metafunc.parametrize('matrix', data['matrices'], indirect=True, scope='session')
+def load_test_data(config):
+    """Returns the ATLAS data and the parametrization lists derived from it.
 
+    These are computed at most once per process and shared across test modules.
+    A snapshot is also kept in the pytest cache directory, keyed by the hashes of the
+    data source files, so that other sessions and pytest-xdist workers can reuse it
+    instead of re-loading the data.
+    """
+    global _test_data
+    if _test_data is not None:
+        return _test_data
+
+    data_filepath = config.getoption('atlas_data')
+
+    # The pytest cache is unavailable when run with -p no:cacheprovider
+    cache_dir = config.cache.makedir('atlas_data') if getattr(config, 'cache', None) else None
+    if cache_dir is None:
+        _test_data = derive_test_data(load_atlas_data(data_filepath))
+        return _test_data
+
+    build_cache = BuildCache(Path(cache_dir) / 'build')
+    snapshot_dir = Path(cache_dir) / 'snapshot'
+    snapshot_filepath = snapshot_dir / 'test_data.pickle'
+    # Snapshots are also invalidated by changes to this file, which derives the parametrization lists
+    conftest_digest = sha256_digest(Path(__file__).read_bytes())
+
+    if build_cache.is_up_to_date(data_filepath, snapshot_dir):
+        with open(snapshot_filepath, 'rb') as f:
+            snapshot_conftest_digest, test_data = pickle.load(f)
+        if snapshot_conftest_digest == conftest_digest:
+            _test_data = test_data
+            return _test_data
+
+    _test_data = derive_test_data(load_atlas_data(data_filepath, cache=build_cache))
+    write_atomic_bytes(snapshot_filepath, pickle.dumps((conftest_digest, _test_data), protocol=pickle.HIGHEST_PROTOCOL))
+    build_cache.record_build(data_filepath, snapshot_dir, [snapshot_filepath])
+    return _test_data
+
+def derive_test_data(data):
+    """Returns a dictionary of the ATLAS data and the parametrization lists for the data-driven fixtures."""
     ## Create parameterized fixtures for tactics, techniques, and case studies for schema validation
 
-    # Generated fixtures are for all data objects within matrices, or at the top-level of the data
-    fixture_names = []
-
     # There should always be at least one matrix defined
     matrices = data['matrices']
 
@@ -139,7 +165,8 @@ def pytest_generate_tests(metafunc):
 
     # Unique keys in each matrix, representing the plural name of the object type
     # Note the underscore instead of the dash
-    collect_fixture_names = lambda data: list({key.replace('-','_') for d in data for key in d.keys() if key not in excluded_keys})
+    # Sorted so that parametrization order is the same in every process, as required by pytest-xdist
+    collect_fixture_names = lambda data: sorted({key.replace('-','_') for d in data for key in d.keys() if key not in excluded_keys})
 
     # Construct list of data object keys in the top-level data
     # Wrap this argument in a list to support iteration in lambda function
@@ -154,6 +181,8 @@ def pytest_generate_tests(metafunc):
     text_to_be_spellchecked = []
     all_values = []
     procedure_steps = []
+    fixture_values = {}
+    technique_id_to_tactic_ids = None
 
     for fixture_name in fixture_names:
         # Handle the key 'case_studies' really being 'case-studies' in the input
@@ -169,10 +198,6 @@ def pytest_generate_tests(metafunc):
             id_to_obj = [(obj['id'], obj) for obj in data[key]]
             all_values.extend(id_to_obj)
 
-    # Parametrize when called for via test signature
-    if 'all_data_objects' in metafunc.fixturenames:
-        metafunc.parametrize('all_data_objects', [all_values], indirect=True, scope='session')
-
     # Parameterize based on data objects
     for fixture_name in fixture_names:
 
@@ -186,6 +211,8 @@ def pytest_generate_tests(metafunc):
         if key in data:
             values.extend(data[key])
 
+        fixture_values[fixture_name] = values
+
         # Keys expected to be text strings in case study objects
         # Used for spellcheck purposes
         text_cs_keys = [
@@ -196,9 +223,12 @@ def pytest_generate_tests(metafunc):
             'target'
         ]
         # Collect technique objects
-        if 'technique_id_to_tactic_ids' in metafunc.fixturenames and key == 'techniques':
+        if key == 'techniques':
             technique_id_to_tactic_ids = {obj['id']: obj['tactics'] for obj in values if 'subtechnique-of' not in obj}
-            metafunc.parametrize('technique_id_to_tactic_ids', [technique_id_to_tactic_ids], ids=[''],indirect=True, scope='session')
+            # Subtechniques have the tactics of their parent technique
+            for obj in values:
+                if 'subtechnique-of' in obj and obj['subtechnique-of'] in technique_id_to_tactic_ids:
+                    technique_id_to_tactic_ids[obj['id']] = technique_id_to_tactic_ids[obj['subtechnique-of']]
 
         # Build up text parameters
         # Parameter format is (test_identifier, text)
@@ -232,6 +262,55 @@ def pytest_generate_tests(metafunc):
                 text_to_be_spellchecked.append(description_text)
                 text_with_possible_markdown_syntax.append(description_text)
 
+    return {
+        'data': data,
+        'fixture_values': fixture_values,
+        'all_values': all_values,
+        'technique_id_to_tactic_ids': technique_id_to_tactic_ids,
+        'text_with_possible_markdown_syntax': text_with_possible_markdown_syntax,
+        'text_to_be_spellchecked': text_to_be_spellchecked,
+        'procedure_steps': procedure_steps
+    }
+
+def pytest_generate_tests(metafunc):
+    """Enables test functions that use the above fixtures to operate on a
+    single dictionary, where each test function is automatically run once
+    for each dictionary in the tactics/techniques/case studies lists.
+
+    Loads in the ATLAS data and sets up the pytest scheme to yield one
+    dictionary for each above fixture, as well as other test fixtures.
+
+    https://docs.pytest.org/en/stable/parametrize.html#basic-pytest-generate-tests-example
+    """
+    # Only load ATLAS data if any of the data-driven fixtures are requested by the test
+    data_driven_fixtures = {
+        'output_data', 'matrix', 'tactics', 'techniques', 'case_studies', 'mitigations',
+        'text_with_possible_markdown_syntax', 'text_to_be_spellchecked', 'all_data_objects',
+        'procedure_steps', 'technique_id_to_tactic_ids'
+    }
+    if not any(name in metafunc.fixturenames for name in data_driven_fixtures):
+        return
+
+    # Read the YAML files in this repository and create the nested dictionary, once per session
+    test_data = load_test_data(metafunc.config)
+    data = test_data['data']
+
+    # Parametrize when called for via test signature
+    if 'output_data' in metafunc.fixturenames:
+        # Only one arg, wrap in list
+        metafunc.parametrize('output_data', [data], indirect=True, scope='session')
+    if 'matrix' in metafunc.fixturenames:
+        metafunc.parametrize('matrix', data['matrices'], indirect=True, scope='session')
+
+    # Parametrize when called for via test signature
+    if 'all_data_objects' in metafunc.fixturenames:
+        metafunc.parametrize('all_data_objects', [test_data['all_values']], indirect=True, scope='session')
+
+    if 'technique_id_to_tactic_ids' in metafunc.fixturenames and test_data['technique_id_to_tactic_ids'] is not None:
+        metafunc.parametrize('technique_id_to_tactic_ids', [test_data['technique_id_to_tactic_ids']], ids=[''],indirect=True, scope='session')
+
+    # Parameterize based on data objects
+    for fixture_name, values in test_data['fixture_values'].items():
         # Parametrize when called for via test signature
         if fixture_name in metafunc.fixturenames:
             # Parametrize each object, using the ID as identifier
@@ -241,19 +320,66 @@ def pytest_generate_tests(metafunc):
 
     # Parametrize when called for via test signature
     if 'text_with_possible_markdown_syntax' in metafunc.fixturenames:
-        metafunc.parametrize('text_with_possible_markdown_syntax', text_with_possible_markdown_syntax, ids=lambda x: x[0], indirect=True, scope='session')
+        metafunc.parametrize('text_with_possible_markdown_syntax', test_data['text_with_possible_markdown_syntax'], ids=lambda x: x[0], indirect=True, scope='session')
 
     ## Create parameterized fixtures for text to be spell-checked - names, descriptions, summary
 
     # Parametrize when called for via test signature
     if 'text_to_be_spellchecked' in metafunc.fixturenames:
-        metafunc.parametrize('text_to_be_spellchecked', text_to_be_spellchecked, ids=lambda x: x[0], indirect=True, scope='session')
+        metafunc.parametrize('text_to_be_spellchecked', test_data['text_to_be_spellchecked'], ids=lambda x: x[0], indirect=True, scope='session')
 
     ## Create parameterized fixtures for each procedure step
 
     # Parametrize when called for via test signature
     if 'procedure_steps' in metafunc.fixturenames:
-        metafunc.parametrize('procedure_steps', procedure_steps, ids=lambda x: x[0], indirect=True, scope='session')
+        metafunc.parametrize('procedure_steps', test_data['procedure_steps'], ids=lambda x: x[0], indirect=True, scope='session')
+
+#region Minimal data
+@pytest.fixture
+def minimal_atlas_data():
+    """Represents a small, hand-built ATLAS data dictionary, as returned by tools.create_matrix.load_atlas_data,
+    with each object type and kind of reference between objects. Each test gets a new copy to modify.
+    """
+    return {
+        'id': 'ATLAS',
+        'name': 'ATLAS',
+        'version': '1.0.0',
+        'matrices': [
+            {
+                'id': 'ATLAS',
+                'name': 'ATLAS',
+                'tactics': [
+                    {'id': 'AML.TA0000', 'object-type': 'tactic', 'name': 'Tactic', 'description': 'See [Technique](/techniques/AML.T0000).'},
+                    {'id': 'AML.TA0001', 'object-type': 'tactic', 'name': 'Other tactic', 'description': 'Tactic'}
+                ],
+                'techniques': [
+                    {'id': 'AML.T0000', 'object-type': 'technique', 'name': 'First', 'description': 'Technique', 'tactics': ['AML.TA0000']},
+                    {'id': 'AML.T0000.000', 'object-type': 'technique', 'name': 'Subtechnique', 'description': 'Subtechnique', 'subtechnique-of': 'AML.T0000'},
+                    {'id': 'AML.T0001', 'object-type': 'technique', 'name': 'Second', 'description': 'Technique', 'tactics': ['AML.TA0001']},
+                    {'id': 'AML.T0002', 'object-type': 'technique', 'name': 'Third', 'description': 'Technique', 'tactics': ['AML.TA0000']}
+                ],
+                'mitigations': [
+                    # Both plain ID and {id, use} technique entries
+                    {'id': 'AML.M0000', 'object-type': 'mitigation', 'name': 'Mitigation', 'techniques': ['AML.T0000', {'id': 'AML.T0001', 'use': 'Use'}]},
+                    {'id': 'AML.M0001', 'object-type': 'mitigation', 'name': 'Other mitigation', 'techniques': [{'id': 'AML.T0000', 'use': 'Use'}]}
+                ]
+            }
+        ],
+        'case-studies': [
+            {
+                'id': 'AML.CS0000',
+                'object-type': 'case-study',
+                'name': 'Case study',
+                'incident-date': datetime.date(2021, 1, 1),
+                'summary': 'See [Tactic](/tactics/AML.TA0001).',
+                'procedure': [
+                    {'tactic': 'AML.TA0000', 'technique': 'AML.T0000.000', 'description': 'Step'},
+                    {'tactic': 'AML.TA0001', 'technique': 'AML.T0001', 'description': 'Step'}
+                ]
+            }
+        ]
+    }
+#endregion
 
 #region Schemas
 @pytest.fixture(scope='session')
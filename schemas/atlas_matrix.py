@@ -27,6 +27,13 @@ atlas_matrix_schema = Schema(
     ignore_extra_keys=True
 )
 
+# Object ID to the IDs of related objects, as output by create_matrix --relationships
+relationship_table_schema = Schema(
+    {
+        Optional(str): [str]
+    }
+)
+
 atlas_output_schema = Schema(
     {
         "id": str,
@@ -37,7 +44,13 @@ atlas_output_schema = Schema(
         ],
         Optional("case-studies"): [
             case_study_schema
-        ]
+        ],
+        Optional("relationships"): {
+            Optional("technique-case-studies"): relationship_table_schema,
+            Optional("technique-mitigations"): relationship_table_schema,
+            Optional("technique-subtechniques"): relationship_table_schema,
+            Optional("tactic-techniques"): relationship_table_schema
+        }
     },
     name='ATLAS Output Schema',
     ignore_extra_keys=True,
@@ -0,0 +1,324 @@
+from schema import Literal, Optional, Or, Regex, Schema, SchemaError
+
+from .atlas_obj import (
+    tactic_schema,
+    technique_schema,
+    subtechnique_schema,
+    case_study_schema,
+    mitigation_schema
+)
+from .website_submission import DiscriminatedOr, contributions_schema, website_case_study_wrapper_schema
+
+"""Compiles Schema objects into validator functions, for validating many objects quickly.
+
+The structure of a schema is walked once, producing nested functions that check data directly,
+rather than rebuilding Schema objects for each value as Schema.validate does. Compiled validators
+accept the same data as the schema they were compiled from, but collect every error instead of
+raising on the first one.
+
+Schema features other than dictionaries, lists, types, Or, DiscriminatedOr, Optional keys, Regex, and literal values,
+i.e. And or Use, are validated by the schema library.
+
+Example:
+    errors = validate_all(data)
+    for error in errors:
+        print(error)
+"""
+
+# Key priorities, as in the schema library - literal keys are matched before other keys
+COMPARABLE, CALLABLE, VALIDATOR, TYPE, DICT, ITERABLE = range(6)
+
+def compile_schema(schema):
+    """Returns a function of data that returns a list of error messages, empty if the data is valid."""
+    check = SchemaCompiler().compile(schema)
+
+    def validate(data):
+        errors = []
+        check(data, '', errors)
+        return errors
+
+    return validate
+
+class SchemaCompiler:
+    """Compiles schemas into check functions of (data, path, errors) that add error messages and return True if valid.
+
+    Schema objects used in several places, i.e. references, are compiled once.
+    """
+
+    def __init__(self):
+        # ID of Schema object to its check function
+        self._compiled = {}
+
+    def compile(self, s, ignore_extra_keys=False):
+        """Returns the check function of the schema.
+
+        Dictionaries not wrapped in a Schema object use the ignore_extra_keys setting of their enclosing schema.
+        """
+        if isinstance(s, Schema) and not isinstance(s, Optional):
+            key = id(s)
+            if key not in self._compiled:
+                self._compiled[key] = self.compile(s.schema, s.ignore_extra_keys)
+            return self._compiled[key]
+
+        if isinstance(s, Literal):
+            s = s.schema
+
+        flavor = priority(s)
+        if flavor == ITERABLE:
+            return self._compile_iterable(s, ignore_extra_keys)
+        if flavor == DICT:
+            return self._compile_dict(s, ignore_extra_keys)
+        if flavor == TYPE:
+            return compile_type(s)
+        if isinstance(s, DiscriminatedOr):
+            return self._compile_discriminated_or(s)
+        if isinstance(s, Or):
+            return self._compile_or(s)
+        if isinstance(s, Regex):
+            return compile_regex(s)
+        if flavor in (VALIDATOR, CALLABLE):
+            return compile_fallback(s, ignore_extra_keys)
+        return compile_literal(s)
+
+    def _compile_or(self, s):
+        checks = [self.compile(branch, s._ignore_extra_keys) for branch in s._args]
+        only_one = s.only_one
+
+        def check_or(data, path, errors):
+            matches = 0
+            for check in checks:
+                # Errors of each branch are discarded, as only one branch needs to match
+                if check(data, path, []):
+                    matches += 1
+                    if not only_one:
+                        return True
+            if matches == 1:
+                return True
+            errors.append(error_message(path, f'{s!r} did not validate {data!r}'))
+            return False
+
+        return check_or
+
+    def _compile_discriminated_or(self, s):
+        checks = [self.compile(branch, s._ignore_extra_keys) for branch in s._args]
+
+        def check_discriminated_or(data, path, errors):
+            indices = s.candidates(data)
+            if not indices:
+                errors.append(error_message(path, s.unmatched_message(data)))
+                return False
+            # Only the errors of the branches selected for the data are reported
+            branch_errors = []
+            for index in indices:
+                if checks[index](data, path, branch_errors):
+                    return True
+            errors.extend(branch_errors)
+            return False
+
+        return check_discriminated_or
+
+    def _compile_iterable(self, s, ignore_extra_keys):
+        container_type = type(s)
+        item_check = self._compile_or(Or(*s, ignore_extra_keys=ignore_extra_keys)) if len(s) != 1 \
+            else self.compile(next(iter(s)), ignore_extra_keys)
+
+        def check_iterable(data, path, errors):
+            if not isinstance(data, container_type):
+                errors.append(error_message(path, f'{data!r} should be instance of {container_type.__name__!r}'))
+                return False
+            valid = True
+            for index, item in enumerate(data):
+                valid = item_check(item, f'{path}[{index}]', errors) and valid
+            return valid
+
+        return check_iterable
+
+    def _compile_dict(self, s, ignore_extra_keys):
+        # Literal key to the index of the schema key and the check of its values
+        literal_keys = {}
+        # Other keys, i.e. Optional(str), as (index, check of keys, check of values), in the order they are tried
+        other_keys = []
+        # Index of each required schema key to its representation in messages
+        required_keys = {}
+        for index, (skey, svalue) in enumerate(sorted(s.items(), key=lambda item: dict_key_priority(item[0]))):
+            key_schema = skey.schema if isinstance(skey, Optional) else skey
+            if isinstance(key_schema, Literal):
+                key_schema = key_schema.schema
+            value_check = self.compile(svalue, ignore_extra_keys)
+            if priority(key_schema) == COMPARABLE:
+                literal_keys.setdefault(key_schema, (index, value_check))
+            else:
+                other_keys.append((index, self.compile(key_schema), value_check))
+            if not isinstance(skey, Optional):
+                required_keys[index] = repr(key_schema)
+
+        def match_key(key, key_path):
+            """Returns the index and value check of the first schema key matching the data key, or None."""
+            try:
+                match = literal_keys.get(key)
+            except TypeError:
+                # Unhashable keys only match non-literal schema keys
+                match = None
+            if match is not None:
+                return match
+            for index, key_check, value_check in other_keys:
+                if key_check(key, key_path, []):
+                    return index, value_check
+            return None
+
+        def check_dict(data, path, errors):
+            if not isinstance(data, dict):
+                errors.append(error_message(path, f'{data!r} should be instance of {"dict"!r}'))
+                return False
+            valid = True
+            covered = set()
+            wrong_keys = []
+            for key, value in data.items():
+                key_path = f'{path}.{key}' if path else str(key)
+                match = match_key(key, key_path)
+                if match is None:
+                    wrong_keys.append(key)
+                    continue
+                covered.add(match[0])
+                valid = match[1](value, key_path, errors) and valid
+
+            missing_keys = [name for index, name in required_keys.items() if index not in covered]
+            if missing_keys:
+                errors.append(error_message(path, f'Missing key{"s" if len(missing_keys) > 1 else ""}: {", ".join(missing_keys)}'))
+                valid = False
+            if wrong_keys and not ignore_extra_keys:
+                errors.append(error_message(path, f'Wrong key{"s" if len(wrong_keys) > 1 else ""} {", ".join(repr(k) for k in wrong_keys)}'))
+                valid = False
+            return valid
+
+        return check_dict
+
+def error_message(path, message):
+    """Returns the message prefixed with the path of the value it is about, if not the validated data itself."""
+    return f'{path}: {message}' if path else message
+
+def priority(s):
+    """Returns the kind of schema, which determines how data is checked, as in the schema library."""
+    if type(s) in (list, tuple, set, frozenset):
+        return ITERABLE
+    if type(s) is dict:
+        return DICT
+    if issubclass(type(s), type):
+        return TYPE
+    if hasattr(s, 'validate'):
+        return VALIDATOR
+    if callable(s):
+        return CALLABLE
+    return COMPARABLE
+
+def dict_key_priority(skey):
+    """Returns the order in which dictionary keys are matched, with optional keys after required keys of the same kind."""
+    if isinstance(skey, Optional):
+        return priority(skey.schema) + 0.5
+    return priority(skey)
+
+def compile_type(s):
+    def check_type(data, path, errors):
+        # Booleans are not accepted as integers
+        if isinstance(data, s) and not (isinstance(data, bool) and s is int):
+            return True
+        errors.append(error_message(path, f'{data!r} should be instance of {s.__name__!r}'))
+        return False
+
+    return check_type
+
+def compile_regex(s):
+    search = s._pattern.search
+
+    def check_regex(data, path, errors):
+        if isinstance(data, (str, bytes)) and search(data):
+            return True
+        errors.append(error_message(path, f'{s!r} does not match {data!r}'))
+        return False
+
+    return check_regex
+
+def compile_literal(s):
+    def check_literal(data, path, errors):
+        if s == data:
+            return True
+        errors.append(error_message(path, f'{s!r} does not match {data!r}'))
+        return False
+
+    return check_literal
+
+def compile_fallback(s, ignore_extra_keys):
+    """Returns a check using the schema library, for schemas without a compiled equivalent."""
+    schema = Schema(s, ignore_extra_keys=ignore_extra_keys)
+
+    def check_fallback(data, path, errors):
+        try:
+            schema.validate(data)
+        except SchemaError as e:
+            errors.append(error_message(path, f'{e.code}'))
+            return False
+        return True
+
+    return check_fallback
+
+#region ATLAS objects
+
+validate_tactic = compile_schema(tactic_schema)
+validate_technique = compile_schema(technique_schema)
+validate_subtechnique = compile_schema(subtechnique_schema)
+validate_case_study = compile_schema(case_study_schema)
+validate_mitigation = compile_schema(mitigation_schema)
+
+def validate_technique_or_subtechnique(technique):
+    """Returns the errors of a technique, checked as a subtechnique if it has a subtechnique-of key."""
+    if 'subtechnique-of' in technique:
+        # As with Or(technique_schema, subtechnique_schema), objects valid as top-level techniques are accepted
+        errors = validate_subtechnique(technique)
+        return errors if errors and validate_technique(technique) else []
+    errors = validate_technique(technique)
+    return errors if errors and validate_subtechnique(technique) else []
+
+# Key of each list of objects in ATLAS data to the validator of its objects
+OBJECT_VALIDATORS = {
+    'tactics': validate_tactic,
+    'techniques': validate_technique_or_subtechnique,
+    'mitigations': validate_mitigation,
+    'case-studies': validate_case_study
+}
+
+def validate_all(data):
+    """Returns the errors of every tactic, technique, mitigation, and case study in ATLAS data, as output by create_matrix.
+
+    Each error is prefixed with the location and ID of its object, i.e. matrices[0].techniques[3] (AML.T0003).
+    """
+    errors = []
+
+    def validate_objects(container, container_path):
+        for key, validate in OBJECT_VALIDATORS.items():
+            for index, obj in enumerate(container.get(key, [])):
+                obj_errors = validate(obj)
+                if obj_errors:
+                    obj_id = obj.get('id') if isinstance(obj, dict) else None
+                    errors.extend(f'{container_path}{key}[{index}] ({obj_id}): {error}' for error in obj_errors)
+
+    for index, matrix in enumerate(data.get('matrices', [])):
+        validate_objects(matrix, f'matrices[{index}].')
+    validate_objects(data, '')
+
+    return errors
+
+#endregion
+
+#region Website contributions
+
+validate_contribution = compile_schema(contributions_schema)
+validate_case_study_file = compile_schema(website_case_study_wrapper_schema)
+
+def validate_contributions(payloads):
+    """Returns the list of errors of each contribution payload, as submitted by the website, in order.
+
+    Each list is empty if its payload is valid.
+    """
+    return [validate_contribution(payload) for payload in payloads]
+
+#endregion
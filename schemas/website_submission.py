@@ -1,4 +1,4 @@
-from schema import Optional, Or, Schema
+from schema import Optional, Or, Schema, SchemaError
 
 from .atlas_obj import (
     case_study_schema,
@@ -103,6 +103,80 @@ def schema_with_optional_keys(
     )
 
 
+class DiscriminatedOr(Or):
+    """Or of dictionary schemas that validates data only against the schemas it can match.
+
+    Each schema requiring a literal value for the key, i.e. "object-type": "tactic", is selected by that value.
+    Other schemas are selected when the data has all of their required keys, i.e. the "study" of case study
+    submissions. Data is valid if any selected schema validates it, as with Or, and invalid data is reported
+    with the errors of the selected schemas only.
+
+    Used as an Or, JSON Schema output is unchanged.
+    """
+
+    def __init__(self, *args, key="object-type", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key = key
+        # Value of the key to the indices of the schemas requiring it
+        self.keyed_indices = {}
+        # (index, required keys) of schemas without a literal value for the key
+        self.other_indices = []
+        for index, arg in enumerate(args):
+            s = arg.schema if isinstance(arg, Schema) else arg
+            if not isinstance(s, dict):
+                raise ValueError(f"DiscriminatedOr requires dictionary schemas, got {arg!r}")
+            # Literal keys that are not Optional
+            required_keys = [k for k in s if isinstance(k, str)]
+            if key in required_keys and isinstance(s[key], str):
+                self.keyed_indices.setdefault(s[key], []).append(index)
+            else:
+                self.other_indices.append((index, required_keys))
+        # Schemas are wrapped once, rather than on each validation as by Or
+        self.schemas = [
+            self._schema(arg, error=self._error, ignore_extra_keys=self._ignore_extra_keys)
+            for arg in args
+        ]
+
+    def candidates(self, data):
+        """Returns the indices of the schemas that can validate the data, in order."""
+        if not isinstance(data, dict):
+            return []
+        try:
+            indices = list(self.keyed_indices.get(data.get(self.key), []))
+        except TypeError:
+            # Unhashable values match no literal
+            indices = []
+        indices.extend(index for index, required_keys in self.other_indices if all(k in data for k in required_keys))
+        return sorted(indices)
+
+    def unmatched_message(self, data):
+        """Returns the error message for data that no schema can validate."""
+        values = ", ".join(repr(value) for value in self.keyed_indices)
+        keys = " or ".join(repr(required_keys) for _, required_keys in self.other_indices)
+        return f"{data!r} should have {self.key!r} of {values}" + (f", or keys {keys}" if keys else "")
+
+    def validate(self, data):
+        indices = self.candidates(data)
+        if not indices:
+            raise SchemaError(
+                [self.unmatched_message(data)],
+                [self._error.format(data) if self._error else None],
+            )
+
+        autos, errors = [], []
+        for index in indices:
+            try:
+                return self.schemas[index].validate(data)
+            except SchemaError as x:
+                autos += x.autos
+                errors += x.errors
+        names = ", ".join(getattr(self._args[index], "name", None) or f"schema {index}" for index in indices)
+        raise SchemaError(
+            [f"{data!r} did not validate as {names}"] + autos,
+            [self._error.format(data) if self._error else None] + errors,
+        )
+
+
 website_case_study_tactic_schema = schema_with_optional_keys(
     tactic_schema,
     ["id"],
@@ -241,8 +315,9 @@ contributions_schema = Schema(
         "contact": contact_schema,
         # free text comments
         "additional-info": str,
+        # Each submission is validated against the schema for its object-type, or for case studies, its study
         "submissions": [
-            Or(
+            DiscriminatedOr(
                 website_tactic_schema,
                 website_technique_schema,
                 website_mitigation_schema,
@@ -1,8 +1,20 @@
+from functools import lru_cache
+import hashlib
+import json
 import os
+from pathlib import Path
+
+import spellchecker
 from spellchecker import SpellChecker
 
+from tools.create_matrix import write_atomic_bytes
+
 """
 Sets up usage of https://pyspellchecker.readthedocs.io/en/latest/.
+
+Texts are spellchecked together by check_spelling, which tokenizes each text once
+and looks up each distinct token once. Lookups are persisted in a cache directory,
+keyed by the dictionary hash, so later runs only check tokens not seen before.
 """
 
 # Add words to the spellcheck by adding to this file
@@ -12,6 +24,51 @@ custom_words_file = os.path.join(os.path.dirname(__file__), "custom_words.txt")
 with open(custom_words_file) as f:
     CUSTOM_WORDS = [w.strip() for w in f.readlines()]
 
-# Create English spell checker with additional custom words for syntax test use
-SPELL_CHECKER = SpellChecker()
-SPELL_CHECKER.word_frequency.load_words(CUSTOM_WORDS)
+@lru_cache(maxsize=None)
+def get_spell_checker():
+    """Returns the English spell checker with additional custom words, created on first use."""
+    spell_checker = SpellChecker()
+    spell_checker.word_frequency.load_words(CUSTOM_WORDS)
+    return spell_checker
+
+def dictionary_hash():
+    """Returns a hash of the custom words and the spellchecker version, which determine the result of each lookup."""
+    digest = hashlib.sha256(spellchecker.__version__.encode())
+    digest.update(b'\0')
+    digest.update('\n'.join(CUSTOM_WORDS).encode())
+    return digest.hexdigest()
+
+def check_spelling(texts, tokenize, cache_dir=None):
+    """Returns a dictionary of each text to its set of potentially misspelled words, as returned by SpellChecker.unknown.
+
+    Args:
+        texts (list): Texts to check, duplicates are checked once
+        tokenize (function): Returns the list of tokens to check in a text
+        cache_dir (str or Path): Directory holding token lookups from previous runs, or None to not persist lookups
+    """
+    text_tokens = {text: tokenize(text) for text in set(texts)}
+    tokens = set().union(*text_tokens.values())
+
+    # Token to whether it is reported as unknown
+    cache_filepath = Path(cache_dir) / f'{dictionary_hash()}.json' if cache_dir is not None else None
+    unknown_tokens = {}
+    if cache_filepath is not None and cache_filepath.exists():
+        try:
+            unknown_tokens = json.loads(cache_filepath.read_text(encoding='utf-8'))
+        except ValueError:
+            # Rebuilt below from a partially written or otherwise invalid file
+            unknown_tokens = {}
+
+    unchecked_tokens = tokens.difference(unknown_tokens)
+    if unchecked_tokens:
+        spell_checker = get_spell_checker()
+        for token in unchecked_tokens:
+            unknown_tokens[token] = bool(spell_checker.unknown([token]))
+        if cache_filepath is not None:
+            write_atomic_bytes(cache_filepath, json.dumps(unknown_tokens, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+
+    # Unknown words are lowercased, as by SpellChecker.unknown
+    return {
+        text: {token.lower() for token in text_tokens[text] if unknown_tokens[token]}
+        for text in text_tokens
+    }
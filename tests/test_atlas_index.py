@@ -0,0 +1,41 @@
+from tools.atlas_index import AtlasIndex
+
+"""
+Tests the relationship lookups in tools/atlas_index.py.
+"""
+
+def ids(objs):
+    return [obj['id'] for obj in objs]
+
+def test_index_relationships(minimal_atlas_data):
+    # A second step using the same technique
+    minimal_atlas_data['case-studies'][0]['procedure'].append({'tactic': 'AML.TA0000', 'technique': 'AML.T0000.000', 'description': 'Step'})
+    index = AtlasIndex(minimal_atlas_data)
+
+    assert len(index) == 9
+    assert index.get('AML.CS0000')['object-type'] == 'case-study'
+    assert index.get('AML.T9999') is None
+    assert index.object_matrix_ids['AML.T0001'] == ['ATLAS']
+
+    assert ids(index.techniques_for_tactic('AML.TA0000')) == ['AML.T0000', 'AML.T0002']
+    assert ids(index.subtechniques_of('AML.T0000')) == ['AML.T0000.000']
+    assert index.parent_technique('AML.T0000.000')['id'] == 'AML.T0000'
+    assert index.parent_technique('AML.T0000') is None
+
+    # Case studies are listed once, even if used by several steps
+    assert ids(index.case_studies_for_technique('AML.T0000.000')) == ['AML.CS0000']
+    assert index.case_studies_for_technique('AML.T0002') == []
+
+    # Both plain ID and {id, use} mitigation entries
+    assert ids(index.mitigations_for_technique('AML.T0000')) == ['AML.M0000', 'AML.M0001']
+    assert index.mitigation_use('AML.M0001', 'AML.T0000') == 'Use'
+    assert index.mitigation_use('AML.M0000', 'AML.T0000') is None
+
+def test_index_matches_atlas_data(output_data):
+    """Case study lookups agree with a scan of every procedure step."""
+    index = AtlasIndex(output_data)
+
+    for case_study in output_data['case-studies']:
+        assert index.get(case_study['id']) is case_study
+        for step in case_study['procedure']:
+            assert case_study in index.case_studies_for_technique(step['technique'])
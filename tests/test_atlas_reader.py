@@ -0,0 +1,74 @@
+import io
+
+import pytest
+import yaml
+
+from tools.atlas_reader import iter_atlas_objects
+from tools.output_formats import write_yaml
+
+"""
+Tests streaming reads of ATLAS.yaml in tools/atlas_reader.py.
+"""
+
+def make_atlas_yaml():
+    data = {
+        'id': 'ATLAS',
+        'name': 'Adversarial Threat Landscape for AI Systems',
+        'version': '1.0.0',
+        'matrices': [
+            {
+                'id': 'ATLAS',
+                'name': 'ATLAS Matrix',
+                'tactics': [{'id': 'AML.TA0000', 'object-type': 'tactic'}],
+                'techniques': [
+                    {'id': 'AML.T0000', 'object-type': 'technique', 'tactics': ['AML.TA0000']},
+                    {'id': 'AML.T0000.000', 'object-type': 'technique', 'subtechnique-of': 'AML.T0000'},
+                    {'id': 'AML.T0001', 'object-type': 'technique', 'tactics': ['AML.TA0000']}
+                ]
+            },
+            {
+                'techniques': [{'id': 'AML.T1000', 'object-type': 'technique'}],
+                'id': 'OTHER'
+            }
+        ],
+        'case-studies': [
+            {'id': 'AML.CS0000', 'object-type': 'case-study', 'procedure': [{'tactic': 'AML.TA0000', 'technique': 'AML.T0000'}]}
+        ]
+    }
+    f = io.StringIO()
+    write_yaml(data, f)
+    return f.getvalue()
+
+def read_ids(**kwargs):
+    return [obj['id'] for obj in iter_atlas_objects(io.StringIO(make_atlas_yaml()), **kwargs)]
+
+def test_reader_yields_all_objects():
+    objs = list(iter_atlas_objects(io.StringIO(make_atlas_yaml())))
+    data = yaml.safe_load(make_atlas_yaml())
+
+    assert objs == data['matrices'][0]['tactics'] + data['matrices'][0]['techniques'] \
+        + data['matrices'][1]['techniques'] + data['case-studies']
+
+def test_reader_filters():
+    assert read_ids(object_types=['case-study']) == ['AML.CS0000']
+    assert read_ids(object_types=['tactic', 'case-study']) == ['AML.TA0000', 'AML.CS0000']
+    assert read_ids(id_prefix='AML.T0000') == ['AML.T0000', 'AML.T0000.000']
+    assert read_ids(matrix_ids=['ATLAS'], object_types=['technique']) == ['AML.T0000', 'AML.T0000.000', 'AML.T0001']
+    # Matrix ID after its object lists
+    assert read_ids(matrix_ids=['OTHER']) == ['AML.T1000', 'AML.CS0000']
+
+def test_reader_resolves_aliases_to_skipped_objects():
+    doc = 'id: ATLAS\nmatrices:\n- id: ATLAS\n  tactics:\n  - id: AML.TA0000\n    name: &name Tactic\n' \
+        'case-studies:\n- id: AML.CS0000\n  object-type: case-study\n  name: *name\n'
+    expected = [{'id': 'AML.CS0000', 'object-type': 'case-study', 'name': 'Tactic'}]
+
+    assert list(iter_atlas_objects(io.StringIO(doc), object_types=['case-study'])) == expected
+    assert list(iter_atlas_objects(io.StringIO(doc), id_prefix='AML.CS')) == expected
+
+def test_reader_does_not_include_files(tmp_path):
+    included_filepath = tmp_path / 'included.yaml'
+    included_filepath.write_text('id: AML.T9999\n')
+    doc = f'id: ATLAS\ncase-studies:\n- id: AML.CS0000\n  object-type: case-study\n  name: !include {included_filepath}\n'
+
+    with pytest.raises(yaml.constructor.ConstructorError, match='!include'):
+        list(iter_atlas_objects(io.StringIO(doc)))
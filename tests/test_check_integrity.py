@@ -0,0 +1,47 @@
+from tools.atlas_index import AtlasIndex
+from tools.check_integrity import IntegrityChecker, check_integrity
+
+"""
+Tests the cross-reference checks in tools/check_integrity.py.
+"""
+
+def test_check_integrity_minimal_data(minimal_atlas_data):
+    assert check_integrity(minimal_atlas_data) == []
+
+def test_check_integrity_atlas_data(output_data):
+    assert check_integrity(output_data) == []
+
+def test_check_integrity_dangling_references(minimal_atlas_data):
+    data = minimal_atlas_data
+    matrix = data['matrices'][0]
+    matrix['tactics'][0]['description'] = 'See [Technique](/techniques/AML.T9999) and [Page](/resources/faq).'
+    matrix['techniques'][1]['subtechnique-of'] = 'AML.TA0000'
+    matrix['techniques'][2]['tactics'] = ['AML.TA9999']
+    matrix['mitigations'][0]['techniques'][1]['id'] = 'AML.T9999'
+    matrix['mitigations'][1]['techniques'][0]['use'] = 'Unlike [Technique](/techniques/AML.T9998).'
+    case_study = data['case-studies'][0]
+    case_study['summary'] = 'See [Case study](/studies/AML.CS0000).'
+    case_study['procedure'][1]['tactic'] = 'AML.TA0000'
+    case_study['procedure'].append({'tactic': 'AML.T0000', 'technique': 'AML.T9999', 'description': 'See [Tactic](/tactics/AML.T0000)'})
+
+    assert check_integrity(data) == [
+        'AML.TA0000 description: Link /techniques/AML.T9999 - AML.T9999 does not exist',
+        'AML.TA0000 description: Link /resources/faq does not point at an ATLAS object',
+        'AML.T0000.000 subtechnique-of: AML.TA0000 is a tactic, expected a technique',
+        'AML.T0001 tactics[0]: AML.TA9999 does not exist',
+        'AML.M0000 techniques[1]: AML.T9999 does not exist',
+        'AML.M0001 techniques[0].use: Link /techniques/AML.T9998 - AML.T9998 does not exist',
+        "AML.CS0000 procedure[1]: Technique AML.T0001 has tactic AML.TA0000, expected one of ['AML.TA9999']",
+        'AML.CS0000 procedure[2].tactic: AML.T0000 is a technique, expected a tactic',
+        'AML.CS0000 procedure[2].technique: AML.T9999 does not exist',
+        'AML.CS0000 procedure[2].description: Link /tactics/AML.T0000 - AML.T0000 is a technique, expected a tactic'
+    ]
+
+def test_check_integrity_duplicate_ids(minimal_atlas_data):
+    data = minimal_atlas_data
+    duplicate = {'id': 'AML.T0001', 'object-type': 'technique', 'tactics': ['AML.TA0001']}
+    data['matrices'][0]['techniques'].append(duplicate)
+
+    checker = IntegrityChecker(data, AtlasIndex(data))
+    assert checker.duplicate_ids() == {'AML.T0001': [data['matrices'][0]['techniques'][2], duplicate]}
+    assert checker.check() == ['AML.T0001: Duplicate ID of 2 objects']
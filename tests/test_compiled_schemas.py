@@ -0,0 +1,150 @@
+import copy
+import datetime
+
+import pytest
+from schema import Optional, Or, Regex, Schema, SchemaError, Use
+
+from schemas import atlas_matrix, atlas_obj, website_submission
+from schemas.compiled import compile_schema, validate_all, validate_contributions
+from schemas.website_submission import DiscriminatedOr
+
+"""
+Tests that validators compiled by schemas/compiled.py accept the same data as their schemas.
+"""
+
+def is_valid(schema, data):
+    try:
+        schema.validate(data)
+    except SchemaError:
+        return False
+    return True
+
+def test_validate_all_output_data(output_data):
+    assert validate_all(output_data) == []
+    assert compile_schema(atlas_matrix.atlas_output_schema)(output_data) == []
+
+def test_validate_all_reports_each_object(output_data):
+    data = copy.deepcopy(output_data)
+    techniques = data['matrices'][0]['techniques']
+    del techniques[0]['name']
+    top_level_index = next(i for i, technique in enumerate(techniques) if i > 0 and 'subtechnique-of' not in technique)
+    techniques[top_level_index]['tactics'] = 'AML.TA0000'
+    data['case-studies'][0]['extra'] = True
+
+    errors = validate_all(data)
+    assert len(errors) == 3
+    assert errors[0].startswith(f'matrices[0].techniques[0] ({techniques[0]["id"]}): ')
+    assert errors[1].startswith(f'matrices[0].techniques[{top_level_index}] ')
+    assert errors[2] == f"case-studies[0] ({data['case-studies'][0]['id']}): Wrong key 'extra'"
+
+def make_case_study(**kwargs):
+    case_study = {
+        'id': 'AML.CS0000',
+        'object-type': 'case-study',
+        'name': 'Name',
+        'summary': 'Summary',
+        'incident-date': datetime.date(2021, 1, 1),
+        'incident-date-granularity': 'YEAR',
+        'procedure': [{'tactic': 'AML.TA0000', 'technique': 'AML.T0000.000', 'description': 'Step'}],
+        'references': [{'title': None, 'url': 'https://example.com'}]
+    }
+    case_study.update(kwargs)
+    return case_study
+
+@pytest.mark.parametrize('case_study', [
+    make_case_study(),
+    make_case_study(id='CS0000'),
+    make_case_study(**{'incident-date': '2021-01-01'}),
+    make_case_study(**{'incident-date': datetime.datetime(2021, 1, 1)}),
+    make_case_study(**{'incident-date-granularity': 'DAY'}),
+    make_case_study(procedure=[{'tactic': 'AML.TA0000', 'technique': 'AML.T0000.0000', 'description': 'Step'}]),
+    make_case_study(procedure=[{'tactic': 'AML.TA0000', 'technique': 'AML.T0000', 'description': 'Step', 'extra': 1}]),
+    make_case_study(procedure={}),
+    make_case_study(references=[{'title': 1, 'url': None}]),
+    make_case_study(reporter=None),
+    make_case_study(extra='key'),
+    {'id': 'AML.CS0000'},
+    ['not', 'a', 'dict']
+])
+def test_compiled_case_study_schema(case_study):
+    assert (compile_schema(atlas_obj.case_study_schema)(case_study) == []) == is_valid(atlas_obj.case_study_schema, case_study)
+
+@pytest.mark.parametrize('technique_entries', [
+    ['AML.T0000', 'AML.T0000.000', {'id': 'AML.T0001', 'use': 'Use'}],
+    [{'id': 'AML.T0001', 'use': 'Use', 'extra': 'key'}],
+    [{'id': 'AML.T0001'}],
+    ['AML.TA0000'],
+    'AML.T0000'
+])
+def test_compiled_mitigation_schema(technique_entries):
+    mitigation = {'id': 'AML.M0000', 'object-type': 'mitigation', 'name': 'Name', 'description': 'Description', 'techniques': technique_entries, 'extra': 'key'}
+    assert (compile_schema(atlas_obj.mitigation_schema)(mitigation) == []) == is_valid(atlas_obj.mitigation_schema, mitigation)
+
+@pytest.mark.parametrize('data', [
+    {'count': 1, 'names': {'a': ['x']}, 'flag': True},
+    {'count': True, 'names': {'a': ['x']}},
+    {'count': 1, 'names': {'a': [1]}},
+    {'count': 1, 'names': {1: ['x']}},
+    {'count': 1, 'names': {}, 'other': 'b1'},
+    {'count': 1, 'names': {}, 'other': 'c'},
+    {'count': 1, 'names': {}, 'number': '5'},
+    {'count': 1, 'names': {}, 'number': 'five'},
+    {'names': {}}
+])
+def test_compiled_schema_features(data):
+    schema = Schema({
+        'count': int,
+        'names': {Optional(str): [str]},
+        Optional('flag'): Or(True, False),
+        Optional('other'): Regex(r'^[ab]\d$'),
+        # Uses the schema library
+        Optional('number'): Use(int)
+    })
+    assert (compile_schema(schema)(data) == []) == is_valid(schema, data)
+
+# Submission schemas in the order of contributions_schema
+SUBMISSION_SCHEMAS = [
+    website_submission.website_tactic_schema,
+    website_submission.website_technique_schema,
+    website_submission.website_mitigation_schema,
+    website_submission.website_case_study_submission_schema,
+    website_submission.other_schema
+]
+
+@pytest.mark.parametrize('submission', [
+    {'object-type': 'tactic', 'name': 'Name', 'description': 'Description'},
+    {'object-type': 'tactic', 'name': 'Name'},
+    {'object-type': 'technique', 'name': 'Name', 'description': 'Description', 'maturity': 'feasible'},
+    {'object-type': 'technique', 'name': 'Name', 'description': 'Description', 'subtechnique-of': 'AML.T0000'},
+    {'object-type': 'mitigation', 'name': 'Name', 'description': 'Description', 'techniques': [{'id': 'AML.T0000', 'use': 'Use'}]},
+    {'object-type': 'other', 'description': 'Comment', 'extra': 'key'},
+    {'study': make_case_study(id='AML.CS0000'), 'meta': {}},
+    {'study': make_case_study(extra='key')},
+    # Both the tactic schema and the case study wrapper apply
+    {'object-type': 'tactic', 'study': make_case_study()},
+    {'object-type': 'unknown', 'description': 'Description'},
+    {'object-type': ['tactic']},
+    {},
+    'tactic'
+])
+def test_discriminated_or_matches_or(submission):
+    expected = is_valid(Schema(Or(*SUBMISSION_SCHEMAS)), submission)
+    assert is_valid(Schema(DiscriminatedOr(*SUBMISSION_SCHEMAS)), submission) == expected
+    assert (compile_schema(DiscriminatedOr(*SUBMISSION_SCHEMAS))(submission) == []) == expected
+
+def test_validate_contributions():
+    def make_payload(*submissions):
+        return {'contact': {'name': None, 'emails': None}, 'additional-info': 'Info', 'submissions': list(submissions)}
+
+    valid_payload = make_payload({'object-type': 'tactic', 'name': 'Name', 'description': 'Description'}, {'study': make_case_study()})
+    invalid_payload = make_payload({'object-type': 'technique', 'name': 'Name'}, {'object-type': 'unknown'})
+
+    errors = validate_contributions([valid_payload, invalid_payload])
+    assert errors[0] == []
+    # Only the schema for the object-type of each submission is reported
+    assert errors[1] == [
+        "submissions[0]: Missing key: 'description'",
+        "submissions[1]: {'object-type': 'unknown'} should have 'object-type' of 'tactic', 'technique', 'mitigation', 'other', or keys ['study']"
+    ]
+    assert is_valid(website_submission.contributions_schema, valid_payload)
+    assert not is_valid(website_submission.contributions_schema, invalid_payload)
@@ -0,0 +1,209 @@
+import datetime
+import json
+from pathlib import Path
+import shutil
+import tracemalloc
+
+import pytest
+import yaml
+
+from tools.create_matrix import (
+    add_relationships_to_data, build, BuildCache, BuildProfiler, create_internal_link, load_atlas_data, load_atlas_yaml,
+    ObjectTypeRegistry, REGEX_UNCACHEABLE, render_templates
+)
+from tools.canonical import content_hash
+from tools.output_formats import write_json, write_msgpack, write_yaml
+
+"""
+Tests the tools/create_matrix.py build pipeline against the data in this repository.
+"""
+
+DATA_FILEPATH = 'data/data.yaml'
+
+def test_build_cache_matches_uncached_load(tmp_path):
+    """Loading through a cold and then a warm build cache produces the same data as a plain load."""
+    expected = load_atlas_data(DATA_FILEPATH)
+
+    cache_dir = tmp_path / 'cache'
+    assert load_atlas_data(DATA_FILEPATH, cache=BuildCache(cache_dir)) == expected
+    assert any((cache_dir / 'parsed').rglob('*.pickle'))
+    assert load_atlas_data(DATA_FILEPATH, cache=BuildCache(cache_dir)) == expected
+
+def test_build_cache_detects_changed_inputs(tmp_path):
+    """A recorded build is only up to date until one of its source files changes."""
+    data_dir = tmp_path / 'data'
+    shutil.copytree('data', data_dir)
+    data_filepath = data_dir / 'data.yaml'
+    output_dir = tmp_path / 'dist'
+    output_dir.mkdir()
+    output_filepath = output_dir / 'ATLAS.yaml'
+    output_filepath.write_text('placeholder')
+
+    cache = BuildCache(tmp_path / 'cache')
+    load_atlas_data(data_filepath, cache=cache)
+    cache.record_build(data_filepath, output_dir, [output_filepath])
+    assert BuildCache(tmp_path / 'cache').is_up_to_date(data_filepath, output_dir)
+
+    # Adding a case study file changes the wildcard !include
+    case_study_filepath = sorted((data_dir / 'case-studies').glob('*.yaml'))[0]
+    shutil.copy(case_study_filepath, case_study_filepath.with_name('AML.CS9999.yaml'))
+    assert not BuildCache(tmp_path / 'cache').is_up_to_date(data_filepath, output_dir)
+
+def test_render_templates_only_changes_templated_strings():
+    """Template expressions are evaluated in place while other values keep their types and contents."""
+    anchors = {
+        'poison': {'id': 'AML.T0020', 'name': 'Poison Training Data', 'object-type': 'technique'}
+    }
+    data = {
+        'id': 'AML.CS0000',
+        'incident-date': datetime.date(2021, 1, 1),
+        'procedure': [
+            {'technique': '{{poison.id}}', 'description': 'Via {{ create_internal_link(poison) }}.\n'},
+            {'technique': 'AML.T0000', 'description': 'No templates {here}'}
+        ]
+    }
+
+    rendered = render_templates(data, anchors)
+
+    assert rendered == {
+        'id': 'AML.CS0000',
+        'incident-date': datetime.date(2021, 1, 1),
+        'procedure': [
+            {'technique': 'AML.T0020', 'description': 'Via [Poison Training Data](/techniques/AML.T0020).\n'},
+            {'technique': 'AML.T0000', 'description': 'No templates {here}'}
+        ]
+    }
+
+def test_render_templates_error_identifies_object():
+    """Template errors name the object ID and field that failed to render."""
+    data = {'id': 'AML.CS0000', 'procedure': [{'technique': '{{ create_internal_link(missing) }}'}]}
+
+    with pytest.raises(ValueError, match=r'AML\.CS0000 procedure\[0\]\.technique'):
+        render_templates(data, {})
+
+def test_render_modes_match():
+    """Rendering each templated string with a shared context produces the same data as rendering the whole document."""
+    assert load_atlas_data(DATA_FILEPATH) == load_atlas_data(DATA_FILEPATH, render_mode='document')
+
+def test_parallel_wildcard_include_matches_sequential():
+    """Parsing case studies in worker processes produces the same data as the sequential load."""
+    assert load_atlas_data(DATA_FILEPATH, jobs=2) == load_atlas_data(DATA_FILEPATH)
+
+def test_parallel_wildcard_include_rejects_duplicate_anchors(tmp_path):
+    """An anchor defined in more than one file matched by a wildcard is an error."""
+    (tmp_path / 'objs').mkdir()
+    for name in ['a', 'b']:
+        (tmp_path / 'objs' / f'{name}.yaml').write_text(f'--- &same\nid: {name}\n')
+    (tmp_path / 'data.yaml').write_text('---\ndata:\n  - !include objs/*.yaml\n')
+
+    with pytest.raises(yaml.composer.ComposerError, match='duplicate anchor'):
+        load_atlas_yaml(tmp_path / 'data.yaml', jobs=2)
+
+def test_atlas_loader_matches_pure_python_loader():
+    """The LibYAML-based loader, if available, reads the same data and anchors as the pure Python SafeLoader."""
+    assert load_atlas_yaml(DATA_FILEPATH) == load_atlas_yaml(DATA_FILEPATH, Loader=yaml.SafeLoader)
+
+def test_output_formats_contain_same_data(tmp_path):
+    """JSON and MessagePack outputs hold the same data as YAML, with dates as ISO 8601 strings."""
+    data = {'id': 'ATLAS', 'case-studies': [{'id': 'AML.CS0000', 'incident-date': datetime.date(2021, 1, 1)}]}
+    expected = {'id': 'ATLAS', 'case-studies': [{'id': 'AML.CS0000', 'incident-date': '2021-01-01'}]}
+
+    with open(tmp_path / 'ATLAS.yaml', 'w') as f:
+        write_yaml(data, f)
+    assert yaml.safe_load((tmp_path / 'ATLAS.yaml').read_text()) == data
+
+    with open(tmp_path / 'ATLAS.json', 'w') as f:
+        write_json(data, f)
+    assert json.loads((tmp_path / 'ATLAS.json').read_text()) == expected
+
+    msgpack = pytest.importorskip('msgpack')
+    with open(tmp_path / 'ATLAS.msgpack', 'wb') as f:
+        write_msgpack(data, f)
+    assert msgpack.unpackb((tmp_path / 'ATLAS.msgpack').read_bytes()) == expected
+
+def test_build_manifest_hashes(tmp_path):
+    """Manifest hashes match the objects as read back from the JSON output, with dates as strings."""
+    output_filepaths = build(DATA_FILEPATH, tmp_path, ['yaml', 'json'], manifest=True)
+    assert [p.name for p in output_filepaths] == ['ATLAS.yaml', 'ATLAS.json', 'ATLAS.manifest.json']
+
+    manifest = json.loads((tmp_path / 'ATLAS.manifest.json').read_text())
+    data = json.loads((tmp_path / 'ATLAS.json').read_text())
+    assert manifest['release'] == content_hash(data)
+
+    objects = [obj for key in ('tactics', 'techniques', 'mitigations') for obj in data['matrices'][0][key]]
+    objects.extend(data['case-studies'])
+    assert manifest['objects'] == {obj['id']: content_hash(obj) for obj in objects}
+
+def test_relationships_reverse_links():
+    data = {
+        'matrices': [
+            {
+                'techniques': [
+                    {'id': 'AML.T0000', 'tactics': ['AML.TA0000']},
+                    {'id': 'AML.T0000.000', 'subtechnique-of': 'AML.T0000'}
+                ],
+                'mitigations': [
+                    {'id': 'AML.M0000', 'techniques': ['AML.T0000', {'id': 'AML.T0000.000', 'use': 'Use'}]}
+                ]
+            }
+        ],
+        'case-studies': [
+            {'id': 'AML.CS0000', 'procedure': [{'technique': 'AML.T0000.000'}, {'technique': 'AML.T0000.000'}]}
+        ]
+    }
+
+    assert add_relationships_to_data(data)['relationships'] == {
+        'technique-case-studies': {'AML.T0000.000': ['AML.CS0000']},
+        'technique-mitigations': {'AML.T0000': ['AML.M0000'], 'AML.T0000.000': ['AML.M0000']},
+        'technique-subtechniques': {'AML.T0000': ['AML.T0000.000']},
+        'tactic-techniques': {'AML.TA0000': ['AML.T0000']}
+    }
+
+def test_profiler_memory_peaks_include_nested_stages():
+    profiler = BuildProfiler(track_memory=True)
+    try:
+        with profiler.stage('total'):
+            with profiler.stage('allocate'):
+                block = bytearray(8 * 2**20)
+                del block
+            with profiler.stage('idle'):
+                pass
+    finally:
+        tracemalloc.stop()
+
+    assert list(profiler.stages) == ['total', 'allocate', 'idle']
+    assert profiler.memory_peaks['allocate'] >= 8 * 2**20
+    assert profiler.memory_peaks['idle'] < 2**20
+    # The outer stage peak covers the inner stages, although their peaks were reset
+    assert profiler.memory_peaks['total'] >= 8 * 2**20
+
+def test_profiler_records_each_source_file(tmp_path):
+    cache = BuildCache(tmp_path)
+    profiler = BuildProfiler()
+    data = load_atlas_data(DATA_FILEPATH, cache=cache, profiler=profiler)
+    report = profiler.report()
+
+    assert {'load', 'anchors', 'render', 'template parse', 'template render', 'format', 'maturity'} <= set(report['stages'])
+    case_study_files = {name: record for name, record in report['files'].items() if 'case-studies' in name}
+    assert len(case_study_files) == len(data['case-studies'])
+    assert not any(record['cached'] for record in case_study_files.values())
+
+    # Files are read from the cache in the next build, except those that may use aliases
+    profiler = BuildProfiler()
+    load_atlas_data(DATA_FILEPATH, cache=cache, profiler=profiler)
+    for name in case_study_files:
+        is_cacheable = not REGEX_UNCACHEABLE.search(Path(name).read_bytes())
+        assert profiler.files[name]['cached'] == is_cacheable
+
+def test_object_type_registry_names():
+    registry = ObjectTypeRegistry(max_unseen=1)
+
+    assert registry.names('case-study') == ('case-studies', 'studies')
+    assert registry.plural('technique') == 'techniques'
+    # Types outside the known types are computed as they are seen
+    assert registry.names('threat-actor') == ('threat-actors', 'actors')
+    assert registry.link_type('data-source') == 'sources'
+    assert registry.link_type('threat-actor') == 'actors'
+
+    link = create_internal_link({'id': 'AML.CS0000', 'name': 'Study', 'object-type': 'case-study'})
+    assert link == '[Study](/studies/AML.CS0000)'
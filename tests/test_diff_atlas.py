@@ -0,0 +1,97 @@
+import copy
+import datetime
+import json
+
+from tools.canonical import canonical_json, content_hash
+from tools.diff_atlas import diff_atlas, json_patch
+from tools.output_formats import serialize_date
+
+"""
+Tests comparing ATLAS releases in tools/diff_atlas.py.
+"""
+
+def apply_patch(document, operations):
+    """Returns a copy of the document with the JSON Patch operations applied."""
+    document = copy.deepcopy(document)
+
+    def resolve(path):
+        tokens = [token.replace('~1', '/').replace('~0', '~') for token in path.split('/')[1:]]
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        key = tokens[-1]
+        return parent, int(key) if isinstance(parent, list) else key
+
+    for operation in operations:
+        if operation['op'] == 'move':
+            parent, key = resolve(operation['from'])
+            value = parent.pop(key)
+            parent, key = resolve(operation['path'])
+            parent.insert(key, value)
+            continue
+        parent, key = resolve(operation['path'])
+        if operation['op'] == 'remove':
+            del parent[key]
+        elif operation['op'] == 'add' and isinstance(parent, list):
+            parent.insert(key, copy.deepcopy(operation['value']))
+        else:
+            parent[key] = copy.deepcopy(operation['value'])
+    return document
+
+def test_diff_atlas(minimal_atlas_data):
+    old = minimal_atlas_data
+    new = copy.deepcopy(old)
+    new['version'] = '1.1.0'
+    techniques = new['matrices'][0]['techniques']
+    # Remove, reorder, modify, and add techniques
+    del techniques[0]
+    techniques.reverse()
+    techniques[0]['name'] = 'Renamed'
+    techniques[0]['tactics'].append('AML.TA0002')
+    del techniques[1]['tactics']
+    techniques.insert(1, {'id': 'AML.T0003', 'object-type': 'technique', 'name': 'Fourth', 'subtechnique-of': 'AML.T0002'})
+    new['matrices'][0]['tactics'].append({'id': 'AML.TA0002', 'object-type': 'tactic', 'name': 'Other/Tactic'})
+
+    report = diff_atlas(old, new)
+    assert report == {
+        'techniques': {
+            'added': ['AML.T0003'],
+            'removed': ['AML.T0000'],
+            'modified': {
+                'AML.T0002': {
+                    'name': {'old': 'Third', 'new': 'Renamed'},
+                    'tactics': {'old': ['AML.TA0000'], 'new': ['AML.TA0000', 'AML.TA0002']}
+                },
+                'AML.T0001': {'tactics': {'old': ['AML.TA0001']}}
+            }
+        },
+        'tactics': {'added': ['AML.TA0002'], 'removed': [], 'modified': {}}
+    }
+
+    patch = json_patch(old, new)
+    assert apply_patch(old, patch) == new
+    # The patch is serializable, with dates as strings
+    json.dumps(patch, default=serialize_date)
+
+def test_diff_atlas_unchanged(output_data):
+    assert diff_atlas(output_data, output_data) == {}
+    assert json_patch(output_data, copy.deepcopy(output_data)) == []
+
+def test_diff_atlas_patch_data(output_data):
+    new = copy.deepcopy(output_data)
+    case_studies = new['case-studies']
+    case_studies[0]['name'] += ' (updated)'
+    case_studies.append(case_studies.pop(1))
+    del new['matrices'][0]['techniques'][-1]
+
+    report = diff_atlas(output_data, new)
+    assert list(report['case-studies']['modified']) == [case_studies[0]['id']]
+    assert report['techniques']['removed'] == [output_data['matrices'][0]['techniques'][-1]['id']]
+    assert apply_patch(output_data, json_patch(output_data, new)) == new
+
+def test_content_hash():
+    obj = {'b': [1, 'é'], 'a': datetime.date(2021, 1, 1)}
+    assert canonical_json(obj) == '{"a":"2021-01-01","b":[1,"é"]}'
+    # Independent of key order and of dates being loaded as strings
+    assert content_hash(obj) == content_hash({'a': '2021-01-01', 'b': [1, 'é']})
+    assert content_hash(obj) != content_hash({**obj, 'b': [1]})
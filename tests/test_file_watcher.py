@@ -0,0 +1,20 @@
+from tools.file_watcher import FileWatcher
+
+"""
+Tests change detection in tools/file_watcher.py.
+"""
+
+def test_polling_detects_changes(tmp_path):
+    filepath = tmp_path / 'data.yaml'
+    filepath.write_text('id: ATLAS\n')
+
+    with FileWatcher([tmp_path], interval=0.01, debounce=0.01, use_notifications=False) as watcher:
+        assert watcher.mode == 'poll'
+        assert not watcher.wait(timeout=0.05)
+
+        filepath.write_text('id: ATLAS\nname: Changed\n')
+        assert watcher.wait(timeout=1)
+
+        (tmp_path / 'new.yaml').write_text('')
+        assert watcher.wait(timeout=1)
+        assert not watcher.wait(timeout=0.05)
@@ -0,0 +1,26 @@
+from schemas.atlas_matrix import atlas_output_schema
+from tools.create_matrix import load_atlas_data
+from tools.generate_corpus import count_objects, CorpusGenerator
+
+"""
+Tests the synthetic data generated by tools/generate_corpus.py.
+"""
+
+def test_generated_corpus_is_valid(tmp_path):
+    counts = {'tactics': 3, 'techniques': 8, 'subtechniques': 4, 'mitigations': 2, 'case-studies': 5, 'procedure-steps': 4}
+
+    data_filepath = CorpusGenerator(counts).generate(tmp_path)
+    data = load_atlas_data(data_filepath)
+
+    atlas_output_schema.validate(data)
+    generated_counts = count_objects(data)
+    assert {key: generated_counts[key] for key in counts if key != 'procedure-steps'} \
+        == {key: counts[key] for key in counts if key != 'procedure-steps'}
+
+    # Procedure steps use one of the tactics of their technique, or of its parent
+    techniques = {technique['id']: technique for technique in data['matrices'][0]['techniques']}
+    for case_study in data['case-studies']:
+        for step in case_study['procedure']:
+            technique = techniques[step['technique']]
+            technique = techniques.get(technique.get('subtechnique-of'), technique)
+            assert step['tactic'] in technique['tactics']
@@ -0,0 +1,56 @@
+import datetime
+
+import yaml
+
+from schemas.atlas_obj import CASE_STUDY_VERSION
+from tools.create_matrix import load_atlas_yaml
+from tools.import_case_study_file import (
+    CASE_STUDY_DIR, read_case_study_files, reserve_case_study_ids, templatize_case_study, website_case_studies
+)
+
+"""
+Tests importing website case study files with tools/import_case_study_file.py.
+"""
+
+def test_reserve_case_study_ids():
+    latest_id = sorted(CASE_STUDY_DIR.glob('*.yaml'))[-1].stem
+    next_number = int(latest_id[-4:]) + 1
+    assert reserve_case_study_ids(2) == [f'AML.CS{next_number:04d}', f'AML.CS{next_number + 1:04d}']
+    # IDs used by the imported files are skipped
+    assert reserve_case_study_ids(1, ['AML.CS9000']) == ['AML.CS9001']
+    assert reserve_case_study_ids(0) == []
+
+def test_read_case_study_files_in_parallel(output_data, tmp_path):
+    _, anchor2obj = load_atlas_yaml('data/matrix.yaml')
+    id2anchor = {obj['id']: anchor for (anchor, obj) in anchor2obj.items()}
+
+    filepaths = []
+    for i, study in enumerate(website_case_studies(output_data)[:3]):
+        filepath = tmp_path / f'study-{i}.yaml'
+        filepath.write_text(yaml.dump({'study': study, 'meta': {'version': CASE_STUDY_VERSION}}))
+        filepaths.append(filepath)
+
+    case_studies = read_case_study_files(filepaths, id2anchor, jobs=2)
+    assert len(case_studies) == 3
+    for case_study in case_studies:
+        assert 'id' not in case_study
+        # Known IDs are replaced by anchor expressions
+        assert all(step['technique'].startswith('{{') for step in case_study['procedure'])
+
+def test_templatize_case_study():
+    id2anchor = {'AML.T0000': 'technique_a', 'AML.TA0000': 'tactic_a'}
+    study = {
+        'name': 'Study of AML.T0000',
+        'summary': ' Uses [Technique A](/techniques/AML.T0000), [Other](/studies/AML.CS0001), and AML.T9999.\n',
+        'incident-date': datetime.datetime(2021, 11, 1, 12, 30, tzinfo=datetime.timezone.utc),
+        'procedure': [{'tactic': 'AML.TA0000', 'technique': 'AML.T0000', 'description': 'See [AML.T0000 docs](/techniques/AML.T0000)\n'}],
+        'references': [{'title': None, 'url': 'https://atlas.mitre.org/techniques/AML.T0000'}]
+    }
+
+    assert templatize_case_study(study, id2anchor) == {
+        'name': 'Study of {{technique_a.id}}',
+        'summary': 'Uses [{{technique_a.name}}](/techniques/{{technique_a.id}}), [Other](/studies/AML.CS0001), and AML.T9999.',
+        'incident-date': datetime.date(2021, 11, 1),
+        'procedure': [{'tactic': '{{tactic_a.id}}', 'technique': '{{technique_a.id}}', 'description': 'See [{{technique_a.name}}](/techniques/{{technique_a.id}})'}],
+        'references': [{'title': None, 'url': 'https://atlas.mitre.org/techniques/{{technique_a.id}}'}]
+    }
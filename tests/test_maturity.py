@@ -0,0 +1,73 @@
+import pytest
+
+from tools.maturity import MaturityEngine
+
+"""
+Tests technique maturity and its evidence in tools/maturity.py.
+"""
+
+def make_case_study(case_study_id, case_study_type, technique_ids):
+    return {
+        'id': case_study_id,
+        'case-study-type': case_study_type,
+        'procedure': [{'technique': technique_id} for technique_id in technique_ids]
+    }
+
+def test_maturity_propagates_through_hierarchy():
+    # Listed children first, and with the parent repeated in a second matrix
+    techniques = [
+        {'id': 'T1.000.000', 'subtechnique-of': 'T1.000'},
+        {'id': 'T1.000', 'subtechnique-of': 'T1'},
+        {'id': 'T1'},
+        {'id': 'T2'},
+        {'id': 'T3'},
+        {'id': 'T1'}
+    ]
+    case_studies = [
+        make_case_study('CS1', 'exercise', ['T1', 'T2']),
+        make_case_study('CS2', 'incident', ['T1.000.000']),
+        make_case_study('CS3', 'exercise', ['T1.000.000', 'T2']),
+        make_case_study('CS4', 'incident', ['T1.000'])
+    ]
+
+    engine = MaturityEngine(techniques)
+    assert engine.order.index('T1.000.000') < engine.order.index('T1.000') < engine.order.index('T1')
+
+    assessment = engine.assess(case_studies)
+    assert assessment.level('T1.000.000') == 'realized'
+    assert assessment.level('T1.000') == 'realized'
+    assert assessment.level('T1') == 'realized'
+    assert assessment.level('T2') == 'demonstrated'
+    assert assessment.level('T3') == 'feasible'
+
+    # Evidence is the case studies at the technique's level, using it or any descendant
+    assert assessment.evidence('T1.000.000') == ['CS2']
+    assert assessment.evidence('T1.000') == ['CS4', 'CS2']
+    assert assessment.evidence('T1') == ['CS4', 'CS2']
+    assert assessment.evidence('T2') == ['CS1', 'CS3']
+    assert assessment.evidence('T3') == []
+
+    # The hierarchy is reused for other case studies
+    assert engine.assess([]).level('T1') == 'feasible'
+
+def test_maturity_cycle():
+    techniques = [
+        {'id': 'T1', 'subtechnique-of': 'T2'},
+        {'id': 'T2', 'subtechnique-of': 'T1'}
+    ]
+    with pytest.raises(ValueError):
+        MaturityEngine(techniques)
+
+def test_maturity_matches_data(output_data):
+    """Maturity in the built data has evidence of that level, which its parent technique also has."""
+    techniques = [technique for matrix in output_data['matrices'] for technique in matrix['techniques']]
+    assessment = MaturityEngine(techniques).assess(output_data['case-studies'])
+
+    case_study_types = {case_study['id']: case_study['case-study-type'] for case_study in output_data['case-studies']}
+    technique_levels = {technique['id']: technique['maturity'] for technique in techniques}
+    for technique in techniques:
+        assert assessment.level(technique['id']) == technique['maturity']
+        if 'subtechnique-of' in technique and technique['maturity'] == 'realized':
+            assert technique_levels[technique['subtechnique-of']] == 'realized'
+        expected_type = {'feasible': None, 'demonstrated': 'exercise', 'realized': 'incident'}[technique['maturity']]
+        assert all(case_study_types[cs_id] == expected_type for cs_id in assessment.evidence(technique['id']))
@@ -0,0 +1,132 @@
+import gzip
+import json
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from tools.output_formats import serialize_date
+from tools.serve import accepts_gzip, AtlasApi, AtlasServer, start_reloader
+
+"""
+Tests the HTTP API served by tools/serve.py.
+"""
+
+def request(server, path, headers={}):
+    """Returns the status, headers, and body of a GET request to the server."""
+    try:
+        with urlopen(Request(f'http://127.0.0.1:{server.server_port}{path}', headers=headers)) as response:
+            return response.status, response.headers, response.read()
+    except HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def start_server(data):
+    server = AtlasServer(('127.0.0.1', 0), AtlasApi(data))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def ids(body):
+    return [obj['id'] for obj in json.loads(body)]
+
+def test_serve_objects_and_filters(minimal_atlas_data):
+    # Large enough to be compressed
+    minimal_atlas_data['matrices'][0]['techniques'][0]['description'] = 'x' * 2000
+    server = start_server(minimal_atlas_data)
+    try:
+        status, headers, body = request(server, '/techniques/AML.T0000.000')
+        assert status == 200
+        assert json.loads(body)['subtechnique-of'] == 'AML.T0000'
+
+        assert json.loads(request(server, '/')[2])['counts'] == {'tactics': 2, 'techniques': 4, 'mitigations': 2, 'case-studies': 1}
+        assert ids(request(server, '/techniques')[2]) == ['AML.T0000', 'AML.T0000.000', 'AML.T0001', 'AML.T0002']
+        # Subtechniques have the tactics of their parent
+        assert ids(request(server, '/techniques?tactic=AML.TA0000')[2]) == ['AML.T0000', 'AML.T0000.000', 'AML.T0002']
+        assert ids(request(server, '/techniques?tactic=AML.TA0001')[2]) == ['AML.T0001']
+        assert ids(request(server, '/techniques?parent=AML.T0000')[2]) == ['AML.T0000.000']
+        assert ids(request(server, '/mitigations?technique=AML.T0000')[2]) == ['AML.M0000', 'AML.M0001']
+        assert ids(request(server, '/case-studies?technique=AML.T0000.000')[2]) == ['AML.CS0000']
+        assert request(server, '/techniques/AML.T9999')[0] == 404
+
+        # Conditional requests
+        etag = headers['ETag']
+        assert request(server, '/techniques/AML.T0000.000', {'If-None-Match': etag})[0] == 304
+
+        # Large responses are compressed for clients that accept it, with a separate ETag
+        status, headers, body = request(server, '/techniques/AML.T0000', {'Accept-Encoding': 'gzip'})
+        assert headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(body))['id'] == 'AML.T0000'
+        identity_etag = request(server, '/techniques/AML.T0000')[1]['ETag']
+        assert headers['ETag'] != identity_etag
+        assert request(server, '/techniques/AML.T0000', {'Accept-Encoding': 'gzip', 'If-None-Match': headers['ETag']})[0] == 304
+
+        # The ETag of one encoding does not match the other
+        status, headers, body = request(server, '/techniques/AML.T0000', {'Accept-Encoding': 'gzip', 'If-None-Match': identity_etag})
+        assert status == 200
+        assert headers['Content-Encoding'] == 'gzip'
+        assert request(server, '/techniques/AML.T0000', {'If-None-Match': headers['ETag']})[0] == 200
+        assert request(server, '/techniques/AML.T0000', {'If-None-Match': identity_etag})[0] == 304
+
+        # Codings with a quality value of 0 are refused
+        status, headers, body = request(server, '/techniques/AML.T0000', {'Accept-Encoding': 'br, gzip;q=0'})
+        assert 'Content-Encoding' not in headers
+        assert json.loads(body)['id'] == 'AML.T0000'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_serve_rejects_unsupported_parameters(minimal_atlas_data):
+    server = start_server(minimal_atlas_data)
+    try:
+        status, headers, body = request(server, '/techniques?tactic=AML.TA0000&tatic=AML.TA0000&colour=red')
+        assert status == 400
+        assert headers['Content-Type'] == 'application/json; charset=utf-8'
+        assert json.loads(body) == {
+            'error': 'Unsupported query parameter(s) for /techniques: tatic, colour',
+            'parameters': ['matrix', 'tactic', 'parent', 'maturity']
+        }
+
+        # Parameters of other endpoints are also unsupported
+        status, headers, body = request(server, '/case-studies?matrix=ATLAS')
+        assert status == 400
+        assert json.loads(body)['parameters'] == ['technique']
+
+        # The index and single objects accept no parameters
+        status, headers, body = request(server, '/techniques/AML.T0000?bogus=1')
+        assert status == 400
+        assert json.loads(body) == {'error': 'Unsupported query parameter(s) for /techniques/AML.T0000: bogus', 'parameters': []}
+        status, headers, body = request(server, '/?bogus=1')
+        assert status == 400
+        assert json.loads(body) == {'error': 'Unsupported query parameter(s) for /: bogus', 'parameters': []}
+
+        # Unknown paths are not found, whatever their parameters
+        assert request(server, '/techniques/AML.T9999?bogus=1')[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_accepts_gzip():
+    assert accepts_gzip('gzip')
+    assert accepts_gzip('deflate, GZIP;q=0.5')
+    assert accepts_gzip('*')
+    assert not accepts_gzip('')
+    assert not accepts_gzip('br, deflate')
+    assert not accepts_gzip('gzip;q=0')
+    assert not accepts_gzip('gzip; q=0.000')
+    assert not accepts_gzip('gzip;q=0, *')
+    assert not accepts_gzip('*;q=0')
+
+def test_serve_reloads_data(tmp_path, minimal_atlas_data):
+    filepath = tmp_path / 'ATLAS.json'
+    filepath.write_text(json.dumps(minimal_atlas_data, default=serialize_date))
+    server = start_server(minimal_atlas_data)
+    stop_event = start_reloader(server, filepath, interval=0.01, debounce=0.01, use_notifications=False)
+    try:
+        filepath.write_text(json.dumps({**minimal_atlas_data, 'name': 'Reloaded'}, default=serialize_date))
+        deadline = time.monotonic() + 5
+        while json.loads(request(server, '/')[2])['name'] != 'Reloaded':
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        stop_event.set()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,60 @@
+import sqlite3
+
+from tools.sqlite_export import export_sqlite, has_fts5
+
+"""
+Tests the SQLite database written by tools/sqlite_export.py.
+"""
+
+def test_sqlite_export_matches_data(output_data, tmp_path):
+    database_filepath = tmp_path / 'ATLAS.sqlite'
+    export_sqlite(output_data, database_filepath)
+    connection = sqlite3.connect(str(database_filepath))
+
+    techniques = {technique['id']: technique for matrix in output_data['matrices'] for technique in matrix['techniques']}
+    rows = connection.execute('SELECT id, parent_id, maturity FROM techniques ORDER BY rowid').fetchall()
+    assert rows == [(t['id'], t.get('subtechnique-of'), t.get('maturity')) for t in techniques.values()]
+
+    case_studies = output_data['case-studies']
+    assert connection.execute('SELECT id, incident_date FROM case_studies ORDER BY rowid').fetchall() \
+        == [(cs['id'], cs['incident-date'].isoformat()) for cs in case_studies]
+    assert connection.execute('SELECT COUNT(*) FROM procedure_steps').fetchone()[0] \
+        == sum(len(cs['procedure']) for cs in case_studies)
+
+    # Relational lookup of the case studies using a technique or its subtechniques
+    case_study = case_studies[0]
+    technique_id = case_study['procedure'][0]['technique']
+    parent_id = techniques[technique_id].get('subtechnique-of', technique_id)
+    case_study_ids = [row[0] for row in connection.execute(
+        'SELECT DISTINCT ps.case_study_id FROM procedure_steps ps JOIN techniques t ON t.id = ps.technique_id '
+        'WHERE t.id = ? OR t.parent_id = ?', (parent_id, parent_id))]
+    assert case_study['id'] in case_study_ids
+
+    if has_fts5(connection):
+        word = case_study['name'].split()[0]
+        matches = [row[0] for row in connection.execute('SELECT id FROM search WHERE search MATCH ?', (f'"{word}"',))]
+        assert case_study['id'] in matches
+
+    connection.close()
+
+def test_sqlite_export_references(minimal_atlas_data, tmp_path):
+    minimal_atlas_data['matrices'][0]['mitigations'][0]['references'] = [{'title': 'Paper', 'url': 'https://example.com'}]
+    database_filepath = tmp_path / 'ATLAS.sqlite'
+    export_sqlite(minimal_atlas_data, database_filepath)
+    connection = sqlite3.connect(str(database_filepath))
+
+    # Objects referring to a technique used by a mitigation
+    rows = connection.execute(
+        'SELECT object_id, field FROM object_references WHERE referenced_id = ? ORDER BY rowid', ('AML.T0001',)).fetchall()
+    assert rows == [('AML.M0000', 'techniques'), ('AML.CS0000', 'procedure')]
+    rows = connection.execute(
+        'SELECT object_id, field FROM object_references WHERE referenced_id = ? ORDER BY rowid', ('AML.T0000',)).fetchall()
+    assert rows == [('AML.T0000.000', 'subtechnique-of'), ('AML.M0000', 'techniques'), ('AML.M0001', 'techniques')]
+    rows = connection.execute(
+        'SELECT object_id, field FROM object_references WHERE referenced_id = ? ORDER BY rowid', ('AML.TA0000',)).fetchall()
+    assert rows == [('AML.T0000', 'tactics'), ('AML.T0002', 'tactics'), ('AML.CS0000', 'procedure')]
+
+    assert connection.execute('SELECT object_id, position, title, url FROM citations').fetchall() \
+        == [('AML.M0000', 0, 'Paper', 'https://example.com')]
+
+    connection.close()
@@ -1,10 +1,11 @@
+from collections import Counter
 import re
 import warnings
 
 import pytest
 
 from schemas.atlas_id import TACTIC_ID_PATTERN, TECHNIQUE_ID_PATTERN, SUBTECHNIQUE_ID_PATTERN
-from spellcheck import SPELL_CHECKER
+from spellcheck import check_spelling
 
 """
 Validates text for internal and external Markdown links and warns for spelling.
@@ -92,13 +93,8 @@ REGEX_WORDS = re.compile(
     r")"
     )
 
-def test_spelling(text_to_be_spellchecked):
-    """Warns for potentially mispelled words from names and descriptions.
-    Only checks text outside of Markdown links.
-    See tests/custom_words.txt for exclusion words.
-    """
-    # Text is second element in tuple of (text identifier, text)
-    text = text_to_be_spellchecked[1]
+def spellcheck_tokens(text):
+    """Returns the tokens of the text to be spellchecked, from text outside of Markdown links, inline code, URLs, and acronyms."""
     # Remove Markdown links
     stripped_text = REGEX_MARKDOWN_LINK.sub('', text)
     # Remove inline code, content surrounded by one backtick
@@ -108,10 +104,28 @@ def test_spelling(text_to_be_spellchecked):
     # Remove acronym-like words
     stripped_text = REGEX_ACRONYM.sub('', stripped_text)
     # Tokenize, see comments above at variable declaration
-    text_tokens = REGEX_WORDS.findall(stripped_text)
+    return REGEX_WORDS.findall(stripped_text)
+
+@pytest.fixture(scope='session')
+def possible_misspellings(request, spellcheck_corpus):
+    """Spellchecks all texts at once, returning each text to its set of potentially misspelled words.
+
+    Token lookups are kept in .pytest_cache and reused until tests/custom_words.txt changes.
+    """
+    # The pytest cache is unavailable when run with -p no:cacheprovider
+    cache_dir = request.config.cache.makedir('spellcheck') if getattr(request.config, 'cache', None) else None
+    return check_spelling([text for _, text in spellcheck_corpus], spellcheck_tokens, cache_dir)
+
+def test_spelling(text_to_be_spellchecked, possible_misspellings):
+    """Warns for potentially mispelled words from names and descriptions.
+    Only checks text outside of Markdown links.
+    See tests/custom_words.txt for exclusion words.
+    """
+    # Text is second element in tuple of (text identifier, text)
+    text = text_to_be_spellchecked[1]
 
     # Get a set of potentially mispelled words
-    possible_mispelled = SPELL_CHECKER.unknown(text_tokens)
+    possible_mispelled = possible_misspellings[text]
     if possible_mispelled:
         # Emit warnings
         msg = 'Not recognized by spellcheck - fix or exclude in tests/custom_words.txt: '
@@ -149,12 +163,12 @@ def test_ascii(text_to_be_spellchecked):
 def test_check_unique_ids(all_data_objects):
     """ Warns for duplicate IDs in tactics, techniques, case studies, etc. """
 
-    # Creates a list of IDs from all_data_objects, which may contain duplicates
-    all_ids = [ids[0] for ids in all_data_objects]
+    # Counts the objects with each ID from all_data_objects, which may contain duplicates
+    id_counts = Counter(ids[0] for ids in all_data_objects)
 
     # Creates a list of 3-element tuples that hold the duplicate IDs, name, and object type
     # Sorted is needed to print the IDs in order
-    list_of_duplicate_objects = sorted([(ids[0], ids[1]['name'], ids[1]['object-type']) for ids in all_data_objects if all_ids.count(ids[0]) > 1])
+    list_of_duplicate_objects = sorted([(ids[0], ids[1]['name'], ids[1]['object-type']) for ids in all_data_objects if id_counts[ids[0]] > 1])
     list_of_duplicate_ids = sorted(set([id[0] for id in list_of_duplicate_objects]))
 
     if len(list_of_duplicate_objects) > 0:
@@ -183,18 +197,12 @@ def test_procedure_step_match(procedure_steps, technique_id_to_tactic_ids):
     technique_id = step['technique']
     tactic_id = step['tactic']
 
-    # Determine the correct tactics associated with the technique
+    # Determine the correct tactics associated with the technique, or with the parent technique of a subtechnique
     if technique_id in technique_id_to_tactic_ids:
         correct_tactics = technique_id_to_tactic_ids[technique_id]
     else:
-        # Object is a subtechnique, trim off last 4 chars to find the parent technique ID
-        technique_id = technique_id[:-4]
-        # Re-determine associated tactics
-        if technique_id in technique_id_to_tactic_ids:
-            correct_tactics = technique_id_to_tactic_ids[technique_id]
-        else:
-            # Otherwise error
-            raise ValueError(f'Technique ID to tactic ID mapping not found for {technique_id}')
+        # Otherwise error
+        raise ValueError(f'Technique ID to tactic ID mapping not found for {technique_id}')
 
     # Fail test if the step tactic is not one of the associated tactics for the step technique
     if tactic_id not in correct_tactics:
@@ -0,0 +1,80 @@
+import datetime
+import json
+
+import yaml
+
+from schemas.atlas_obj import CASE_STUDY_VERSION
+from tools.validate_contributions import find_contribution_files, validate_files
+
+"""
+Tests bulk validation of website contribution payloads and case study files with tools/validate_contributions.py.
+"""
+
+def make_study():
+    return {
+        'name': 'Name',
+        'summary': 'Summary',
+        'incident-date': datetime.date(2021, 1, 1),
+        'incident-date-granularity': 'YEAR',
+        'procedure': [{'tactic': 'AML.TA0000', 'technique': 'AML.T0000', 'description': 'Step'}]
+    }
+
+def write_files(directory):
+    payload = {
+        'contact': {'name': None, 'emails': None},
+        'additional-info': 'Info',
+        'submissions': [
+            {'object-type': 'tactic', 'name': 'Name', 'description': 'Description'},
+            {'object-type': 'technique', 'name': 'Name'},
+            {'study': make_study(), 'meta': {'version': '0.0'}}
+        ]
+    }
+    (directory / 'payload.yaml').write_text(yaml.dump(payload))
+    (directory / 'other.json').write_text(json.dumps({**payload, 'submissions': [{'object-type': 'other', 'description': 'Comment'}]}))
+    (directory / 'study.yaml').write_text(yaml.dump({'study': make_study(), 'meta': {'version': CASE_STUDY_VERSION}}))
+    (directory / 'old-study.yaml').write_text(yaml.dump({'study': make_study(), 'meta': {'version': '0.0'}}))
+    (directory / 'invalid.yaml').write_text('study: [')
+    (directory / 'notes.txt').write_text('Not validated')
+
+def test_validate_files(tmp_path):
+    write_files(tmp_path)
+    filepaths = find_contribution_files([tmp_path])
+    assert [filepath.name for filepath in filepaths] == ['invalid.yaml', 'old-study.yaml', 'other.json', 'payload.yaml', 'study.yaml']
+
+    report = validate_files(filepaths)
+    assert (report['files'], report['valid'], report['invalid']) == (5, 2, 3)
+    results = {result['path']: result for result in report['results']}
+
+    assert results[str(tmp_path / 'invalid.yaml')]['errors'][0].startswith('Could not read file')
+    assert results[str(tmp_path / 'old-study.yaml')]['errors'] == [f'Your case study is out of date. The current schema version is v{CASE_STUDY_VERSION}.']
+    assert results[str(tmp_path / 'study.yaml')]['valid']
+    assert results[str(tmp_path / 'other.json')]['valid']
+
+    # Errors are reported under the submission they are about
+    payload_result = results[str(tmp_path / 'payload.yaml')]
+    assert payload_result['kind'] == 'contribution'
+    assert payload_result['errors'] == []
+    assert [(s['object-type'], s['valid'], s['errors']) for s in payload_result['submissions']] == [
+        ('tactic', True, []),
+        ('technique', False, ["Missing key: 'description'"]),
+        ('case-study', False, [f'Your case study is out of date. The current schema version is v{CASE_STUDY_VERSION}.'])
+    ]
+
+    # Validation in worker processes gives the same report
+    assert validate_files(filepaths, jobs=2) == report
+
+def test_validate_json_files(tmp_path):
+    # JSON files, as produced by the website, hold incident dates as ISO 8601 strings
+    study = {**make_study(), 'incident-date': '2021-01-01'}
+    (tmp_path / 'study.json').write_text(json.dumps({'study': study, 'meta': {'version': CASE_STUDY_VERSION}}))
+    (tmp_path / 'payload.json').write_text(json.dumps({
+        'contact': {'name': None, 'emails': None},
+        'additional-info': 'Info',
+        'submissions': [{'study': {**study, 'incident-date': '2021-11-01T00:00:00.000Z'}, 'meta': {'version': CASE_STUDY_VERSION}}]
+    }))
+    (tmp_path / 'invalid-date.json').write_text(json.dumps({'study': {**study, 'incident-date': 'November 2021'}}))
+
+    results = {result['path']: result for result in validate_files(find_contribution_files([tmp_path]))['results']}
+    assert results[str(tmp_path / 'study.json')]['valid']
+    assert results[str(tmp_path / 'payload.json')]['valid']
+    assert not results[str(tmp_path / 'invalid-date.json')]['valid']
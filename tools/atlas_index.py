@@ -0,0 +1,131 @@
+from collections import defaultdict
+
+import yaml
+
+from tools.create_matrix import FastSafeLoader
+
+"""
+Provides constant-time lookups of ATLAS objects and their relationships.
+
+The index is built in one pass over ATLAS data, either as returned by
+tools.create_matrix.load_atlas_data or as read from a distributed ATLAS.yaml file.
+
+Example:
+    index = AtlasIndex.from_yaml('dist/ATLAS.yaml')
+    mitigations = index.mitigations_for_technique('AML.T0043')
+    case_studies = index.case_studies_for_technique('AML.T0043')
+"""
+
+class AtlasIndex:
+    """Lookup tables of ATLAS objects by ID and of the relationships between them.
+
+    Lists of related objects are in the order they appear in the data, without duplicates.
+    Lookups of unknown IDs return None or an empty list.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        # ID to object, for every data object with an ID, ex. tactics, techniques, mitigations, case studies
+        self.objects = {}
+        # ID to the IDs of the matrices the object is defined in, for objects defined in matrices
+        self.object_matrix_ids = defaultdict(list)
+        # Tactic ID to top-level technique objects that list the tactic
+        self.tactic_techniques = defaultdict(dict)
+        # Technique ID to subtechnique objects
+        self.technique_subtechniques = defaultdict(dict)
+        # Technique ID to case study objects with a procedure step using the technique
+        self.technique_case_studies = defaultdict(dict)
+        # Technique ID to mitigation objects listing the technique
+        self.technique_mitigations = defaultdict(dict)
+        # (Mitigation ID, technique ID) to the description of how the mitigation applies, if provided
+        self.mitigation_uses = {}
+
+        for matrix in data.get('matrices', []):
+            for obj in iter_data_objects(matrix):
+                self._add_object(obj)
+                self.object_matrix_ids[obj['id']].append(matrix['id'])
+
+        for obj in iter_data_objects(data):
+            self._add_object(obj)
+
+    @classmethod
+    def from_yaml(cls, filepath):
+        """Returns an index of the ATLAS data in the specified file, i.e. dist/ATLAS.yaml."""
+        with open(filepath) as f:
+            return cls(yaml.load(f, Loader=FastSafeLoader))
+
+    def _add_object(self, obj):
+        """Adds the object and its outgoing relationships to the lookup tables."""
+        obj_id = obj['id']
+        # The first definition of an ID wins, i.e. for objects repeated across matrices
+        if obj_id in self.objects:
+            return
+        self.objects[obj_id] = obj
+
+        object_type = obj.get('object-type')
+
+        if object_type == 'technique':
+            if 'subtechnique-of' in obj:
+                self.technique_subtechniques[obj['subtechnique-of']][obj_id] = obj
+            for tactic_id in obj.get('tactics', []):
+                self.tactic_techniques[tactic_id][obj_id] = obj
+
+        elif object_type == 'case-study':
+            for step in obj.get('procedure', []):
+                self.technique_case_studies[step['technique']][obj_id] = obj
+
+        elif object_type == 'mitigation':
+            for entry in obj.get('techniques', []):
+                # Entries are either technique IDs or {id, use} dictionaries
+                if isinstance(entry, dict):
+                    technique_id = entry['id']
+                    self.mitigation_uses[(obj_id, technique_id)] = entry.get('use')
+                else:
+                    technique_id = entry
+                self.technique_mitigations[technique_id][obj_id] = obj
+
+    def get(self, obj_id):
+        """Returns the object with the specified ID, or None."""
+        return self.objects.get(obj_id)
+
+    def __contains__(self, obj_id):
+        return obj_id in self.objects
+
+    def __len__(self):
+        return len(self.objects)
+
+    def parent_technique(self, technique_id):
+        """Returns the parent technique of a subtechnique, or None."""
+        technique = self.objects.get(technique_id)
+        if technique is None or 'subtechnique-of' not in technique:
+            return None
+        return self.objects.get(technique['subtechnique-of'])
+
+    def techniques_for_tactic(self, tactic_id):
+        """Returns the top-level techniques listing the tactic."""
+        return list(self.tactic_techniques.get(tactic_id, {}).values())
+
+    def subtechniques_of(self, technique_id):
+        """Returns the subtechniques of the technique."""
+        return list(self.technique_subtechniques.get(technique_id, {}).values())
+
+    def case_studies_for_technique(self, technique_id):
+        """Returns the case studies with at least one procedure step using the technique."""
+        return list(self.technique_case_studies.get(technique_id, {}).values())
+
+    def mitigations_for_technique(self, technique_id):
+        """Returns the mitigations that apply to the technique."""
+        return list(self.technique_mitigations.get(technique_id, {}).values())
+
+    def mitigation_use(self, mitigation_id, technique_id):
+        """Returns the description of how the mitigation applies to the technique, or None if not provided."""
+        return self.mitigation_uses.get((mitigation_id, technique_id))
+
+def iter_data_objects(container):
+    """Yields the data objects in the lists of a matrix or of the top-level data, i.e. tactics or case studies."""
+    for key, value in container.items():
+        if key == 'matrices' or not isinstance(value, list):
+            continue
+        for obj in value:
+            if isinstance(obj, dict) and 'id' in obj:
+                yield obj
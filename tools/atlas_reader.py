@@ -0,0 +1,220 @@
+from pathlib import Path
+
+import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.events import (
+    AliasEvent, MappingEndEvent, MappingStartEvent, ScalarEvent, SequenceEndEvent, SequenceStartEvent, StreamEndEvent
+)
+from yaml.nodes import MappingNode, ScalarNode
+from yaml.resolver import Resolver
+
+"""
+Reads ATLAS data objects one at a time from a distributed ATLAS.yaml file.
+
+The YAML event stream is walked instead of loading the whole document, so that only
+the requested objects are constructed and held in memory. Lists of objects that are
+not requested, such as all techniques when only case studies are needed, are skipped
+without building them.
+
+Example:
+    for case_study in iter_atlas_objects('dist/ATLAS.yaml', object_types=['case-study']):
+        print(case_study['id'], case_study['name'])
+"""
+
+# Loaders with the Python composer, which builds single nodes from the event stream, and only the safe constructors.
+# Unlike tools.create_matrix.AtlasLoader, these have no !include constructor, so a file being read cannot open other paths.
+if yaml.__with_libyaml__:
+    from yaml.cyaml import CParser
+
+    class _SafeEventLoader(Composer, CParser, SafeConstructor, Resolver):
+        """Safe loader that parses with LibYAML."""
+        def __init__(self, stream):
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+else:
+    from yaml.parser import Parser
+    from yaml.reader import Reader
+    from yaml.scanner import Scanner
+
+    class _SafeEventLoader(Reader, Scanner, Parser, Composer, SafeConstructor, Resolver):
+        """Safe loader that parses with PyYAML, as it was built without LibYAML."""
+        def __init__(self, stream):
+            Reader.__init__(self, stream)
+            Scanner.__init__(self)
+            Parser.__init__(self)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+# Keys of the lists holding each type of data object, in matrices or at the top level
+OBJECT_LIST_TYPES = {
+    'tactics': 'tactic',
+    'techniques': 'technique',
+    'mitigations': 'mitigation',
+    'case-studies': 'case-study'
+}
+
+def iter_atlas_objects(source, object_types=None, id_prefix=None, matrix_ids=None):
+    """Yields the data objects in ATLAS.yaml, in file order, as dictionaries.
+
+    Args:
+        source: Filepath or open stream of an ATLAS.yaml file
+        object_types: Optional object-type values to read, i.e. ['technique', 'mitigation']
+        id_prefix: Optional prefix of the IDs to read, i.e. 'AML.T0043' for a technique and its subtechniques
+        matrix_ids: Optional IDs of the matrices to read objects from, other matrices are skipped.
+            Objects outside matrices, such as case studies, are not affected.
+    """
+    if isinstance(source, (str, Path)):
+        with open(source) as f:
+            yield from iter_atlas_objects(f, object_types, id_prefix, matrix_ids)
+        return
+
+    reader = _AtlasReader(source, object_types, id_prefix, matrix_ids)
+    try:
+        yield from reader.read()
+    finally:
+        reader.loader.dispose()
+
+class _AtlasReader:
+    """Walks the event stream of an ATLAS.yaml document, constructing only the requested objects."""
+
+    def __init__(self, stream, object_types, id_prefix, matrix_ids):
+        # The loader's parser provides the events, and its composer and constructor build each requested object
+        self.loader = _SafeEventLoader(stream)
+        self.object_types = set(object_types) if object_types is not None else None
+        self.id_prefix = id_prefix
+        self.matrix_ids = set(matrix_ids) if matrix_ids is not None else None
+
+    def read(self):
+        loader = self.loader
+        loader.get_event()  # StreamStartEvent
+        while not loader.check_event(StreamEndEvent):
+            loader.get_event()  # DocumentStartEvent
+            if loader.check_event(MappingStartEvent):
+                yield from self._read_container(in_matrix=False)
+            else:
+                self._skip_node()
+            loader.get_event()  # DocumentEndEvent
+
+    def _read_container(self, in_matrix):
+        """Yields the requested objects in the lists of the top-level mapping or of a matrix mapping."""
+        loader = self.loader
+        loader.get_event()  # MappingStartEvent
+        while not loader.check_event(MappingEndEvent):
+            key_event = loader.peek_event()
+            if not isinstance(key_event, ScalarEvent) or key_event.anchor is not None:
+                # Not a key of the ATLAS format, i.e. a complex key
+                self._skip_node()
+                self._skip_node()
+                continue
+            key = loader.get_event().value
+
+            if not loader.check_event(SequenceStartEvent):
+                self._skip_node()
+            elif key == 'matrices' and not in_matrix:
+                yield from self._read_matrices()
+            elif self._is_list_wanted(key):
+                yield from self._read_objects()
+            else:
+                self._skip_node()
+        loader.get_event()  # MappingEndEvent
+
+    def _read_matrices(self):
+        """Yields the requested objects in each requested matrix."""
+        loader = self.loader
+        loader.get_event()  # SequenceStartEvent
+        while not loader.check_event(SequenceEndEvent):
+            if not loader.check_event(MappingStartEvent):
+                self._skip_node()
+            elif self.matrix_ids is None:
+                yield from self._read_container(in_matrix=True)
+            else:
+                # The matrix ID is needed before deciding to read it, so its non-object values are composed
+                yield from self._read_matrix_by_id()
+        loader.get_event()  # SequenceEndEvent
+
+    def _read_matrix_by_id(self):
+        """Yields the requested objects of the upcoming matrix, if its ID is requested."""
+        loader = self.loader
+        loader.get_event()  # MappingStartEvent
+        # Object lists seen before the matrix ID, as nodes, to be read once the ID is known
+        pending = []
+        matrix_id = None
+        while not loader.check_event(MappingEndEvent):
+            key_node = loader.compose_node(None, None)
+            if matrix_id is None or matrix_id in self.matrix_ids:
+                key = key_node.value if isinstance(key_node, ScalarNode) else None
+                if key == 'id':
+                    matrix_id = loader.construct_document(loader.compose_node(None, None))
+                    if matrix_id not in self.matrix_ids:
+                        pending = []
+                    continue
+                if loader.check_event(SequenceStartEvent) and self._is_list_wanted(key):
+                    if matrix_id is None:
+                        pending.append(loader.compose_node(None, None))
+                    else:
+                        yield from self._read_objects()
+                    continue
+            self._skip_node()
+        loader.get_event()  # MappingEndEvent
+
+        if matrix_id in self.matrix_ids:
+            for list_node in pending:
+                for node in list_node.value:
+                    obj = self._construct_object(node)
+                    if obj is not None:
+                        yield obj
+
+    def _is_list_wanted(self, key):
+        """Returns False if the list under the key is known to hold only objects of other types."""
+        if self.object_types is None or key not in OBJECT_LIST_TYPES:
+            return True
+        return OBJECT_LIST_TYPES[key] in self.object_types
+
+    def _read_objects(self):
+        """Yields the requested objects in the upcoming list."""
+        loader = self.loader
+        loader.get_event()  # SequenceStartEvent
+        while not loader.check_event(SequenceEndEvent):
+            if loader.check_event(MappingStartEvent):
+                obj = self._construct_object(loader.compose_node(None, None))
+                if obj is not None:
+                    yield obj
+            else:
+                self._skip_node()
+        loader.get_event()  # SequenceEndEvent
+
+    def _construct_object(self, node):
+        """Returns the object represented by the mapping node, or None if it is not requested."""
+        if not isinstance(node, MappingNode):
+            return None
+        # Check the ID on the node first, to avoid constructing unwanted objects
+        if self.id_prefix is not None:
+            id_nodes = [value for key, value in node.value if isinstance(key, ScalarNode) and key.value == 'id']
+            if not id_nodes or not isinstance(id_nodes[0], ScalarNode) or not id_nodes[0].value.startswith(self.id_prefix):
+                return None
+        obj = self.loader.construct_document(node)
+        if 'id' not in obj:
+            return None
+        if self.object_types is not None and obj.get('object-type') not in self.object_types:
+            return None
+        return obj
+
+    def _skip_node(self):
+        """Consumes the events of the upcoming node without building it."""
+        loader = self.loader
+        event = loader.peek_event()
+        if getattr(event, 'anchor', None) is not None:
+            # Anchored nodes are composed, as later aliases may refer to them
+            loader.compose_node(None, None)
+            return
+        loader.get_event()
+        if isinstance(event, (ScalarEvent, AliasEvent)):
+            return
+        # Note that the LibYAML parser matches exact event classes, not base classes such as CollectionEndEvent
+        while not loader.check_event(MappingEndEvent, SequenceEndEvent):
+            self._skip_node()
+        loader.get_event()
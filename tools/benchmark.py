@@ -0,0 +1,145 @@
+from argparse import ArgumentParser
+import json
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Unavailable on Windows, peak memory of the pytest process is not reported
+    resource = None
+
+from tools.create_matrix import BuildProfiler, load_atlas_data, load_atlas_yaml
+from tools.generate_corpus import count_objects, CorpusGenerator, DATA_FILEPATH, scale_counts
+from tools.import_case_study_file import CaseStudyTemplatizer, website_case_studies
+from tools.output_formats import write_yaml
+
+"""
+Measures how the ATLAS data pipeline scales with the amount of data.
+
+For each scale, a synthetic corpus is generated with tools.generate_corpus and the wall time
+and peak memory of each stage are reported:
+    load, render, format, maturity - the stages of tools.create_matrix.load_atlas_data
+    write yaml - writing ATLAS.yaml
+    import - converting each case study back from the website format, as in tools.import_case_study_file
+    pytest collection - collecting the data-driven tests against the corpus, in a separate process
+
+Peak memory is the most memory allocated during the stage beyond what was in use at its start, as traced
+by tracemalloc in a second run of the stages, except for pytest collection, which reports the peak resident
+size of the pytest process.
+
+Run this script with `python -m tools.benchmark --scales 1 10 100` to allow for local imports.
+"""
+
+def run_stages(data_filepath, output_dir, profiler):
+    """Runs each pipeline stage on the data, recording them on the profiler."""
+    data = load_atlas_data(data_filepath, profiler=profiler)
+
+    with profiler.stage('write yaml'), open(Path(output_dir) / 'ATLAS.yaml', 'w') as f:
+        write_yaml(data, f)
+
+    studies = website_case_studies(data)
+    # Free the built data before the next stages
+    del data
+    with profiler.stage('import'):
+        _, anchor2obj = load_atlas_yaml(Path(data_filepath).parent / 'matrix.yaml')
+        templatizer = CaseStudyTemplatizer({obj['id']: anchor for (anchor, obj) in anchor2obj.items()})
+        for study in studies:
+            templatizer.templatize(study)
+
+def benchmark_corpus(data_filepath, output_dir, track_memory=True, collect_tests=True):
+    """Returns the seconds and peak memory bytes, or None if not tracked, of each pipeline stage run on the data."""
+    # Stages are timed without tracemalloc, which slows them down several times over
+    profiler = BuildProfiler()
+    run_stages(data_filepath, output_dir, profiler)
+
+    memory_profiler = BuildProfiler(track_memory=True)
+    if track_memory:
+        run_stages(data_filepath, output_dir, memory_profiler)
+        tracemalloc.stop()
+
+    results = {
+        name: {'seconds': seconds, 'peak_bytes': memory_profiler.memory_peaks.get(name)}
+        for name, seconds in profiler.stages.items()
+    }
+
+    if collect_tests:
+        results['pytest collection'] = benchmark_test_collection(data_filepath)
+
+    return results
+
+def benchmark_test_collection(data_filepath):
+    """Returns the seconds and peak resident bytes of collecting the tests against the data."""
+    command = [
+        sys.executable, '-m', 'pytest', '--collect-only', '-q',
+        # Avoid reusing or writing a data snapshot in the pytest cache
+        '-p', 'no:cacheprovider',
+        f'--atlas-data={data_filepath}'
+    ]
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    seconds = time.perf_counter() - start
+
+    peak_bytes = None
+    if resource is not None:
+        # Largest of all finished child processes so far, which is this one as collections grow with scale
+        # Reported in kilobytes on Linux and bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        peak_bytes = max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+    return {'seconds': seconds, 'peak_bytes': peak_bytes}
+
+def format_results(results_by_scale):
+    """Returns a text table of the stage results at each scale."""
+    lines = [f'{"scale":>6}  {"stage":<18} {"seconds":>9} {"peak MiB":>9}']
+    for scale, (counts, results) in results_by_scale.items():
+        for name, result in results.items():
+            peak = '' if result['peak_bytes'] is None else f'{result["peak_bytes"] / 2**20:.1f}'
+            lines.append(f'{scale:>5g}x  {name:<18} {result["seconds"]:>9.2f} {peak:>9}')
+    return '\n'.join(lines)
+
+def main():
+    parser = ArgumentParser('Measures the time and memory of each ATLAS data pipeline stage at multiples of the current data.')
+    parser.add_argument("--scales", "-s", type=float, nargs="+", default=[1, 10, 100], help="Multiples of the current data to generate")
+    parser.add_argument("--case-studies", type=int, help="Number of case studies at every scale, instead of scaling the current number")
+    parser.add_argument("--data", "-d", type=str, default=DATA_FILEPATH, help="Path to the data.yaml to scale from")
+    parser.add_argument("--work-dir", type=str, help="Directory for generated corpora, which are kept. Defaults to a temporary directory")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the second run of each stage that measures peak memory, which is slow")
+    parser.add_argument("--no-collect", action="store_true", help="Skip timing pytest collection")
+    parser.add_argument("--output", "-o", type=str, help="Path to write the results to as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(args.work_dir or temp_dir)
+
+        base_counts = count_objects(load_atlas_data(args.data))
+
+        results_by_scale = {}
+        for scale in args.scales:
+            counts = scale_counts(base_counts, scale, args.case_studies)
+            corpus_dir = work_dir / f'corpus-{scale:g}x'
+            output_dir = work_dir / f'dist-{scale:g}x'
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            print(f'Generating {scale:g}x corpus in {corpus_dir}', file=sys.stderr)
+            data_filepath = CorpusGenerator(counts).generate(corpus_dir)
+            results_by_scale[scale] = (counts, benchmark_corpus(data_filepath, output_dir,
+                track_memory=not args.no_memory, collect_tests=not args.no_collect))
+
+    print(format_results(results_by_scale))
+
+    if args.output:
+        report = [
+            {'scale': scale, 'counts': counts, 'stages': results}
+            for scale, (counts, results) in results_by_scale.items()
+        ]
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f'Wrote {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import hashlib
+import json
+
+from tools.output_formats import serialize_date
+
+"""
+Canonical serialization and content hashes of ATLAS data.
+
+The canonical form is compact JSON with sorted keys, non-ASCII characters written as UTF-8, and dates
+as ISO 8601 strings, i.e. 2021-01-01. It depends only on the data, not on the order keys were loaded in
+or on the Python, PyYAML, or JSON library version, so hashes of it are stable across builds and machines.
+Data read from ATLAS.json, with dates as strings, hashes the same as data read from ATLAS.yaml.
+
+These hashes are written to the release manifest by `python tools/create_matrix.py --manifest`.
+"""
+
+# Hash algorithm of content hashes
+HASH_ALGORITHM = 'sha256'
+
+_encoder = json.JSONEncoder(default=serialize_date, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+def canonical_json(obj):
+    """Returns the canonical JSON text of the object."""
+    return _encoder.encode(obj)
+
+def content_hash(obj):
+    """Returns the hex digest of the canonical JSON of the object."""
+    return hashlib.new(HASH_ALGORITHM, canonical_json(obj).encode('utf-8')).hexdigest()
+
+def release_manifest(data):
+    """Returns the content hashes of the release and of each tactic, technique, mitigation, and case study in it.
+
+    Objects are listed by ID in data order. The first definition of an ID wins, i.e. for objects repeated across matrices.
+    """
+    object_hashes = {}
+    for matrix in data.get('matrices', []):
+        for key in ('tactics', 'techniques', 'mitigations'):
+            for obj in matrix.get(key, []):
+                if obj['id'] not in object_hashes:
+                    object_hashes[obj['id']] = content_hash(obj)
+    for case_study in data.get('case-studies', []):
+        if case_study['id'] not in object_hashes:
+            object_hashes[case_study['id']] = content_hash(case_study)
+
+    return {
+        'id': data['id'],
+        'version': data.get('version'),
+        'algorithm': HASH_ALGORITHM,
+        'release': content_hash(data),
+        'objects': object_hashes
+    }
@@ -0,0 +1,168 @@
+from argparse import ArgumentParser
+import re
+import sys
+
+from tools.atlas_index import AtlasIndex, iter_data_objects
+from tools.diff_atlas import load_atlas_file
+
+"""
+Checks the cross-references between ATLAS objects in one pass over the data.
+
+Verifies that:
+    - IDs are unique across tactics, techniques, mitigations, and case studies
+    - technique tactics, subtechnique-of, mitigation techniques, and procedure step tactics and techniques
+      refer to existing objects of the expected type
+    - internal Markdown links, i.e. [name](/techniques/AML.T0000), in descriptions, summaries,
+      and how mitigations are used against techniques, point at existing objects
+    - the tactic of each procedure step is one of the tactics of its technique, or of the parent of a subtechnique
+
+Each reference is looked up in a tools.atlas_index.AtlasIndex, so checking is linear in the size of the data.
+
+Run this script with `python -m tools.check_integrity <ATLAS.yaml>` to allow for local imports.
+"""
+
+# Internal Markdown link, i.e. [name](/techniques/AML.T0000), with the URL path as a group
+REGEX_INTERNAL_LINK = re.compile(r'\[[^\[]+\]\((/[^)\s]*)\)')
+
+# Internal link path prefix to the object type it links to
+LINK_OBJECT_TYPES = {
+    'tactics': 'tactic',
+    'techniques': 'technique',
+    'mitigations': 'mitigation',
+    'studies': 'case-study'
+}
+
+# Internal link path, with the prefix and ID as groups
+REGEX_LINK_PATH = re.compile(rf'^/({"|".join(LINK_OBJECT_TYPES)})/([^/?#]+)/?$')
+
+class IntegrityChecker:
+    """Checks the references between the objects of ATLAS data, as returned by tools.create_matrix.load_atlas_data.
+
+    An existing index of the data can be provided, otherwise one is built.
+    """
+
+    def __init__(self, data, index=None):
+        self.data = data
+        self.index = index if index is not None else AtlasIndex(data)
+
+    def duplicate_ids(self):
+        """Returns each ID defined by more than one object to the list of those objects, in data order.
+
+        Objects repeated across matrices count once per matrix.
+        """
+        id_objects = {}
+        for matrix in self.data.get('matrices', []):
+            for obj in iter_data_objects(matrix):
+                id_objects.setdefault(obj['id'], []).append(obj)
+        for obj in iter_data_objects(self.data):
+            id_objects.setdefault(obj['id'], []).append(obj)
+        return {obj_id: objs for obj_id, objs in id_objects.items() if len(objs) > 1}
+
+    def check(self):
+        """Returns a list of error messages, each prefixed with the ID of the object it is about, empty if the data is consistent."""
+        errors = [f'{obj_id}: Duplicate ID of {len(objs)} objects' for obj_id, objs in self.duplicate_ids().items()]
+
+        # Objects repeated across matrices are checked once
+        for obj in self.index.objects.values():
+            errors.extend(self.check_object(obj))
+
+        return errors
+
+    def check_object(self, obj):
+        """Returns the error messages for the references of the object."""
+        errors = []
+        obj_id = obj['id']
+        object_type = obj.get('object-type')
+
+        def check_reference(field, ref_id, expected_type):
+            message = self.reference_error(ref_id, expected_type)
+            if message:
+                errors.append(f'{obj_id} {field}: {message}')
+
+        def check_links(field, text):
+            if not isinstance(text, str):
+                return
+            for url in REGEX_INTERNAL_LINK.findall(text):
+                match = REGEX_LINK_PATH.match(url)
+                if match is None:
+                    errors.append(f'{obj_id} {field}: Link {url} does not point at an ATLAS object')
+                    continue
+                message = self.reference_error(match.group(2), LINK_OBJECT_TYPES[match.group(1)])
+                if message:
+                    errors.append(f'{obj_id} {field}: Link {url} - {message}')
+
+        check_links('description', obj.get('description'))
+        check_links('summary', obj.get('summary'))
+
+        if object_type == 'technique':
+            for index, tactic_id in enumerate(obj.get('tactics', [])):
+                check_reference(f'tactics[{index}]', tactic_id, 'tactic')
+            if 'subtechnique-of' in obj:
+                check_reference('subtechnique-of', obj['subtechnique-of'], 'technique')
+
+        elif object_type == 'mitigation':
+            for index, entry in enumerate(obj.get('techniques', [])):
+                # Entries are either technique IDs or {id, use} dictionaries
+                technique_id = entry.get('id') if isinstance(entry, dict) else entry
+                check_reference(f'techniques[{index}]', technique_id, 'technique')
+                if isinstance(entry, dict):
+                    check_links(f'techniques[{index}].use', entry.get('use'))
+
+        elif object_type == 'case-study':
+            for index, step in enumerate(obj.get('procedure', [])):
+                field = f'procedure[{index}]'
+                tactic_id = step.get('tactic')
+                technique_id = step.get('technique')
+                check_reference(f'{field}.tactic', tactic_id, 'tactic')
+                check_reference(f'{field}.technique', technique_id, 'technique')
+                check_links(f'{field}.description', step.get('description'))
+
+                technique = self.top_level_technique(technique_id)
+                if technique is not None and tactic_id not in technique.get('tactics', []):
+                    errors.append(f'{obj_id} {field}: Technique {technique_id} has tactic {tactic_id}, expected one of {technique.get("tactics", [])}')
+
+        return errors
+
+    def reference_error(self, ref_id, expected_type):
+        """Returns an error message if the ID does not refer to an object of the expected type, otherwise None."""
+        obj = self.index.get(ref_id) if isinstance(ref_id, str) else None
+        if obj is None:
+            return f'{ref_id} does not exist'
+        if obj.get('object-type') != expected_type:
+            return f'{ref_id} is a {obj.get("object-type")}, expected a {expected_type}'
+        return None
+
+    def top_level_technique(self, technique_id):
+        """Returns the technique, or the top-level technique of a subtechnique, or None if it or a parent does not exist."""
+        technique = self.index.get(technique_id) if isinstance(technique_id, str) else None
+        # Guards against subtechnique-of cycles
+        seen_ids = set()
+        while technique is not None and 'subtechnique-of' in technique:
+            if technique['id'] in seen_ids:
+                return None
+            seen_ids.add(technique['id'])
+            technique = self.index.get(technique['subtechnique-of'])
+        if technique is None or technique.get('object-type') != 'technique':
+            return None
+        return technique
+
+def check_integrity(data, index=None):
+    """Returns the error messages for the references between the objects of ATLAS data, empty if the data is consistent."""
+    return IntegrityChecker(data, index).check()
+
+def main():
+    parser = ArgumentParser('Checks that the references between ATLAS objects resolve.')
+    parser.add_argument("filepath", type=str, nargs="?", default="dist/ATLAS.yaml", help="Path to ATLAS.yaml or ATLAS.json, defaults to dist/ATLAS.yaml")
+    args = parser.parse_args()
+
+    errors = check_integrity(load_atlas_file(args.filepath))
+    for error in errors:
+        print(error)
+
+    if errors:
+        print(f'\n{len(errors)} integrity error(s) found in {args.filepath}')
+        sys.exit(1)
+    print(f'No integrity errors found in {args.filepath}')
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,39 @@
 from argparse import ArgumentParser
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import filecmp
+from functools import lru_cache, partial
+import hashlib
+import io
+import json
+import os
 from pathlib import Path
+import pickle
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
 
+import jinja2
 from jinja2 import Environment
 import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.resolver import Resolver
 
 import inflect
 
+# Support running as a script, i.e. python tools/create_matrix.py, by making the tools package importable
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.canonical import release_manifest
+from tools.file_watcher import FileWatcher
+from tools.maturity import MaturityEngine
+from tools.output_formats import OUTPUT_FORMATS
+
 """
 Creates the combined ATLAS YAML file from source data.
 """
@@ -14,53 +42,429 @@ def main():
     parser = ArgumentParser()
     parser.add_argument("--data", "-d", type=str, default="data/data.yaml", help="Path to data.yaml")
     parser.add_argument("--output", "-o", type=str, default="dist", help="Output directory")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Directory holding the incremental build cache")
+    parser.add_argument("--no-cache", action="store_true", help="Parse all source files and rewrite outputs without using the build cache")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Number of processes used to parse files matched by a wildcard !include, such as case studies")
+    parser.add_argument("--format", "-f", dest="formats", action="append", choices=list(OUTPUT_FORMATS),
+        help="Output file format, can be specified multiple times. Defaults to yaml")
+    parser.add_argument("--relationships", action="store_true",
+        help="Add a top-level relationships dictionary listing, for each technique or tactic, the IDs of the objects that link to it")
+    parser.add_argument("--manifest", action="store_true",
+        help="Write a manifest of the content hash of each tactic, technique, mitigation, and case study, and of the whole release, i.e. ATLAS.manifest.json")
+    parser.add_argument("--profile", action="store_true",
+        help="Write the time, CPU time, and peak memory of each build stage and source file to <id>.profile.json in the output directory. "
+            "Always rebuilds, and tracing memory slows down the build")
+    parser.add_argument("--watch", "-w", action="store_true", help="Rebuild whenever a file in the data directory changes, until interrupted")
     args = parser.parse_args()
 
+    # Output files are written in the order of the format names, removing duplicates
+    formats = sorted(set(args.formats or ['yaml']))
+
     # Create output directories as needed
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    def run_build():
+        # Cache and profiler record a single build
+        cache = None if args.no_cache else BuildCache(args.cache_dir)
+        profiler = BuildProfiler(track_memory=args.profile)
+        with profiler.stage('total'):
+            output_filepaths = build(args.data, output_dir, formats, cache=cache, jobs=args.jobs,
+                relationships=args.relationships, manifest=args.manifest, profiler=profiler, rebuild=args.profile)
+        if args.profile:
+            # Named after the output files, i.e. ATLAS.profile.json
+            profile_filepath = output_dir / f'{output_filepaths[0].stem}.profile.json'
+            with atomic_output(profile_filepath) as f:
+                json.dump({'data': args.data, **profiler.report()}, f, indent=4)
+            print(f'Wrote {profile_filepath} - {profiler.summary()}')
+        return output_filepaths, profiler
+
+    if not args.watch:
+        output_filepaths, _ = run_build()
+        if output_filepaths is None:
+            print(f'No changes to {args.data} since last build, outputs in {output_dir} are up to date')
+        return
+
+    def run_watched_build():
+        output_filepaths, profiler = run_build()
+        if output_filepaths is None:
+            print(f'No changes to {args.data} since last build, outputs in {output_dir} are up to date')
+        else:
+            print(f'Wrote {", ".join(str(p) for p in output_filepaths)} - {profiler.summary()}')
+
+    watch_data(args.data, run_watched_build)
+
+def build(data_filepath, output_dir, formats, cache=None, jobs=1, relationships=False, manifest=False, profiler=None, rebuild=False):
+    """Writes the data in each of the specified formats to the output directory, returning the output filepaths.
+
+    If manifest is True, also writes the content hashes of the release and its objects to <data ID>.manifest.json.
+
+    Returns None without writing if the cache holds an up-to-date build of the same data, options, and outputs,
+    unless rebuild is True.
+    """
+    # Options that change the outputs, for comparison against the cached build
+    build_options = {'formats': formats, 'relationships': relationships, 'manifest': manifest}
+
+    # Skip the build entirely when no source file, tool, or output changed since the last cached build
+    if cache is not None and not rebuild and cache.is_up_to_date(data_filepath, output_dir, build_options):
+        return None
+
     # Load and transform data
-    data = load_atlas_data(args.data)
+    data = load_atlas_data(data_filepath, cache=cache, jobs=jobs, relationships=relationships, profiler=profiler)
 
-    # Save composite document as a standard yaml file
+    # Save composite document in each format, i.e. as a standard yaml file
     # Output file name is the ID in data.yaml
-    output_filepath = output_dir / f"{data['id']}.yaml"
-    with open(output_filepath, "w") as f:
-        yaml.dump(data, f, default_flow_style=False, explicit_start=True, sort_keys=False)
+    output_filepaths = []
+    for output_format in formats:
+        extension, mode, write = OUTPUT_FORMATS[output_format]
+        output_filepath = Path(output_dir) / f"{data['id']}{extension}"
+        with profile_stage(profiler, f'write {output_format}'), atomic_output(output_filepath, mode) as f:
+            write(data, f)
+        output_filepaths.append(output_filepath)
+
+    if manifest:
+        manifest_filepath = Path(output_dir) / f"{data['id']}.manifest.json"
+        with profile_stage(profiler, 'write manifest'), atomic_output(manifest_filepath) as f:
+            json.dump(release_manifest(data), f, indent=4)
+        output_filepaths.append(manifest_filepath)
+
+    if cache is not None:
+        cache.record_build(data_filepath, output_dir, output_filepaths, build_options)
+
+    return output_filepaths
+
+def watch_data(data_filepath, run_build):
+    """Runs the build, then again whenever a file in the data directory changes, until interrupted."""
+    data_dir = Path(data_filepath).parent
+    with FileWatcher([data_dir]) as watcher:
+        print(f'Watching {data_dir} for changes ({watcher.mode}), press Ctrl+C to stop')
+        try:
+            while True:
+                try:
+                    run_build()
+                except Exception as e:
+                    # Keep watching, as the data may be partway through an edit
+                    print(f'Build failed - {type(e).__name__}: {e}')
+                watcher.wait()
+        except KeyboardInterrupt:
+            pass
+
+class BuildProfiler:
+    """Records the time taken, and optionally the peak memory allocated, by each stage of a build and each source file.
+
+    Stages may be nested, i.e. a total stage around the others.
+    Memory tracking uses tracemalloc, which is started if needed and slows down the build.
+    """
+
+    def __init__(self, track_memory=False):
+        # Stage name to seconds, in the order the stages were first run
+        self.stages = {}
+        # Stage name to seconds of CPU time used by this process
+        self.cpu_times = {}
+        # Stage name to the peak bytes allocated above the memory in use at the start of the stage
+        self.memory_peaks = {}
+        # Source filepath to the seconds, CPU seconds, and peak bytes taken to load it, including the files it includes,
+        # and whether it was read from the build cache
+        self.files = {}
+        self.track_memory = track_memory
+        # Highest traced memory so far in each running stage, innermost last
+        self._running_peaks = []
+
+    def stage(self, name):
+        """Returns a context manager recording the enclosed code under the stage name, adding to any previous runs."""
+        # Stages are listed in the order they start, before any nested stages
+        self.stages.setdefault(name, 0)
+        self.cpu_times.setdefault(name, 0)
+        return self._measure(partial(self._add_stage, name))
+
+    def _add_stage(self, name, measurement):
+        self.stages[name] += measurement['seconds']
+        self.cpu_times[name] += measurement['cpu_seconds']
+        if 'peak_bytes' in measurement:
+            self.memory_peaks[name] = max(self.memory_peaks.get(name, 0), measurement['peak_bytes'])
+
+    def file(self, filepath):
+        """Returns a context manager recording the enclosed loading of the source file.
+
+        The context manager yields the file's record, on which the loader sets 'cached' when read from the build cache.
+        """
+        record = self.files.setdefault(str(filepath), {'seconds': 0, 'cpu_seconds': 0, 'cached': False})
+        return self._measure(partial(self._add_file, record), record)
+
+    def add_file(self, filepath, seconds, cpu_seconds, cached=False):
+        """Records a source file loaded elsewhere, i.e. by a worker process."""
+        self.files[str(filepath)] = {'seconds': seconds, 'cpu_seconds': cpu_seconds, 'cached': cached}
+
+    def _add_file(self, record, measurement):
+        record['seconds'] += measurement['seconds']
+        record['cpu_seconds'] += measurement['cpu_seconds']
+        if 'peak_bytes' in measurement:
+            record['peak_bytes'] = max(record.get('peak_bytes', 0), measurement['peak_bytes'])
+
+    @contextmanager
+    def _measure(self, add_measurement, value=None):
+        """Measures the enclosed code, passing the measurement to the function on exit, even on errors."""
+        if self.track_memory:
+            start_memory = self._start_memory_stage()
+        start = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield value
+        finally:
+            measurement = {
+                'seconds': time.perf_counter() - start,
+                'cpu_seconds': time.process_time() - start_cpu
+            }
+            if self.track_memory:
+                measurement['peak_bytes'] = self._end_memory_stage() - start_memory
+            add_measurement(measurement)
+
+    def _start_memory_stage(self):
+        """Returns the traced memory in use, resetting the traced peak for the new stage."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        # Carry the peak so far over to the enclosing stage before resetting it
+        if self._running_peaks:
+            self._running_peaks[-1] = max(self._running_peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self._running_peaks.append(current)
+        return current
+
+    def _end_memory_stage(self):
+        """Returns the highest traced memory during the stage now ending."""
+        _, peak = tracemalloc.get_traced_memory()
+        peak = max(self._running_peaks.pop(), peak)
+        if self._running_peaks:
+            self._running_peaks[-1] = max(self._running_peaks[-1], peak)
+        tracemalloc.reset_peak()
+        return peak
+
+    def summary(self):
+        """Returns a one-line summary of the stage times, and peak memory if tracked."""
+        if self.track_memory:
+            return ', '.join(f'{name} {seconds:.2f}s {self.memory_peaks[name] / 2**20:.1f} MiB' for name, seconds in self.stages.items())
+        return ', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.stages.items())
+
+    def report(self):
+        """Returns the stage and file measurements as a JSON-serializable dictionary."""
+        stages = {}
+        for name, seconds in self.stages.items():
+            stages[name] = {'seconds': seconds, 'cpu_seconds': self.cpu_times[name]}
+            if name in self.memory_peaks:
+                stages[name]['peak_bytes'] = self.memory_peaks[name]
+        return {'stages': stages, 'files': self.files}
+
+@contextmanager
+def profile_stage(profiler, name):
+    """Records the time taken by the enclosed code as the named stage on the profiler, which may be None."""
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+@contextmanager
+def profile_file(profiler, filepath):
+    """Records the loading of the source file on the profiler, which may be None, yielding the file's record or None."""
+    if profiler is None:
+        yield None
+        return
+    with profiler.file(filepath) as record:
+        yield record
+
+@contextmanager
+def atomic_output(output_filepath, mode='w'):
+    """Yields a stream whose contents replace the output file on success.
 
-def load_atlas_data(matrix_yaml_filepath):
-    """Returns a dictionary representing ATLAS data as read from the provided YAML files."""
+    The data is written to a temporary file in the same directory, which then
+    replaces the output file only when the contents differ, so unchanged outputs keep their timestamps.
+    """
+    output_filepath = Path(output_filepath)
+    fd, temp_filepath = tempfile.mkstemp(dir=output_filepath.parent, prefix=f'.{output_filepath.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        if output_filepath.exists() and filecmp.cmp(temp_filepath, output_filepath, shallow=False):
+            os.remove(temp_filepath)
+        else:
+            # Temporary files are only readable by the owner, use the usual permissions for new files instead
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_filepath, 0o666 & ~umask)
+            os.replace(temp_filepath, output_filepath)
+    except BaseException:
+        os.remove(temp_filepath)
+        raise
+
+def load_atlas_data(matrix_yaml_filepath, cache=None, render_mode='tree', jobs=1, relationships=False, profiler=None):
+    """Returns a dictionary representing ATLAS data as read from the provided YAML files.
+
+    Unchanged source files are read from the optional BuildCache instead of being re-parsed.
+    Files matched by a wildcard !include are parsed concurrently when jobs is greater than 1.
+    The time taken by each stage is recorded on the optional BuildProfiler.
+    When relationships is True, a top-level relationships dictionary is added, see add_relationships_to_data.
+
+    Jinja templates are evaluated per string value by default, see render_templates.
+    The render_mode 'document' instead evaluates the whole data set as one templated YAML document.
+    """
     # Load yaml with custom loader that supports !include and cross-doc anchors
-    data, anchors = load_atlas_yaml(matrix_yaml_filepath)
+    with profile_stage(profiler, 'load'):
+        data, anchors = load_atlas_yaml(matrix_yaml_filepath, cache=cache, jobs=jobs, profiler=profiler)
 
     ## Jinja template evaluation
+    with profile_stage(profiler, 'render'):
+        if render_mode == 'tree':
+            data = render_templates(data, anchors, profiler=profiler)
+        elif render_mode == 'document':
+            data = render_document_templates(data, anchors, profiler=profiler)
+        else:
+            raise ValueError(f'Expected render_mode to be "tree" or "document", got "{render_mode}"')
 
-    # Use YAML default style of literal string "" wrappers to handle apostophes/single quotes in the text
-    data_str = yaml.dump(data, default_flow_style=False, sort_keys=False, default_style='>')
-    # Set up data as Jinja template
-    env = Environment()
+    with profile_stage(profiler, 'format'):
+        # Flatten object data and populate tactic list
+        data['matrices'] = [format_output(matrix_data) for matrix_data in data['matrices']]
+
+        # Flatten any included data elements in the top-level data.yaml such as case studies
+        data = format_output(data)
+
+    # add maturity - needs to come after the formatting because of the addition of case studies
+    with profile_stage(profiler, 'maturity'):
+        data = add_maturity_to_data(data)
+
+    if relationships:
+        with profile_stage(profiler, 'relationships'):
+            data = add_relationships_to_data(data)
+
+    return data
+
+def create_template_environment(**options):
+    """Returns a Jinja environment with the helper functions available to ATLAS data templates."""
+    env = Environment(**options)
     #add create_link function from data/render_helper to jinja environment for use during rendering
     env.globals.update(create_internal_link = create_internal_link)
-    template = env.from_string(data_str)
-    # Validate template - throws a TemplateSyntaxError if invalid
-    env.parse(template)
+    return env
+
+def render_templates(data, anchors, profiler=None):
+    """Evaluates Jinja templates in the string values of the loaded data, replacing them in place.
+
+    Only strings containing template delimiters are rendered, with the anchors as template variables.
+    Raises a ValueError identifying the object and field of any template that fails to render.
+    The time taken to parse and to render templates is recorded on the optional BuildProfiler.
+    """
+    # Render each string as is, including any trailing newline
+    env = create_template_environment(keep_trailing_newline=True)
+    delimiters = (env.variable_start_string, env.block_start_string, env.comment_start_string)
+    # The same expressions, i.e. "{{reconnaissance.id}}", appear many times and always render the same way
+    rendered = {}
+    # Template variables are shared by every render, as Template.render copies them into a new context each time,
+    # which would make rendering quadratic in the number of anchors. A shared context does not add the globals itself.
+    variables = {**env.globals, **anchors}
+
+    def render_str(text, path, obj_id):
+        if not any(delimiter in text for delimiter in delimiters):
+            return text
+        if text not in rendered:
+            try:
+                with profile_stage(profiler, 'template parse'):
+                    template = env.from_string(text)
+                with profile_stage(profiler, 'template render'):
+                    try:
+                        rendered[text] = str(template.make_module(variables, shared=True))
+                    except Exception:
+                        # Rewrites the traceback to point at the template, as Template.render does
+                        env.handle_exception()
+            except (jinja2.TemplateError, KeyError) as e:
+                location = f'{obj_id} {path}' if obj_id else path
+                raise ValueError(f'Failed to render template in {location}: {e}') from e
+        return rendered[text]
+
+    def render_value(value, path, obj_id):
+        if isinstance(value, str):
+            return render_str(value, path, obj_id)
+
+        if isinstance(value, dict):
+            # Report errors against the closest object with an ID
+            if isinstance(value.get('id'), str):
+                obj_id = value['id']
+            for key in list(value):
+                item = render_value(value[key], f'{path}.{key}' if path else str(key), obj_id)
+                if isinstance(key, str):
+                    new_key = render_str(key, path, obj_id)
+                    if new_key != key:
+                        # Keep the original key order
+                        value = {(new_key if k == key else k): v for k, v in value.items()}
+                        key = new_key
+                value[key] = item
+
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                value[i] = render_value(item, f'{path}[{i}]', obj_id)
+
+        return value
+
+    return render_value(data, '', None)
+
+def render_document_templates(data, anchors, profiler=None):
+    """Evaluates Jinja templates by rendering the data as a single YAML document, returning the re-parsed data."""
+    # Use YAML literal block style to handle apostophes/single quotes in the text,
+    # as folded style does not round-trip lines that start with spaces
+    with profile_stage(profiler, 'dump'):
+        data_str = yaml.dump(data, default_flow_style=False, sort_keys=False, default_style='|')
+    # Set up data as Jinja template
+    env = create_template_environment()
+    with profile_stage(profiler, 'template parse'):
+        template = env.from_string(data_str)
+        # Validate template - throws a TemplateSyntaxError if invalid
+        env.parse(template)
 
     # Replace all "super aliases" in strings in the document
-    populated_data_str = template.render(anchors)
+    with profile_stage(profiler, 'template render'):
+        populated_data_str = template.render(anchors)
     # Convert populated data string back to a dictionary
-    data = yaml.safe_load(populated_data_str)
+    with profile_stage(profiler, 'reparse'):
+        return yaml.load(populated_data_str, Loader=FastSafeLoader)
 
-    # Flatten object data and populate tactic list
-    data['matrices'] = [format_output(matrix_data) for matrix_data in data['matrices']]
+class ObjectTypeRegistry:
+    """Plural forms and internal link path segments of object types, i.e. 'case-study' to 'case-studies' and 'studies'.
 
-    # Flatten any included data elements in the top-level data.yaml such as case studies
-    data = format_output(data)
+    The known object types are computed together on first use, and other types as they are seen,
+    keeping the most recent max_unseen of them.
+    """
 
-    # add maturity - needs to come after the formatting because of the addition of case studies
-    data = add_maturity_to_data(data)
+    def __init__(self, known_types=('tactic', 'technique', 'mitigation', 'case-study'), max_unseen=128):
+        self.known_types = known_types
+        # Object type to (plural, link type), for the known types
+        self._names = None
+        # This library is used in order to get the plural form of arbitrary object-type names
+        self._engine = inflect.engine()
+        self._unseen_names = lru_cache(maxsize=max_unseen)(self._compute_names)
 
-    return data
+    def _compute_names(self, object_type):
+        plural = self._engine.plural(object_type)
+        # If object type is multiple words separated by hyphen, pluralizes last word
+        link_type = plural.split("-")[-1]
+        return plural, link_type
+
+    def names(self, object_type):
+        """Returns the plural form and the link path segment of the object type."""
+        if self._names is None:
+            self._names = {known_type: self._compute_names(known_type) for known_type in self.known_types}
+        names = self._names.get(object_type)
+        if names is None:
+            names = self._unseen_names(object_type)
+        return names
+
+    def plural(self, object_type):
+        """Returns the plural form of the object type, used as the key of lists of objects, i.e. 'case-studies'."""
+        return self.names(object_type)[0]
+
+    def link_type(self, object_type):
+        """Returns the path segment of internal links to objects of the type, i.e. 'studies'."""
+        return self.names(object_type)[1]
+
+# Shared by all builds in this process
+object_types = ObjectTypeRegistry()
 
 def format_output(data):
     """Constructs the ATLAS.yaml output format by populating listed tactic IDs and flattening lists of other objects."""
@@ -73,16 +477,12 @@ def format_output(data):
     # The literal data key contains include filepaths that will be resolved as part of YAML loading
     matrix = {k: data[k] for k in data if k != 'data'}
 
-    # Setting up for pluralization library
-    # This library is used in order to get the plural form of arbitrary object-type names
-    p = inflect.engine()
-
     # Get list of unique object types
     # Exclude 'tactic', as it will be separately handled
     dataObjectTypes = list(set([obj['object-type'] for obj in objects if 'object-type' in obj and obj['object-type'] != 'tactic']))
 
     # Keep track of object types to their plural forms for dictionary key use
-    objectTypeToPlural = {dot: p.plural(dot) for dot in dataObjectTypes}
+    objectTypeToPlural = {dot: object_types.plural(dot) for dot in dataObjectTypes}
 
     # Populates object lists within matrix object based on object-type
     # Ensures tactic objects are in the order defined in the matrix
@@ -128,54 +528,89 @@ def add_maturity_to_data(data: dict) -> dict:
         This means that it has shown up in at least one case study of `case_Study_type` incident
 
     feasible is the default, demonstrated takes precedence over feasible, and realized take precedence over demonstrated
+
+    See tools.maturity.MaturityEngine for the case studies justifying each technique's level.
     """
-    maturity_map = {}
+    techniques = [technique for matrix in data["matrices"] for technique in matrix["techniques"]]
 
-    # get the highest level of maturity for each technique based on case study usage
-    for case_study in data["case-studies"]:
-        maturity = {
-            "exercise" : "demonstrated",
-            "incident" : "realized"
-        }.get(case_study["case-study-type"])
+    # propagate case study evidence from subtechniques to parents, at any depth and across matrices
+    assessment = MaturityEngine(techniques).assess(data["case-studies"])
 
-        for procedure in case_study["procedure"]:
-            # update maturity level if technique has not yet been seen or could be "upgraded"
-            technique_id = procedure["technique"]
-            if maturity_map.get(technique_id, "demonstrated") == "demonstrated":
-                maturity_map[technique_id] = maturity
+    # set maturity level for all techniques, defaulting to "feasible"
+    for technique in techniques:
+        technique["maturity"] = assessment.level(technique["id"])
+
+    return data
+
+def add_relationships_to_data(data: dict) -> dict:
+    """Adds a top-level relationships dictionary holding the reverse of the links between objects.
+
+    Each table maps an object ID to the IDs of the objects linking to it, in data order without duplicates:
+        technique-case-studies - case studies with a procedure step using the technique
+        technique-mitigations - mitigations listing the technique
+        technique-subtechniques - subtechniques of the technique
+        tactic-techniques - techniques listing the tactic
+    """
+    # Dictionaries with None values are used as ordered sets of IDs
+    tables = {
+        'technique-case-studies': defaultdict(dict),
+        'technique-mitigations': defaultdict(dict),
+        'technique-subtechniques': defaultdict(dict),
+        'tactic-techniques': defaultdict(dict)
+    }
 
-    # "upgrade" maturity of parent techniques
     for matrix in data["matrices"]:
         for technique in matrix["techniques"]:
             technique_id = technique["id"]
-            if "subtechnique-of" in technique and technique_id in maturity_map:
-                parent_technique_id = technique["subtechnique-of"]
-                if maturity_map.get(parent_technique_id, "demonstrated") == "demonstrated":
-                    maturity_map[parent_technique_id] = maturity_map[technique_id]
+            if "subtechnique-of" in technique:
+                tables['technique-subtechniques'][technique["subtechnique-of"]][technique_id] = None
+            for tactic_id in technique.get("tactics", []):
+                tables['tactic-techniques'][tactic_id][technique_id] = None
 
-    # set maturity level for all techniques
-    for matrix in data["matrices"]:
-        for technique in matrix["techniques"]:
-            # set maturity, defaulting to "feasible"
-            technique["maturity"] = maturity_map.get(technique["id"], "feasible")
+        for mitigation in matrix.get("mitigations", []):
+            for entry in mitigation.get("techniques", []):
+                # Entries are either technique IDs or {id, use} dictionaries
+                technique_id = entry["id"] if isinstance(entry, dict) else entry
+                tables['technique-mitigations'][technique_id][mitigation["id"]] = None
 
-    return data
+    for case_study in data.get("case-studies", []):
+        for procedure in case_study["procedure"]:
+            tables['technique-case-studies'][procedure["technique"]][case_study["id"]] = None
 
+    data["relationships"] = {
+        name: {obj_id: list(related_ids) for obj_id, related_ids in table.items()}
+        for name, table in tables.items()
+    }
+
+    return data
 
-def load_atlas_yaml(matrix_yaml_filepath):
+def load_atlas_yaml(matrix_yaml_filepath, cache=None, jobs=1, Loader=None, profiler=None):
     """Returns two dictionaries representing templated ATLAS data as read from the provided YAML files.
 
+    Files matched by a wildcard !include are parsed by a pool of processes when jobs is greater than 1.
+    The provided Loader class, AtlasLoader by default, is used for all included files.
+    The loading of each file and the construction of anchors are recorded on the optional BuildProfiler.
+
     Returns: data, anchors
         data
     """
     # Load yaml with custom loader that supports !include and cross-doc anchors
-    master = yaml.SafeLoader("")
-    with open(matrix_yaml_filepath, "rb") as f:
-        data = yaml_safe_load(f, master=master)
+    if Loader is None:
+        Loader = AtlasLoader
+    master = Loader("")
+    # Included files are loaded through the cache, if any
+    master.cache = cache
+    master.jobs = jobs
+    master.profiler = profiler
+    if cache is not None:
+        cache.record_input(matrix_yaml_filepath)
+    with profile_file(profiler, matrix_yaml_filepath), open(matrix_yaml_filepath, "rb") as f:
+        data = yaml_safe_load(f, Loader=Loader, master=master)
 
     # Construct anchors into dict store and for further parsing
-    const = yaml.constructor.SafeConstructor()
-    anchors = {k: const.construct_document(v) for k, v in master.anchors.items()}
+    with profile_stage(profiler, 'anchors'):
+        const = yaml.constructor.SafeConstructor()
+        anchors = {k: const.construct_document(v) for k, v in master.anchors.items()}
 
     return data, anchors
 
@@ -194,6 +629,30 @@ def compose_document(self):
 # Add functionality to SafeLoader
 yaml.SafeLoader.compose_document = compose_document
 
+if yaml.__with_libyaml__:
+    from yaml.cyaml import CParser
+
+    class AtlasLoader(Composer, CParser, SafeConstructor, Resolver):
+        """Equivalent of SafeLoader that parses with LibYAML, which is several times faster.
+
+        The Python composer runs on top of the LibYAML event stream, as the LibYAML composer
+        keeps its anchors internally and clears them after each document.
+        """
+        def __init__(self, stream):
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+        compose_document = compose_document
+
+    # Loader for standalone YAML documents, such as ATLAS.yaml
+    FastSafeLoader = yaml.CSafeLoader
+else:
+    # PyYAML was built without LibYAML, fall back to the pure Python loader
+    AtlasLoader = yaml.SafeLoader
+    FastSafeLoader = yaml.SafeLoader
+
 # Add !include constructor
 # Adapted from http://code.activestate.com/recipes/577613-yaml-include-support/
 def yaml_include(loader, node):
@@ -221,31 +680,120 @@ def yaml_include(loader, node):
         # Collect documents into a single array
         results = []
         # Get all matching files relative to the directory the input matrix.yaml lives in
-        filepaths = loader.input_dir_path.glob(node.value)
+        filepaths = sorted(loader.input_dir_path.glob(node.value))
+        if getattr(loader, 'cache', None) is not None:
+            # Newly-added or removed files also invalidate the cached build
+            loader.cache.record_glob(loader.input_dir_path, node.value, filepaths)
+        jobs = getattr(loader, 'jobs', 1)
+        if jobs > 1 and len(filepaths) > 1:
+            return load_include_files_parallel(loader, filepaths, jobs)
+
         # Read in each file in name-order and append to results
-        for filepath in sorted(filepaths):
-            with open(filepath) as inputfile:
-                result = yaml_safe_load(inputfile, master=loader)
-                results.append(result)
+        for filepath in filepaths:
+            result = load_include_file(loader, filepath)
+            results.append(result)
 
         return results
 
     elif include_path.is_dir():
         # This is a directory containing data files, representing a matrix
         matrix_filepath = include_path / 'matrix.yaml'
-        with open(matrix_filepath) as matrix_f:
-            result = yaml_safe_load(matrix_f, master=loader)
-            return result
+        return load_include_file(loader, matrix_filepath)
 
     else:
         # Return specified document
-        with open(include_path) as inputfile:
-            return yaml_safe_load(inputfile, master=loader, expect_list=True)
+        return load_include_file(loader, include_path, expect_list=True)
+
+def load_include_file(loader, filepath, expect_list=False):
+    """Returns the document in the specified file, read through the loader's build cache if available."""
+    with profile_file(getattr(loader, 'profiler', None), filepath) as record:
+        if getattr(loader, 'cache', None) is not None:
+            doc, cached = loader.cache.load(filepath, loader, expect_list=expect_list)
+            if record is not None:
+                record['cached'] = cached
+            return doc
+
+        with open(filepath) as inputfile:
+            return yaml_safe_load(inputfile, Loader=type(loader), master=loader, expect_list=expect_list)
 
 # Add custom !include constructor
 yaml.add_constructor("!include", yaml_include, Loader=yaml.SafeLoader)
+yaml.add_constructor("!include", yaml_include, Loader=AtlasLoader)
+
+# Loader class and anchors in scope for files parsed by a process pool worker, see load_include_files_parallel
+_worker_loader = AtlasLoader
+_worker_base_anchors = {}
+
+def _init_include_worker(loader_class, base_anchors):
+    """Sets the loader class and the anchors in scope for files parsed by this worker process."""
+    global _worker_loader, _worker_base_anchors
+    _worker_loader = loader_class
+    _worker_base_anchors = base_anchors
+
+def _parse_include_file(filepath):
+    """Returns the document in the specified file, the anchor nodes it defines, and the seconds and CPU seconds
+    taken to parse it, for use in a worker process."""
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    master = _worker_loader("")
+    master.anchors = dict(_worker_base_anchors)
+    with open(filepath) as inputfile:
+        doc = yaml_safe_load(inputfile, Loader=_worker_loader, master=master)
+    anchors = {k: v for k, v in master.anchors.items() if k not in _worker_base_anchors}
+    return doc, anchors, time.perf_counter() - start, time.process_time() - start_cpu
+
+def load_include_files_parallel(loader, filepaths, jobs):
+    """Returns the documents in the specified files, parsed concurrently by a pool of worker processes.
 
-def yaml_safe_load(stream, Loader=yaml.SafeLoader, master=None, expect_list=False):
+    Each file is parsed with the anchors defined before the wildcard !include in scope,
+    so files cannot reference anchors defined by other files matched by the same wildcard.
+    Documents and anchors are merged in the order of the filepaths, and an anchor defined
+    by more than one file raises a ComposerError.
+    """
+    cache = getattr(loader, 'cache', None)
+    profiler = getattr(loader, 'profiler', None)
+    results = [None] * len(filepaths)
+    keys = [None] * len(filepaths)
+
+    if cache is not None:
+        # Only parse files without a cache entry
+        anchor_scope_digest = cache.anchor_scope_digest(loader.anchors)
+        for i, filepath in enumerate(filepaths):
+            with profile_file(profiler, filepath) as record:
+                content = cache.record_input(filepath)
+                keys[i] = cache.entry_key(content, anchor_scope_digest)
+                if keys[i] is not None:
+                    results[i] = cache.get(keys[i])
+                if record is not None:
+                    record['cached'] = results[i] is not None
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_include_worker, initargs=(type(loader), dict(loader.anchors))) as executor:
+            chunksize = max(1, len(pending) // (jobs * 4))
+            parsed = executor.map(_parse_include_file, [str(filepaths[i]) for i in pending], chunksize=chunksize)
+            for i, (doc, anchors, seconds, cpu_seconds) in zip(pending, parsed):
+                results[i] = doc, anchors
+                if keys[i] is not None:
+                    cache.put(keys[i], doc, anchors)
+                if profiler is not None:
+                    # Measured in the worker process, without memory
+                    profiler.add_file(filepaths[i], seconds, cpu_seconds)
+
+    # Merge in name order, as if the files were loaded one after the other
+    docs = []
+    for doc, anchors in results:
+        for anchor, node in anchors.items():
+            if anchor in loader.anchors:
+                raise yaml.composer.ComposerError(
+                    f"found duplicate anchor {anchor!r}; first occurrence", loader.anchors[anchor].start_mark,
+                    "second occurrence", node.start_mark)
+        loader.anchors.update(anchors)
+        docs.append(doc)
+
+    return docs
+
+def yaml_safe_load(stream, Loader=AtlasLoader, master=None, expect_list=False):
     """Loads the specified file stream while preserving anchors for later use."""
     loader = Loader(stream)
     # Store the input file directory for later joining with !include paths
@@ -253,8 +801,15 @@ def yaml_safe_load(stream, Loader=yaml.SafeLoader, master=None, expect_list=Fals
     #   ex. stream.name is 'matrix.yaml', input_dir_path is Path('.')
     loader.input_dir_path = Path(stream.name).parent
 
+    # Included files share the anchors, build cache, process count, and profiler of the top-level loader
+    loader.cache = None
+    loader.jobs = 1
+    loader.profiler = None
     if master is not None:
         loader.anchors = master.anchors
+        loader.cache = getattr(master, 'cache', None)
+        loader.jobs = getattr(master, 'jobs', 1)
+        loader.profiler = getattr(master, 'profiler', None)
     try:
         doc = loader.get_single_data()
         # Validate format of YAML file
@@ -280,13 +835,9 @@ def create_internal_link(anchor):
     id = anchor.get('id')
     name = anchor.get('name')
     obj_type = anchor.get('object-type')
-    p = inflect.engine()
 
     if (id and name and obj_type):
-        plural = p.plural(obj_type)
-        #If object type is multiple words separated by hyphen, pluralizes last word
-        split_on_hyphen = plural.split("-")
-        link_type = split_on_hyphen[-1]
+        link_type = object_types.link_type(obj_type)
         link = f"[{name}](/{link_type}/{id})"
         return link
     
@@ -294,5 +845,183 @@ def create_internal_link(anchor):
 
 #endregion
 
+#region Incremental build cache
+
+DEFAULT_CACHE_DIR = '.cache/create_matrix'
+
+# Files containing these cannot be cached on their own, as their documents depend on other files
+# i.e. !include directives or YAML aliases, ex. *anchor, referencing anchors defined elsewhere
+REGEX_UNCACHEABLE = re.compile(rb'!include|(?:^|[\s\[\{,])\*[^\s\]\},]', re.MULTILINE)
+
+def sha256_digest(content):
+    """Returns the hex SHA-256 digest of the provided bytes."""
+    return hashlib.sha256(content).hexdigest()
+
+class BuildCache:
+    """Persistent on-disk cache for create_matrix builds.
+
+    Included source files are stored in a pre-parsed (pickled) form keyed by the hash of
+    their contents and of the set of anchor names already defined when they are loaded.
+    Each build also records the hashes of every input and output file so that a build
+    with no changes can be skipped altogether.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        # Source filepath to content hash, for each file read during the current build
+        self.inputs = {}
+        # Wildcard !include directory and pattern, with the list of matching filepaths
+        self.globs = []
+        # Memoized digest of the anchor names in scope, see anchor_scope_digest
+        self._anchor_scope = (None, 0, None)
+
+    def record_input(self, filepath):
+        """Returns the contents of the specified file, recording its hash as an input to the build."""
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        self.inputs[Path(filepath).resolve().as_posix()] = sha256_digest(content)
+        return content
+
+    def record_glob(self, dir_path, pattern, filepaths):
+        """Records the files matched by a wildcard !include pattern."""
+        self.globs.append([
+            Path(dir_path).resolve().as_posix(),
+            pattern,
+            [Path(p).resolve().as_posix() for p in filepaths]
+        ])
+
+    def anchor_scope_digest(self, anchors):
+        """Returns a digest of the anchor names defined so far.
+
+        Anchors are only ever added during a build, so the digest is recomputed only when the count changes.
+        """
+        anchors_id, count, digest = self._anchor_scope
+        if anchors_id != id(anchors) or count != len(anchors):
+            digest = sha256_digest('\n'.join(sorted(anchors)).encode())
+            self._anchor_scope = (id(anchors), len(anchors), digest)
+        return digest
+
+    def entry_key(self, content, anchor_scope_digest, expect_list=False):
+        """Returns the key for the parsed form of a file's contents, or None if the file cannot be cached on its own."""
+        if REGEX_UNCACHEABLE.search(content):
+            return None
+
+        return sha256_digest('\n'.join([
+            yaml.__version__,
+            sha256_digest(content),
+            anchor_scope_digest,
+            str(expect_list)
+        ]).encode())
+
+    def _entry_filepath(self, key):
+        return self.cache_dir / 'parsed' / key[:2] / f'{key}.pickle'
+
+    def get(self, key):
+        """Returns the cached (document, anchors) pair for the key, or None if there is no usable entry."""
+        try:
+            with open(self._entry_filepath(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Missing or unreadable entry
+            return None
+
+    def put(self, key, doc, anchors):
+        """Stores the document and the anchor nodes it defines under the key."""
+        write_atomic_bytes(self._entry_filepath(key), pickle.dumps((doc, anchors), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def load(self, filepath, master, expect_list=False):
+        """Returns the document in the specified file, adding its anchors to the master loader,
+        and whether it was read from the cache.
+
+        Parses the file and stores the result when no cache entry matches the file contents and anchors in scope.
+        """
+        content = self.record_input(filepath)
+        key = self.entry_key(content, self.anchor_scope_digest(master.anchors), expect_list)
+
+        entry = self.get(key) if key is not None else None
+        if entry is not None:
+            doc, anchors = entry
+            master.anchors.update(anchors)
+            return doc, True
+
+        # Stream for the YAML loader, which determines relative !include paths from the stream name
+        stream = io.BytesIO(content)
+        stream.name = str(filepath)
+
+        # Anchors defined by this file are the ones added during its load
+        existing_anchors = set(master.anchors)
+        doc = yaml_safe_load(stream, Loader=type(master), master=master, expect_list=expect_list)
+
+        if key is not None:
+            self.put(key, doc, {k: v for k, v in master.anchors.items() if k not in existing_anchors})
+        return doc, False
+
+    def _build_record_filepath(self, data_filepath, output_dir):
+        """Returns the path to the record of the last build of the data file into the output directory."""
+        key = sha256_digest(f'{Path(data_filepath).resolve()}\n{Path(output_dir).resolve()}'.encode())
+        return self.cache_dir / 'builds' / f'{key}.json'
+
+    @staticmethod
+    def tool_digest():
+        """Returns a digest of the build tooling, so that changes to it invalidate previous builds."""
+        tool_sources = sorted(Path(__file__).parent.glob('*.py'))
+        parts = [yaml.__version__, jinja2.__version__]
+        parts.extend(sha256_digest(p.read_bytes()) for p in tool_sources)
+        return sha256_digest('\n'.join(parts).encode())
+
+    def is_up_to_date(self, data_filepath, output_dir, options=None):
+        """Returns True if the inputs, tooling, options, and outputs of the last recorded build are unchanged."""
+        record_filepath = self._build_record_filepath(data_filepath, output_dir)
+        try:
+            with open(record_filepath) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if record.get('tool') != self.tool_digest() or record.get('options') != options:
+            return False
+
+        for filepath, digest in {**record['inputs'], **record['outputs']}.items():
+            try:
+                if sha256_digest(Path(filepath).read_bytes()) != digest:
+                    return False
+            except OSError:
+                # File was removed
+                return False
+
+        for dir_path, pattern, filepaths in record['globs']:
+            current_filepaths = sorted(Path(dir_path).glob(pattern))
+            if [p.as_posix() for p in current_filepaths] != filepaths:
+                return False
+
+        return True
+
+    def record_build(self, data_filepath, output_dir, output_filepaths, options=None):
+        """Records the inputs, options, and outputs of a completed build."""
+        record = {
+            'tool': self.tool_digest(),
+            'options': options,
+            'inputs': self.inputs,
+            'globs': self.globs,
+            'outputs': {Path(p).resolve().as_posix(): sha256_digest(Path(p).read_bytes()) for p in output_filepaths}
+        }
+        record_filepath = self._build_record_filepath(data_filepath, output_dir)
+        write_atomic_bytes(record_filepath, json.dumps(record, indent=2).encode())
+
+def write_atomic_bytes(filepath, content):
+    """Writes the bytes to the specified file via a temporary file, creating directories as needed."""
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_filepath = tempfile.mkstemp(dir=filepath.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(temp_filepath, filepath)
+    except BaseException:
+        os.remove(temp_filepath)
+        raise
+
+#endregion
+
 if __name__ == "__main__":
     main()
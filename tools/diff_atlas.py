@@ -0,0 +1,194 @@
+from argparse import ArgumentParser
+import json
+from pathlib import Path
+
+import yaml
+
+from tools.atlas_index import iter_data_objects
+from tools.canonical import content_hash
+from tools.create_matrix import FastSafeLoader, object_types
+from tools.output_formats import serialize_date
+
+"""
+Compares two ATLAS releases by object ID.
+
+The report lists the added, removed, and modified objects of each type, i.e. techniques, with the old
+and new values of each changed field of modified objects. The patch is an RFC 6902 JSON Patch that
+transforms the old release, as in ATLAS.json, into the new one.
+
+Objects are compared by content hash first, so only objects that changed are compared field by field.
+
+Run this script with `python -m tools.diff_atlas <old ATLAS.yaml> <new ATLAS.yaml>` to allow for local imports.
+"""
+
+def load_atlas_file(filepath):
+    """Returns the ATLAS data in an ATLAS.yaml or ATLAS.json file."""
+    with open(filepath) as f:
+        if Path(filepath).suffix == '.json':
+            return json.load(f)
+        return yaml.load(f, Loader=FastSafeLoader)
+
+def keyed_objects(data):
+    """Returns the data objects in matrices and at the top level by ID, in data order.
+
+    The first definition of an ID wins, i.e. for objects repeated across matrices.
+    """
+    objects = {}
+    for matrix in data.get('matrices', []):
+        for obj in iter_data_objects(matrix):
+            objects.setdefault(obj['id'], obj)
+    for obj in iter_data_objects(data):
+        objects.setdefault(obj['id'], obj)
+    return objects
+
+def diff_atlas(old_data, new_data):
+    """Returns the objects added, removed, and modified between ATLAS data, keyed by the plural of their object type.
+
+    Each object type maps to:
+        added - IDs of objects only in the new data
+        removed - IDs of objects only in the old data
+        modified - ID to field name to the 'old' and 'new' values of the field, either omitted if the field is absent
+    """
+    old_objects = keyed_objects(old_data)
+    new_objects = keyed_objects(new_data)
+
+    report = {}
+
+    def changes_for(obj):
+        plural = object_types.plural(obj.get('object-type', 'object'))
+        return report.setdefault(plural, {'added': [], 'removed': [], 'modified': {}})
+
+    for obj_id, obj in old_objects.items():
+        if obj_id not in new_objects:
+            changes_for(obj)['removed'].append(obj_id)
+
+    for obj_id, obj in new_objects.items():
+        old_obj = old_objects.get(obj_id)
+        if old_obj is None:
+            changes_for(obj)['added'].append(obj_id)
+        elif content_hash(old_obj) != content_hash(obj):
+            changes_for(obj)['modified'][obj_id] = diff_fields(old_obj, obj)
+
+    return report
+
+def diff_fields(old_obj, new_obj):
+    """Returns the field name to the 'old' and 'new' values of each field that differs between the objects."""
+    fields = {}
+    for key in {**old_obj, **new_obj}:
+        if key in old_obj and key in new_obj and old_obj[key] == new_obj[key]:
+            continue
+        change = {}
+        if key in old_obj:
+            change['old'] = old_obj[key]
+        if key in new_obj:
+            change['new'] = new_obj[key]
+        fields[key] = change
+    return fields
+
+#region JSON Patch
+
+def json_patch(old_data, new_data):
+    """Returns the RFC 6902 JSON Patch operations that transform the old data into the new data.
+
+    Lists of objects with IDs, i.e. matrices and techniques, are matched by ID, so that changed objects are
+    patched in place and other objects are added, removed, or moved. Other lists are replaced when they differ.
+    """
+    operations = []
+    _diff_value(old_data, new_data, '', operations)
+    return operations
+
+def escape_pointer_token(key):
+    """Returns the key escaped for use in a JSON Pointer, as in RFC 6901."""
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+def _diff_value(old, new, path, operations):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                operations.append({'op': 'remove', 'path': f'{path}/{escape_pointer_token(key)}'})
+        for key, value in new.items():
+            key_path = f'{path}/{escape_pointer_token(key)}'
+            if key not in old:
+                operations.append({'op': 'add', 'path': key_path, 'value': value})
+            else:
+                _diff_value(old[key], value, key_path, operations)
+    elif isinstance(old, list) and isinstance(new, list) and _is_keyed_list(old) and _is_keyed_list(new):
+        _diff_keyed_list(old, new, path, operations)
+    elif old != new:
+        operations.append({'op': 'replace', 'path': path, 'value': new})
+
+def _is_keyed_list(values):
+    """Returns True if the list holds only dictionaries with unique IDs."""
+    ids = set()
+    for value in values:
+        if not isinstance(value, dict) or 'id' not in value or value['id'] in ids:
+            return False
+        ids.add(value['id'])
+    return len(ids) > 0
+
+def _diff_keyed_list(old, new, path, operations):
+    """Adds the operations transforming one list of objects with IDs into the other, matching objects by ID."""
+    old_objects = {obj['id']: obj for obj in old}
+    new_ids = {obj['id'] for obj in new}
+
+    # Remove objects from the end first, so that the indices of earlier objects stay valid
+    for index in reversed(range(len(old))):
+        if old[index]['id'] not in new_ids:
+            operations.append({'op': 'remove', 'path': f'{path}/{index}'})
+
+    # IDs in the list as patched so far
+    current_ids = [obj['id'] for obj in old if obj['id'] in new_ids]
+
+    for index, obj in enumerate(new):
+        obj_id = obj['id']
+        index_path = f'{path}/{index}'
+        if obj_id not in old_objects:
+            operations.append({'op': 'add', 'path': index_path, 'value': obj})
+            current_ids.insert(index, obj_id)
+            continue
+
+        if current_ids[index] != obj_id:
+            # Only reordered objects are searched for
+            from_index = current_ids.index(obj_id, index)
+            operations.append({'op': 'move', 'from': f'{path}/{from_index}', 'path': index_path})
+            current_ids.insert(index, current_ids.pop(from_index))
+
+        old_obj = old_objects[obj_id]
+        if content_hash(old_obj) != content_hash(obj):
+            _diff_value(old_obj, obj, index_path, operations)
+
+#endregion
+
+def format_report(report):
+    """Returns a line per object type with the number of objects added, removed, and modified."""
+    lines = []
+    for plural, changes in report.items():
+        lines.append(f'{plural}: {len(changes["added"])} added, {len(changes["removed"])} removed, {len(changes["modified"])} modified')
+    return '\n'.join(lines) if lines else 'No changes'
+
+def main():
+    parser = ArgumentParser('Compares two ATLAS releases, reporting the objects added, removed, and modified between them.')
+    parser.add_argument("old", type=str, help="Path to the old ATLAS.yaml or ATLAS.json")
+    parser.add_argument("new", type=str, help="Path to the new ATLAS.yaml or ATLAS.json")
+    parser.add_argument("--output", "-o", type=str, help="Path to write the report to as JSON")
+    parser.add_argument("--patch", "-p", type=str, help="Path to write the RFC 6902 JSON Patch from the old to the new release to")
+    args = parser.parse_args()
+
+    old_data = load_atlas_file(args.old)
+    new_data = load_atlas_file(args.new)
+
+    report = diff_atlas(old_data, new_data)
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, default=serialize_date, indent=4)
+        print(f'Wrote {args.output}')
+
+    if args.patch:
+        with open(args.patch, 'w') as f:
+            json.dump(json_patch(old_data, new_data), f, default=serialize_date, indent=4)
+        print(f'Wrote {args.patch}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import os
+from pathlib import Path
+import threading
+import time
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    # Optional dependency, changes are detected by polling without it
+    Observer = None
+
+"""
+Detects changes to files, for rebuilding or reloading data when it is edited.
+
+Uses file system notifications (i.e. inotify on Linux) via the watchdog package when it is installed,
+and otherwise periodically compares file modification times and sizes.
+"""
+
+# Watchdog event types that indicate a file was changed, rather than only accessed
+CHANGE_EVENT_TYPES = {'created', 'deleted', 'modified', 'moved'}
+
+class FileWatcher:
+    """Waits for changes to the files in the specified directories, or to specified individual files."""
+
+    def __init__(self, paths, interval=1.0, debounce=0.2, use_notifications=True):
+        self.paths = [Path(p) for p in paths]
+        # Seconds between polls, when not using notifications
+        self.interval = interval
+        # Seconds without further changes before a change is reported, as editors often write files in several steps
+        self.debounce = debounce
+
+        self._changed = threading.Event()
+        self._observer = None
+        if use_notifications and Observer is not None:
+            self._start_observer()
+        else:
+            self._snapshot = self._scan()
+
+    @property
+    def mode(self):
+        """Returns the change detection method, 'notify' or 'poll'."""
+        return 'notify' if self._observer is not None else 'poll'
+
+    def _start_observer(self):
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Ignore events for reading files, i.e. the build itself opening them
+                if event.event_type not in CHANGE_EVENT_TYPES:
+                    return
+                if watcher._is_watched(event.src_path) or watcher._is_watched(getattr(event, 'dest_path', '')):
+                    watcher._changed.set()
+
+        self._observer = Observer()
+        for path in self.paths:
+            if path.is_dir():
+                self._observer.schedule(Handler(), str(path), recursive=True)
+            else:
+                # Individual files are watched via their directory, as they may be replaced rather than modified
+                self._observer.schedule(Handler(), str(path.parent), recursive=False)
+        self._observer.start()
+
+    def _is_watched(self, event_path):
+        """Returns True if the path is, or is in, one of the watched paths."""
+        if not event_path:
+            return False
+        event_path = Path(os.fsdecode(event_path)).resolve()
+        for path in self.paths:
+            path = path.resolve()
+            if event_path == path or (path.is_dir() and path in event_path.parents):
+                return True
+        return False
+
+    def _scan(self):
+        """Returns the modification time and size of each watched file."""
+        snapshot = {}
+        for path in self.paths:
+            filepaths = path.rglob('*') if path.is_dir() else [path]
+            for filepath in filepaths:
+                try:
+                    stat = filepath.stat()
+                except OSError:
+                    # Removed since listing, or an individual file that does not exist yet
+                    continue
+                snapshot[filepath] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll(self):
+        """Returns True if any watched file was added, removed, or modified since the last poll."""
+        snapshot = self._scan()
+        changed = snapshot != self._snapshot
+        self._snapshot = snapshot
+        return changed
+
+    def wait(self, timeout=None):
+        """Blocks until a watched file changes, returning False if the timeout in seconds expires first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        if self._observer is not None:
+            if not self._changed.wait(timeout):
+                return False
+            # Wait until changes settle
+            self._changed.clear()
+            while self._changed.wait(self.debounce):
+                self._changed.clear()
+            return True
+
+        while not self._poll():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.interval)
+        # Wait until changes settle
+        time.sleep(self.debounce)
+        while self._poll():
+            time.sleep(self.debounce)
+        return True
+
+    def close(self):
+        """Stops watching for changes."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,246 @@
+from argparse import ArgumentParser
+import datetime
+from pathlib import Path
+import random
+
+import yaml
+
+from tools.create_matrix import load_atlas_data
+
+"""
+Generates synthetic ATLAS data source trees for benchmarking, scaled from the data in this repository.
+
+The generated tree has the same layout as data/, with a data.yaml, a matrix.yaml including anchored
+tactics, techniques, and mitigations, and one file per case study. Descriptions link to other objects
+with create_internal_link and all references use anchor template expressions, so the output passes
+through the same load, render, and format stages as the real data.
+
+Run this script with `python -m tools.generate_corpus --scale 10 --output <directory>` to allow for local imports.
+"""
+
+# Entry point of the data this corpus is scaled from
+DATA_FILEPATH = 'data/data.yaml'
+
+# Vocabulary for synthetic names and descriptions
+WORDS = (
+    'adversary model data training inference attack system access artifact dataset victim '
+    'deploy evade poison extract craft query input output gradient weights pipeline service '
+    'network target detection classifier sample adversarial research public private cloud '
+    'api endpoint credential prompt injection embedding label feature supply chain'
+).split()
+
+def count_objects(data):
+    """Returns the number of each type of object, and the mean procedure steps per case study, in ATLAS data."""
+    techniques = [technique for matrix in data['matrices'] for technique in matrix['techniques']]
+    case_studies = data.get('case-studies', [])
+    return {
+        'tactics': sum(len(matrix['tactics']) for matrix in data['matrices']),
+        'techniques': sum(1 for technique in techniques if 'subtechnique-of' not in technique),
+        'subtechniques': sum(1 for technique in techniques if 'subtechnique-of' in technique),
+        'mitigations': sum(len(matrix.get('mitigations', [])) for matrix in data['matrices']),
+        'case-studies': len(case_studies),
+        'procedure-steps': round(sum(len(cs['procedure']) for cs in case_studies) / max(len(case_studies), 1))
+    }
+
+def make_id(prefix, index, width=4):
+    """Returns an ATLAS ID for the object at the index, ex. AML.T0012.
+
+    IDs beyond the 4-digit range continue with a numbered prefix, ex. AML1.T0000, which the ID schema allows.
+    """
+    block, number = divmod(index, 10 ** width)
+    id_prefix = 'AML.' if block == 0 else f'AML{block}.'
+    return f'{id_prefix}{prefix}{number:0{width}d}'
+
+# Entry point and matrix files, with the same includes as in data/
+DATA_YAML = """---
+
+id: ATLAS
+name: Adversarial Threat Landscape for AI Systems
+version: 0.0.0
+
+matrices:
+  - !include .
+
+data:
+  - !include case-studies/*.yaml
+"""
+
+MATRIX_YAML = """---
+
+id: ATLAS
+name: ATLAS Matrix
+
+{tactics}
+data:
+  - !include tactics.yaml
+  - !include techniques.yaml
+  - !include mitigations.yaml
+"""
+
+class CorpusGenerator:
+    """Generates a synthetic ATLAS data source tree with the specified number of each type of object."""
+
+    def __init__(self, counts, seed=0):
+        self.counts = counts
+        self.random = random.Random(seed)
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    def sentence(self):
+        return self.words(self.random.randint(8, 20)).capitalize() + '.'
+
+    def description(self, link_anchors=()):
+        """Returns a paragraph of sentences, linking to each of the anchored objects."""
+        sentences = [self.sentence() for _ in range(self.random.randint(2, 5))]
+        for anchor in link_anchors:
+            sentences.insert(self.random.randrange(len(sentences) + 1), f'See {{{{ create_internal_link({anchor}) }}}}.')
+        return '\n'.join(sentences)
+
+    def name(self):
+        return self.words(self.random.randint(2, 4)).title()
+
+    def generate(self, output_dir):
+        """Writes the source tree to the output directory, returning the path to its data.yaml."""
+        output_dir = Path(output_dir)
+        case_study_dir = output_dir / 'case-studies'
+        case_study_dir.mkdir(parents=True, exist_ok=True)
+
+        tactic_anchors = [f'tactic_{i}' for i in range(self.counts['tactics'])]
+        technique_anchors = [f'technique_{i}' for i in range(self.counts['techniques'])]
+
+        tactics = []
+        for i, anchor in enumerate(tactic_anchors):
+            tactics.append((anchor, {
+                'id': make_id('TA', i),
+                'name': self.name(),
+                'description': self.description(),
+                'object-type': 'tactic'
+            }))
+
+        # Technique anchor to the anchors of its tactics, or its parent's tactics for subtechniques
+        technique_tactics = {}
+
+        # Techniques link to earlier techniques, so that anchors are defined before use
+        techniques = []
+        for i, anchor in enumerate(technique_anchors):
+            linked = self.random.sample(technique_anchors[:i], min(i, self.random.randint(0, 2)))
+            technique_tactics[anchor] = self.random.sample(tactic_anchors, min(len(tactic_anchors), self.random.randint(1, 2)))
+            techniques.append((anchor, {
+                'id': make_id('T', i),
+                'name': self.name(),
+                'description': self.description(linked),
+                'object-type': 'technique',
+                'tactics': [f'{{{{{tactic}.id}}}}' for tactic in technique_tactics[anchor]]
+            }))
+
+        # Subtechniques are numbered within their parent technique
+        subtechnique_counts = {}
+        subtechnique_anchors = []
+        for i in range(self.counts['subtechniques']):
+            parent_index = self.random.randrange(len(technique_anchors))
+            number = subtechnique_counts.get(parent_index, 0)
+            if number > 999:
+                continue
+            subtechnique_counts[parent_index] = number + 1
+            anchor = f'subtechnique_{i}'
+            subtechnique_anchors.append(anchor)
+            technique_tactics[anchor] = technique_tactics[technique_anchors[parent_index]]
+            techniques.append((anchor, {
+                'id': f'{make_id("T", parent_index)}.{number:03d}',
+                'name': self.name(),
+                'description': self.description([technique_anchors[parent_index]]),
+                'object-type': 'technique',
+                'subtechnique-of': f'{{{{{technique_anchors[parent_index]}.id}}}}'
+            }))
+
+        all_technique_anchors = technique_anchors + subtechnique_anchors
+        mitigations = []
+        for i in range(self.counts['mitigations']):
+            mitigated = self.random.sample(all_technique_anchors, min(len(all_technique_anchors), self.random.randint(1, 8)))
+            mitigations.append((f'mitigation_{i}', {
+                'id': make_id('M', i),
+                'name': self.name(),
+                'description': self.description(),
+                'object-type': 'mitigation',
+                'techniques': [{'id': f'{{{{{technique}.id}}}}', 'use': self.sentence()} for technique in mitigated]
+            }))
+
+        write_anchored_objects(output_dir / 'tactics.yaml', tactics)
+        write_anchored_objects(output_dir / 'techniques.yaml', techniques)
+        write_anchored_objects(output_dir / 'mitigations.yaml', mitigations)
+
+        tactic_ids = yaml.dump({'tactics': [f'{{{{{anchor}.id}}}}' for anchor in tactic_anchors]}, default_flow_style=False)
+        (output_dir / 'matrix.yaml').write_text(MATRIX_YAML.format(tactics=tactic_ids))
+
+        for i in range(self.counts['case-studies']):
+            case_study = self.case_study(make_id('CS', i), technique_tactics)
+            with open(case_study_dir / f'{case_study["id"]}.yaml', 'w') as f:
+                yaml.dump(case_study, f, default_flow_style=False, explicit_start=True, sort_keys=False)
+
+        data_filepath = output_dir / 'data.yaml'
+        data_filepath.write_text(DATA_YAML)
+        return data_filepath
+
+    def case_study(self, case_study_id, technique_tactics):
+        """Returns a case study with procedure steps using random techniques, each under one of its tactics."""
+        technique_anchors = list(technique_tactics)
+        steps = max(1, round(self.random.gauss(self.counts['procedure-steps'], 2)))
+        step_techniques = [self.random.choice(technique_anchors) for _ in range(steps)]
+        return {
+            'id': case_study_id,
+            'name': self.name(),
+            'object-type': 'case-study',
+            'summary': self.description(),
+            'incident-date': datetime.date(2020, 1, 1) + datetime.timedelta(days=self.random.randrange(2000)),
+            'incident-date-granularity': self.random.choice(['YEAR', 'MONTH', 'DATE']),
+            'procedure': [
+                {
+                    'tactic': f'{{{{{self.random.choice(technique_tactics[technique])}.id}}}}',
+                    'technique': f'{{{{{technique}.id}}}}',
+                    'description': self.description(self.random.sample(technique_anchors, self.random.randint(0, 1)))
+                }
+                for technique in step_techniques
+            ],
+            'target': self.name(),
+            'actor': self.name(),
+            'case-study-type': self.random.choice(['exercise', 'incident']),
+            'references': [{'title': self.sentence(), 'url': f'https://example.com/{case_study_id}'}]
+        }
+
+def write_anchored_objects(filepath, anchored_objects):
+    """Writes a YAML document listing the objects, each marked with its anchor name."""
+    with open(filepath, 'w') as f:
+        f.write('---\n\n')
+        for anchor, obj in anchored_objects:
+            item = yaml.dump([obj], default_flow_style=False, sort_keys=False)
+            # Start the list item with the anchor, as in the files in data/
+            f.write(f'- &{anchor}\n  ' + item[2:] + '\n')
+
+def scale_counts(counts, scale, case_studies=None):
+    """Returns the object counts, as returned by count_objects, multiplied by the scale.
+
+    The number of case studies can instead be set directly.
+    """
+    scaled = {key: max(1, round(count * scale)) for key, count in counts.items()}
+    # Procedure length is an average, and stays the same at every scale
+    scaled['procedure-steps'] = counts['procedure-steps']
+    if case_studies is not None:
+        scaled['case-studies'] = case_studies
+    return scaled
+
+def main():
+    parser = ArgumentParser('Generates a synthetic ATLAS data source tree, scaled from the data in this repository.')
+    parser.add_argument("--output", "-o", type=str, required=True, help="Output directory")
+    parser.add_argument("--scale", "-s", type=float, default=1, help="Multiple of the number of each type of object in the current data")
+    parser.add_argument("--case-studies", type=int, help="Number of case studies, instead of scaling the current number")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, the same seed and counts generate the same files")
+    parser.add_argument("--data", "-d", type=str, default=DATA_FILEPATH, help="Path to the data.yaml to scale from")
+    args = parser.parse_args()
+
+    counts = scale_counts(count_objects(load_atlas_data(args.data)), args.scale, args.case_studies)
+    data_filepath = CorpusGenerator(counts, seed=args.seed).generate(args.output)
+    print(f'Wrote {data_filepath} with ' + ', '.join(f'{count} {key}' for key, count in counts.items() if key != 'procedure-steps'))
+
+if __name__ == '__main__':
+    main()
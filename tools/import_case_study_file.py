@@ -1,11 +1,13 @@
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from functools import partial
 from pathlib import Path
 import re
 
 import yaml
 
-from tools.create_matrix import load_atlas_yaml
+from tools.create_matrix import atomic_output, BuildCache, DEFAULT_CACHE_DIR, FastSafeLoader, load_atlas_yaml
 
 # Local directory
 from schemas.atlas_id import FULL_ID_PATTERN, ID_PREFIX_PATTERN
@@ -20,6 +22,11 @@ ATLAS IDs are converted to expressions that use ATLAS YAML anchors.
 
 Run this script with `python -m tools.import_case_study_file <filepath>` to allow for local imports.
 """
+# Source of the tactics, techniques, and mitigations that case studies refer to
+MATRIX_FILEPATH = 'data/matrix.yaml'
+# Output directory, assumed to be from root project dir
+CASE_STUDY_DIR = Path('data/case-studies')
+
 # Numeric portion of an ATLAS case study ID
 REGEX_CS_ID_NUM = re.compile(rf'{ID_PREFIX_PATTERN}CS(\d+)')
 # Match for any ATLAS tactic, technique, or subtechnique ID
@@ -27,186 +34,185 @@ REGEX_CS_ID_NUM = re.compile(rf'{ID_PREFIX_PATTERN}CS(\d+)')
 REGEX_ID = re.compile(FULL_ID_PATTERN)
 # Markdown link to a tactics or techniques page - captures title and ID part of URL
 REGEX_INTERNAL_LINK = re.compile(r'\[([^\[]+)\]\(\/(?:[a-z]+)\/(.*?)\)')
-# Captures string version of 'incident-date: YYYY-MM-DD', trimming off end of fully-formatted ISO
-# ex.  !!timestamp "2021-11-01T00:00:00.000Z", !!timestamp "2022-02-15 02:40:33+00:00"
-REGEX_INCIDENT_DATE = re.compile(r'!!timestamp "(\d{4}-\d{2}-\d{2})(?:[\d:\.+TZ ]+)?"')
+# Either of the above, whichever starts first, as a link is matched before the IDs it contains
+REGEX_TEMPLATE_TOKEN = re.compile(rf'(?P<link>{REGEX_INTERNAL_LINK.pattern})|(?P<id>{FULL_ID_PATTERN})')
 
 def main():
     parser = ArgumentParser('Imports case study files into ATLAS data as newly-IDed files.')
     parser.add_argument("files", type=str, nargs="+", help="Path to case study file(s)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Number of processes used to read and convert the case study files")
+    parser.add_argument("--no-cache", action="store_true", help="Parse the matrix files for anchors without using the build cache of tools/create_matrix.py")
     args = parser.parse_args()
 
     # Add multiline YAML support to dump
     # https://github.com/yaml/pyyaml/issues/240#issuecomment-1018712495
     yaml.add_representer(str, str_presenter)
 
-    # Construct dictionary of ATLAS IDs to anchor variable names
-    _, anchor2obj = load_atlas_yaml('data/matrix.yaml')
+    # Construct dictionary of ATLAS IDs to anchor variable names, once for all files
+    # Matrix files parsed by previous builds or imports are read from the build cache
+    cache = None if args.no_cache else BuildCache(DEFAULT_CACHE_DIR)
+    _, anchor2obj = load_atlas_yaml(MATRIX_FILEPATH, cache=cache)
     id2anchor = {obj['id']: anchor for (anchor, obj) in anchor2obj.items()}
 
-    # Use ID-to-anchor dictionary in regex sub handlers
-    replace_link_anchor = partial(replace_link, id2anchor)
-    replace_id_anchor = partial(replace_id, id2anchor)
-
-    # Parse and output case study files
-    for file in args.files:
-
-        # Find next ATLAS ID and path to that new YAML file in data/case-studies/
-        import_filepath = find_next_filepath()
-        new_id = import_filepath.stem
-
-        # read_case_study_file(file, sub_id_anchor, new_filepath)
-
-        with open(file, 'r') as f:
-            # Read in file
-            data = yaml.safe_load(f)
-
-            # Check if version in metadata is up to date
-            if 'meta' in data:
-                meta = data['meta']
-                if 'version' not in meta or meta['version'] != CASE_STUDY_VERSION:
-                    raise Exception('Your case study is out of date. The current schema version is v'+ CASE_STUDY_VERSION + '.')
-
-            # Case study file data is held in 'study' key
-            case_study = data['study']
-
-            # Convert to string representation for regex
-            data_str = yaml.dump(case_study, default_flow_style=False, sort_keys=False, default_style='"')
-
-            # Replace link anchors with template expressions
-            data_str = REGEX_INTERNAL_LINK.sub(replace_link_anchor, data_str)
-            # Replace IDs with template expressions
-            data_str = REGEX_ID.sub(replace_id_anchor, data_str)
-            # Trim incident dates, which may be in full ISO8601 format
-            data_str = REGEX_INCIDENT_DATE.sub(replace_timestamp, data_str)
-
-            # Load back in from string representation
-            case_study = yaml.safe_load(data_str)
-
-            # Strip newlines on summary
-            case_study['summary'] = case_study['summary'].strip()
-            # Strip newlines on procedure descriptions
-            for step in case_study['procedure']:
-                step['description'] = step['description'].strip()
+    # Parse and convert all files before writing any, so that an invalid file stops the import
+    case_studies = read_case_study_files(args.files, id2anchor, jobs=args.jobs)
 
-            # Add ID and object-type fields to case-study if keys are not found
-            if 'id' not in case_study:
-                case_study['id'] = new_id
-                case_study['object-type'] = 'case-study'
+    # Reserve a contiguous block of IDs for case studies without one, after any IDs in use
+    new_ids = iter(reserve_case_study_ids(
+        sum(1 for case_study in case_studies if 'id' not in case_study),
+        [case_study['id'] for case_study in case_studies if 'id' in case_study]
+    ))
 
-            # Checks ID of imported case study file to check whether or not this study already exists and should be overwritten
-            is_existing_study, existing_file_path = is_existing_filepath(case_study['id'])
+    for file, case_study in zip(args.files, case_studies):
+        # Case studies with an ID, i.e. an existing case study or a custom ID, are written to that ID's file
+        new_id = case_study['id'] if 'id' in case_study else next(new_ids)
 
-            # Checks if user inputted custom ID name to be used as file name
-            if not is_existing_study and case_study['id'] != new_id:
-                # Change new id
-                new_id = case_study['id']
-                # Change path to match user custom ID
-                case_study_dir = Path('data/case-studies')
-                import_filepath = case_study_dir / f'{new_id}.yaml'
+        # Add new ID and case study object type at beginning of dict
+        new_case_study = {
+            'id': new_id,
+            'object-type': 'case-study'
+        }
+        new_case_study.update(case_study)
 
-            # Add new ID and case study object type at beginning of dict
-            new_case_study = {
-                'id': new_id,
-                'object-type': 'case-study'
-            }
-            new_case_study.update(case_study)
+        # Write out new individual case study file or overwrite an existing one
+        import_filepath = CASE_STUDY_DIR / f'{new_id}.yaml'
+        with atomic_output(import_filepath) as o:
+            yaml.dump(new_case_study, o, default_flow_style=False, explicit_start=True, sort_keys=False)
 
-            # Changes the file path for the import if case study exists
-            if is_existing_study:
-                import_filepath = existing_file_path
-
-            # Write out new individual case study file or overwrite depending on previous conditional
-            with open(import_filepath, 'w') as o:
-                yaml.dump(new_case_study, o, default_flow_style=False, explicit_start=True, sort_keys=False)
-
-            print(f'{import_filepath} <- {file}')
+        print(f'{import_filepath} <- {file}')
 
     print(f'\nImported {len(args.files)} file(s) - review, run pytest for spellcheck exclusions, then run tools/create_matrix.py for ATLAS.yaml.')
 
-def is_existing_filepath(imported_case_study_id):
-    """Returns a Path to an existing case study YAML file with matching ATLAS ID to the soon to be imported study."""
-    # Open output directory, assumed to be from root project dir
-    case_study_dir = Path('data/case-studies')
-    # Create a new path using the ID of the imported case study to compare with existing paths
-    imported_case_study_path = case_study_dir / f'{imported_case_study_id}.yaml'
-
-    # Return filepath if exists and is a file
-    if imported_case_study_path.is_file():
-        return True, imported_case_study_path
-    return False, ''
-
-def find_next_filepath():
-    """Returns a Path to a case study YAML file with next available ATLAS ID."""
-    # Open output directory, assumed to be from root project dir
-    case_study_dir = Path('data/case-studies')
-    # Retrieve all YAML files and get the last file in alphabetical order
-    filepaths = sorted(case_study_dir.glob('*.yaml'))
-    # Filepath with highest ID number
-    latest_filepath = filepaths[-1]
-
-    # Parse out the numeric portion of the case study ID filename
-    match = REGEX_CS_ID_NUM.match(latest_filepath.stem)
-
-    if match:
-        # Only 1 match expected, i.e. 0015
-        cur_id_num_str = match.groups()[0]
-        # Get next integer, i.e. 16
-        next_id_num = int(cur_id_num_str) + 1
-        # Padded by zeros, i.e. 0016
-        next_id_num_str = '{:04d}'.format(next_id_num)
-        # Replace current number with the next increment
-        next_filepath_str = latest_filepath.as_posix().replace(cur_id_num_str, next_id_num_str)
-        # Return as a Path
-        return Path(next_filepath_str)
-
-    # Otherwise no case study ID match
-    return None
-
-def replace_timestamp(match):
-    """Returns a string representation of a YAML timestamp with only the YYYY-MM-DD date portion."""
-    if match:
-        date = match.group(1)
-
-        return f'!!timestamp "{date}"'
+def read_case_study_files(filepaths, id2anchor, jobs=1):
+    """Returns the templatized case study in each website case study file, in order.
 
+    Files are read in a pool of processes when jobs is greater than 1.
+    """
+    read_file = partial(read_case_study_file, templatizer=CaseStudyTemplatizer(id2anchor))
+    if jobs <= 1 or len(filepaths) <= 1:
+        return [read_file(filepath) for filepath in filepaths]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Batches of files per task limit the number of times the templatizer is sent to workers
+        chunksize = max(1, len(filepaths) // (jobs * 4))
+        return list(executor.map(read_file, filepaths, chunksize=chunksize))
+
+def read_case_study_file(filepath, templatizer):
+    """Returns the templatized case study in a website case study file, with an id key only if the file specifies one."""
+    with open(filepath, 'r') as f:
+        # Read in file
+        data = yaml.load(f, Loader=FastSafeLoader)
+
+    # Check if version in metadata is up to date
+    version_error = case_study_version_error(data)
+    if version_error:
+        raise Exception(f'{filepath}: {version_error}')
+
+    # Case study file data is held in 'study' key
+    return templatizer.templatize(data['study'])
+
+def case_study_version_error(data):
+    """Returns an error message if the metadata of a website case study file is not of the current schema version, otherwise None."""
+    if 'meta' in data:
+        meta = data['meta']
+        if not isinstance(meta, dict) or meta.get('version') != CASE_STUDY_VERSION:
+            return 'Your case study is out of date. The current schema version is v' + CASE_STUDY_VERSION + '.'
     return None
 
-def replace_id(id2anchor, match):
-    """Returns a string Jinja expression that accesses the id key of the anchor.
+def reserve_case_study_ids(count, used_ids=()):
+    """Returns the next count of available case study IDs, following the highest ID in data/case-studies and in used_ids."""
+    # Parse out the numeric portion of the case study ID filenames, i.e. 15 and AML. for AML.CS0015
+    prefix = 'AML.'
+    highest_number = -1
+    for case_study_id in sorted([filepath.stem for filepath in CASE_STUDY_DIR.glob('*.yaml')]) + list(used_ids):
+        match = REGEX_CS_ID_NUM.fullmatch(case_study_id)
+        if match and int(match.group(1)) > highest_number:
+            highest_number = int(match.group(1))
+            prefix = case_study_id[:match.start(1) - len('CS')]
 
-    Ex. {{anchor.id}}
-    """
-    if match:
-        atlas_id = match.group()
-        if atlas_id in id2anchor:
-            return '{{' + id2anchor[atlas_id] + '.id}}'
-        # Return ID as is if not found in id2anchor
-        return atlas_id
+    # Padded by zeros, i.e. AML.CS0016
+    return [f'{prefix}CS{number:04d}' for number in range(highest_number + 1, highest_number + 1 + count)]
 
-    return None
+def templatize_case_study(case_study, id2anchor):
+    """Returns the website case study with ATLAS IDs and internal links replaced by anchor template expressions."""
+    return CaseStudyTemplatizer(id2anchor).templatize(case_study)
 
-def replace_link(id2anchor, match):
-    """Returns a string Jinja expression that creates an internal Markdown link for tactics and techniques.
+class CaseStudyTemplatizer:
+    """Replaces ATLAS IDs and internal links in website case studies with anchor template expressions.
 
-    Ex. [{{anchor.name}}](/techniques/{{anchor.id}})
+    Each string in a case study is rewritten in a single scan, using template expressions precomputed per ID.
     """
-    if match:
-        # Unwrap matches
-        full_link = match.group(0)
-        title = match.group(1)
-        atlas_id = match.group(2)
-        # Get anchor variable name
-        anchor = id2anchor[atlas_id]
 
-        # Replace values with template expressions {{ anchor.xyz }}
+    def __init__(self, id2anchor):
+        # ATLAS ID to the expressions for the ID and name of its anchor, i.e. {{anchor.id}} and {{anchor.name}}
         # Note that double brackets evaluate to one bracket
-        full_link = full_link.replace(title, f'{{{{{anchor}.name}}}}')
-        full_link = full_link.replace(atlas_id, f'{{{{{anchor}.id}}}}')
+        self.id_expressions = {atlas_id: f'{{{{{anchor}.id}}}}' for atlas_id, anchor in id2anchor.items()}
+        self.name_expressions = {atlas_id: f'{{{{{anchor}.name}}}}' for atlas_id, anchor in id2anchor.items()}
+
+    def templatize(self, case_study):
+        """Returns a copy of the case study with IDs and links replaced in all of its strings."""
+        case_study = self.templatize_value(case_study)
+
+        # Strip newlines on summary
+        case_study['summary'] = case_study['summary'].strip()
+        # Strip newlines on procedure descriptions
+        for step in case_study['procedure']:
+            step['description'] = step['description'].strip()
+
+        return case_study
+
+    def templatize_value(self, value):
+        """Returns the value with IDs and links replaced in its strings, and datetimes trimmed to dates."""
+        if isinstance(value, str):
+            return REGEX_TEMPLATE_TOKEN.sub(self.replace_token, value)
+        if isinstance(value, dict):
+            return {key: self.templatize_value(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.templatize_value(item) for item in value]
+        if isinstance(value, datetime):
+            # Incident dates may be in full ISO 8601 format, i.e. 2021-11-01T00:00:00.000Z
+            return value.date()
+        return value
+
+    def replace_token(self, match):
+        """Returns the template expression replacing a matched internal link or ID."""
+        if match.group('link') is not None:
+            return self.replace_link(match)
+        # Return ID as is if it has no anchor
+        atlas_id = match.group('id')
+        return self.id_expressions.get(atlas_id, atlas_id)
+
+    def replace_link(self, match):
+        """Returns a string Jinja expression that creates an internal Markdown link for tactics and techniques.
+
+        Ex. [{{anchor.name}}](/techniques/{{anchor.id}})
+        """
+        # Unwrap matches, with the groups of REGEX_INTERNAL_LINK following the link group
+        full_link = match.group('link')
+        title_group = match.re.groupindex['link'] + 1
+        title = match.group(title_group)
+        atlas_id = match.group(title_group + 1)
+
+        if atlas_id not in self.id_expressions:
+            # Links to other pages are kept, with any IDs in them replaced
+            return REGEX_ID.sub(lambda id_match: self.id_expressions.get(id_match.group(), id_match.group()), full_link)
+
+        # Replace values with template expressions {{ anchor.xyz }}
+        full_link = full_link.replace(title, self.name_expressions[atlas_id])
+        full_link = full_link.replace(atlas_id, self.id_expressions[atlas_id])
 
         return full_link
 
-    return m.group(0)
+def website_case_studies(data):
+    """Returns the case studies in ATLAS data as they would be downloaded from the ATLAS website, the input of this import."""
+    studies = []
+    for case_study in data.get('case-studies', []):
+        study = {key: value for key, value in case_study.items() if key not in ('id', 'object-type')}
+        # Website files hold full timestamps
+        incident_date = study['incident-date']
+        study['incident-date'] = datetime(incident_date.year, incident_date.month, incident_date.day, tzinfo=timezone.utc)
+        studies.append(study)
+    return studies
 
 def str_presenter(dumper, data):
     """Configures yaml for dumping multiline strings
@@ -0,0 +1,128 @@
+"""
+Determines the maturity of techniques from the case studies that use them.
+
+Maturity is the level of evidence behind a technique's use, from lowest to highest:
+    feasible - the technique has not shown up in any case studies, although it is known to exist
+    demonstrated - used in at least one case study of case-study-type "exercise"
+    realized - used in at least one case study of case-study-type "incident"
+
+Evidence for a subtechnique is also evidence for its parent technique, at any depth.
+
+Example:
+    engine = MaturityEngine(technique for matrix in data['matrices'] for technique in matrix['techniques'])
+    assessment = engine.assess(data['case-studies'])
+    assessment.level('AML.T0043')     # 'realized'
+    assessment.evidence('AML.T0043')  # IDs of the case studies justifying that level
+"""
+
+# Maturity levels, from lowest to highest
+MATURITY_LEVELS = ('feasible', 'demonstrated', 'realized')
+# Level given to techniques without evidence
+DEFAULT_MATURITY = MATURITY_LEVELS[0]
+# Level of evidence provided by each type of case study, case studies of other types provide none
+CASE_STUDY_TYPE_MATURITY = {
+    'exercise': 'demonstrated',
+    'incident': 'realized'
+}
+
+class MaturityEngine:
+    """Holds the technique hierarchy, across all matrices, for repeated maturity assessments.
+
+    Raises a ValueError if the subtechnique-of links of the techniques form a cycle.
+    """
+
+    def __init__(self, techniques):
+        # Technique ID to parent technique ID, for subtechniques
+        self.parents = {}
+        # Technique IDs ordered so that each subtechnique comes before its parent technique
+        self.order = []
+
+        # Technique IDs in data order, as an ordered set since techniques repeated across matrices are the same technique
+        technique_ids = {}
+        for technique in techniques:
+            technique_id = technique['id']
+            if technique_id in technique_ids:
+                continue
+            technique_ids[technique_id] = None
+            if 'subtechnique-of' in technique:
+                self.parents[technique_id] = technique['subtechnique-of']
+
+        self.order = self._order_children_first(technique_ids)
+
+    def _order_children_first(self, technique_ids):
+        """Returns the technique IDs in an order where each technique comes after all of its descendants."""
+        children = {}
+        for child_id, parent_id in self.parents.items():
+            children.setdefault(parent_id, []).append(child_id)
+
+        order = []
+        # Techniques that have been added to the order, or whose descendants are being added
+        visited = set()
+        for technique_id in technique_ids:
+            if technique_id in visited:
+                continue
+            # Iterative post-order traversal, as hierarchies may be arbitrarily deep
+            stack = [(technique_id, iter(children.get(technique_id, [])))]
+            visited.add(technique_id)
+            path = {technique_id}
+            while stack:
+                current_id, remaining_children = stack[-1]
+                child_id = next(remaining_children, None)
+                if child_id is None:
+                    stack.pop()
+                    path.discard(current_id)
+                    order.append(current_id)
+                elif child_id in path:
+                    raise ValueError(f'Technique {child_id} is a subtechnique of itself via subtechnique-of')
+                elif child_id not in visited:
+                    visited.add(child_id)
+                    path.add(child_id)
+                    stack.append((child_id, iter(children.get(child_id, []))))
+
+        return order
+
+    def assess(self, case_studies):
+        """Returns the MaturityAssessment of the techniques given the case studies."""
+        # Technique ID to level to case study IDs providing evidence at that level, in data order without duplicates
+        evidence = {}
+        for case_study in case_studies:
+            level = CASE_STUDY_TYPE_MATURITY.get(case_study.get('case-study-type'))
+            if level is None:
+                continue
+            for step in case_study['procedure']:
+                evidence.setdefault(step['technique'], {}).setdefault(level, {})[case_study['id']] = None
+
+        # Subtechniques precede their parents, so each technique has its descendants' evidence when passed up
+        for technique_id in self.order:
+            parent_id = self.parents.get(technique_id)
+            if parent_id is None or technique_id not in evidence:
+                continue
+            parent_evidence = evidence.setdefault(parent_id, {})
+            for level, case_study_ids in evidence[technique_id].items():
+                parent_evidence.setdefault(level, {}).update(case_study_ids)
+
+        return MaturityAssessment(evidence)
+
+class MaturityAssessment:
+    """The maturity level of each technique and the case studies justifying it."""
+
+    def __init__(self, evidence):
+        # Technique ID to (level, IDs of the case studies providing evidence at that level)
+        self._levels = {}
+        for technique_id, level_evidence in evidence.items():
+            # Highest level with evidence
+            for level in reversed(MATURITY_LEVELS):
+                if level in level_evidence:
+                    self._levels[technique_id] = (level, list(level_evidence[level]))
+                    break
+
+    def level(self, technique_id):
+        """Returns the maturity level of the technique."""
+        return self._levels.get(technique_id, (DEFAULT_MATURITY, []))[0]
+
+    def evidence(self, technique_id):
+        """Returns the IDs of the case studies providing evidence for the technique's maturity level.
+
+        These use the technique or any of its subtechniques. Techniques at the default level have none.
+        """
+        return list(self._levels.get(technique_id, (DEFAULT_MATURITY, []))[1])
@@ -0,0 +1,68 @@
+from datetime import date, datetime
+import json
+
+import yaml
+
+try:
+    import msgpack
+except ImportError:
+    # Optional dependency, only needed for MessagePack output
+    msgpack = None
+
+from tools.sqlite_export import write_sqlite
+
+"""
+Writes ATLAS data to files in each of the supported output formats.
+
+Each writer streams the data to an open file rather than building the full document in memory first.
+Dates are written as ISO 8601 strings, i.e. 2021-01-01, in the JSON, MessagePack, and SQLite formats.
+The SQLite database is built in a temporary file first, see tools/sqlite_export.py for its tables.
+"""
+
+def serialize_date(obj):
+    """Returns the ISO 8601 string representation of dates and datetimes, for formats without a date type."""
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not serializable')
+
+def write_yaml(data, f):
+    """Writes the data as a YAML document to the text stream."""
+    # Note that the pure Python dumper is used, as the LibYAML emitter wraps long quoted strings differently
+    yaml.dump(data, f, default_flow_style=False, explicit_start=True, sort_keys=False)
+
+def write_json(data, f):
+    """Writes the data as compact JSON to the text stream."""
+    encoder = json.JSONEncoder(default=serialize_date, separators=(',', ':'))
+    for chunk in encoder.iterencode(data):
+        f.write(chunk)
+
+def write_msgpack(data, f):
+    """Writes the data as MessagePack to the binary stream."""
+    if msgpack is None:
+        raise ImportError('MessagePack output requires the msgpack package - install with pip install msgpack')
+
+    packer = msgpack.Packer(default=serialize_date)
+
+    def pack(obj):
+        # Containers are written as a header followed by their items
+        if isinstance(obj, dict):
+            f.write(packer.pack_map_header(len(obj)))
+            for key, value in obj.items():
+                pack(key)
+                pack(value)
+        elif isinstance(obj, (list, tuple)):
+            f.write(packer.pack_array_header(len(obj)))
+            for value in obj:
+                pack(value)
+        else:
+            f.write(packer.pack(obj))
+
+    pack(data)
+
+# Output format name to file extension, file mode, and writer function
+OUTPUT_FORMATS = {
+    'yaml': ('.yaml', 'w', write_yaml),
+    'json': ('.json', 'w', write_json),
+    'msgpack': ('.msgpack', 'wb', write_msgpack),
+    'sqlite': ('.sqlite', 'wb', write_sqlite)
+}
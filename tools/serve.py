@@ -0,0 +1,298 @@
+from argparse import ArgumentParser
+import gzip
+import hashlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from tools.atlas_index import AtlasIndex
+from tools.canonical import HASH_ALGORITHM, canonical_json
+from tools.create_matrix import object_types
+from tools.diff_atlas import load_atlas_file
+from tools.file_watcher import FileWatcher
+
+"""
+Serves ATLAS data over a local, read-only HTTP API.
+
+Endpoints:
+    /                                   ID, name, and version of the data, and the object counts
+    /tactics, /techniques, /mitigations, /case-studies
+                                        lists of objects, filtered by query parameters:
+                                            tactics: matrix
+                                            techniques: matrix, tactic (of the parent for subtechniques), parent (subtechniques of), maturity
+                                            mitigations: matrix, technique
+                                            case-studies: technique
+    /tactics/<id>, /techniques/<id>, /mitigations/<id>, /case-studies/<id>
+                                        a single object
+
+Other query parameters, including any on / and on single objects, are rejected with a 400 error,
+listing the parameters the endpoint accepts.
+
+Data is loaded and indexed once, and each object is serialized to JSON once, so requests only join
+pre-serialized bytes. Responses have strong ETags, the content hash of the JSON, for conditional requests
+with If-None-Match, and are compressed with gzip for clients that accept it.
+
+The data file is reloaded when it changes. Requests in progress complete with the data they started with.
+
+Run this script with `python -m tools.serve` to allow for local imports.
+"""
+
+# Responses smaller than this number of bytes are not compressed, as compression would not reduce their size
+GZIP_MIN_SIZE = 1024
+
+# Object type to the endpoint of its objects, i.e. case-studies for case-study
+OBJECT_TYPE_ENDPOINTS = {object_type: object_types.plural(object_type) for object_type in ('tactic', 'technique', 'mitigation', 'case-study')}
+
+# Endpoint to the query parameters its lists can be filtered by, as described above
+ENDPOINT_PARAMETERS = {
+    'tactics': ['matrix'],
+    'techniques': ['matrix', 'tactic', 'parent', 'maturity'],
+    'mitigations': ['matrix', 'technique'],
+    'case-studies': ['technique']
+}
+
+class UnsupportedParameterError(ValueError):
+    """Raised for query parameters that a path cannot be filtered by, with the parameters it accepts, if any."""
+
+    def __init__(self, path, names, parameters):
+        self.parameters = parameters
+        super().__init__(f'Unsupported query parameter(s) for {path}: {", ".join(names)}')
+
+class Response:
+    """JSON response body with its ETag, and its gzip-compressed body, computed on first use."""
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = f'"{hashlib.new(HASH_ALGORITHM, body).hexdigest()}"'
+        # The compressed body is a different representation, so has its own strong ETag
+        self.gzip_etag = f'"{self.etag[1:-1]}-gzip"'
+        self._gzip_body = None
+
+    @property
+    def gzip_body(self):
+        # Compressing twice in concurrent requests gives the same result, so no lock is needed
+        if self._gzip_body is None:
+            self._gzip_body = gzip.compress(self.body, mtime=0)
+        return self._gzip_body
+
+    def matches(self, if_none_match, use_gzip):
+        """Returns True if the If-None-Match header lists the ETag of the representation being sent, compressed or not."""
+        etags = {etag.strip() for etag in if_none_match.split(',')}
+        return '*' in etags or (self.gzip_etag if use_gzip else self.etag) in etags
+
+def accepts_gzip(accept_encoding):
+    """Returns True if the Accept-Encoding header value accepts gzip, by name or by *, with a quality value above 0."""
+    # Coding name to its quality value, i.e. {'gzip': 0.0} for "gzip;q=0"
+    qualities = {}
+    for entry in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in entry.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+class AtlasApi:
+    """Pre-serialized API responses for one version of ATLAS data, as returned by tools.create_matrix.load_atlas_data."""
+
+    def __init__(self, data):
+        self.index = AtlasIndex(data)
+
+        # Endpoint to the IDs of its objects, in data order
+        self.endpoint_ids = {endpoint: [] for endpoint in OBJECT_TYPE_ENDPOINTS.values()}
+        # Object ID to its JSON
+        self.object_json = {}
+        for obj_id, obj in self.index.objects.items():
+            endpoint = OBJECT_TYPE_ENDPOINTS.get(obj.get('object-type'))
+            if endpoint is not None:
+                self.endpoint_ids[endpoint].append(obj_id)
+                self.object_json[obj_id] = canonical_json(obj).encode('utf-8')
+
+        # Path to the responses that do not depend on query parameters
+        self.responses = {
+            '/': Response(canonical_json({
+                'id': data.get('id'),
+                'name': data.get('name'),
+                'version': data.get('version'),
+                'counts': {endpoint: len(ids) for endpoint, ids in self.endpoint_ids.items()}
+            }).encode('utf-8'))
+        }
+        for endpoint, ids in self.endpoint_ids.items():
+            self.responses[f'/{endpoint}'] = self.list_response(ids)
+            for obj_id in ids:
+                self.responses[f'/{endpoint}/{obj_id}'] = Response(self.object_json[obj_id])
+
+    def list_response(self, ids):
+        """Returns the response for a JSON array of the objects with the IDs."""
+        return Response(b'[' + b','.join(self.object_json[obj_id] for obj_id in ids) + b']')
+
+    def get(self, path, query):
+        """Returns the response for the path and dictionary of query parameters to lists of values, or None if not found.
+
+        Raises an UnsupportedParameterError for query parameters the endpoint does not accept.
+        """
+        path = path.rstrip('/') or '/'
+        endpoint = path.strip('/')
+        if query and endpoint in self.endpoint_ids:
+            return self.list_response(self.filter_ids(endpoint, query))
+        if query and path in self.responses:
+            # Only lists can be filtered
+            raise UnsupportedParameterError(path, list(query), [])
+        return self.responses.get(path)
+
+    def filter_ids(self, endpoint, query):
+        """Returns the IDs of the endpoint's objects that match every query parameter, in data order.
+
+        Raises an UnsupportedParameterError if any parameter is not one of the endpoint's ENDPOINT_PARAMETERS.
+        """
+        unsupported = [name for name in query if name not in ENDPOINT_PARAMETERS[endpoint]]
+        if unsupported:
+            raise UnsupportedParameterError(f'/{endpoint}', unsupported, ENDPOINT_PARAMETERS[endpoint])
+
+        ids = self.endpoint_ids[endpoint]
+        for name, values in query.items():
+            # Repeated parameters match any of their values
+            values = set(values)
+            if name == 'matrix':
+                ids = [i for i in ids if values.intersection(self.index.object_matrix_ids.get(i, []))]
+            elif name == 'tactic':
+                ids = [i for i in ids if values.intersection(self.technique_tactics(i))]
+            elif name == 'parent':
+                ids = [i for i in ids if self.index.get(i).get('subtechnique-of') in values]
+            elif name == 'maturity':
+                ids = [i for i in ids if self.index.get(i).get('maturity') in values]
+            elif name == 'technique':
+                related = self.index.mitigations_for_technique if endpoint == 'mitigations' else self.index.case_studies_for_technique
+                matching_ids = {obj['id'] for technique_id in values for obj in related(technique_id)}
+                ids = [i for i in ids if i in matching_ids]
+        return ids
+
+    def technique_tactics(self, technique_id):
+        """Returns the tactics of the technique, which for a subtechnique are those of its parent technique."""
+        technique = self.index.parent_technique(technique_id) or self.index.get(technique_id)
+        return technique.get('tactics', [])
+
+class AtlasServer(ThreadingHTTPServer):
+    """HTTP server handling each request in its own thread, with the current AtlasApi as the api attribute."""
+
+    daemon_threads = True
+
+    def __init__(self, address, api):
+        super().__init__(address, AtlasRequestHandler)
+        self.api = api
+
+class AtlasRequestHandler(BaseHTTPRequestHandler):
+    """Handles GET and HEAD requests for the API of the server."""
+
+    def do_GET(self):
+        self.send_api_response(include_body=True)
+
+    def do_HEAD(self):
+        self.send_api_response(include_body=False)
+
+    def send_api_response(self, include_body):
+        # The API is read once, so that a reload during the request does not affect it
+        api = self.server.api
+
+        url = urlsplit(self.path)
+        try:
+            response = api.get(unquote(url.path), parse_qs(url.query))
+        except UnsupportedParameterError as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(e), parameters=e.parameters)
+            return
+        if response is None:
+            self.send_error(HTTPStatus.NOT_FOUND, f'No ATLAS data at {url.path}')
+            return
+
+        use_gzip = len(response.body) >= GZIP_MIN_SIZE and accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        etag = response.gzip_etag if use_gzip else response.etag
+
+        # Strong ETags differ per encoding, so only the ETag of the chosen encoding can match
+        if response.matches(self.headers.get('If-None-Match', ''), use_gzip):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        body = response.gzip_body if use_gzip else response.body
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def send_error(self, code, message=None, explain=None, **details):
+        # JSON error bodies, rather than the default HTML, with any details as additional fields
+        body = json.dumps({'error': message or HTTPStatus(code).phrase, **details}).encode('utf-8')
+        self.send_response(code, message)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+def watch_data_file(server, filepath, watcher, stop_event):
+    """Replaces the API of the server with one for the new data each time the watcher reports a change, until the event is set.
+
+    Data that fails to load is reported, and the previous API kept.
+    """
+    with watcher:
+        while not stop_event.is_set():
+            # Timeouts allow the stop event to be checked
+            if not watcher.wait(timeout=0.5):
+                continue
+            try:
+                server.api = AtlasApi(load_atlas_file(filepath))
+            except Exception as e:
+                print(f'Could not reload {filepath}, serving previous data: {e}')
+                continue
+            print(f'Reloaded {filepath}')
+
+def start_reloader(server, filepath, **watcher_options):
+    """Starts reloading the server's data when the file changes in a background thread, returning the event that stops it."""
+    # Watching starts before returning, so that no change made afterwards is missed
+    watcher = FileWatcher([filepath], **watcher_options)
+    stop_event = threading.Event()
+    threading.Thread(target=watch_data_file, args=(server, filepath, watcher, stop_event), daemon=True).start()
+    return stop_event
+
+def main():
+    parser = ArgumentParser('Serves ATLAS data over a local, read-only HTTP API.')
+    parser.add_argument("--data", type=str, default="dist/ATLAS.yaml", help="Path to ATLAS.yaml or ATLAS.json, defaults to dist/ATLAS.yaml")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on, defaults to 127.0.0.1")
+    parser.add_argument("--port", "-p", type=int, default=8000, help="Port to listen on, defaults to 8000")
+    parser.add_argument("--no-reload", action="store_true", help="Do not reload the data when the file changes")
+    args = parser.parse_args()
+
+    server = AtlasServer((args.host, args.port), AtlasApi(load_atlas_file(args.data)))
+    if not args.no_reload:
+        start_reloader(server, args.data)
+
+    print(f'Serving {args.data} at http://{args.host}:{server.server_port}/, press Ctrl+C to stop')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+from datetime import date, datetime
+import json
+from pathlib import Path
+import shutil
+import sqlite3
+import tempfile
+
+"""
+Writes ATLAS data, as returned by tools.create_matrix.load_atlas_data, to a SQLite database.
+
+Tables:
+    matrices - id, name
+    tactics, techniques, mitigations - one row per object, with the ID of the matrix that defines it
+        and of the parent technique and maturity for techniques
+    technique_tactics - technique to tactic links
+    mitigation_techniques - mitigation to technique links, with how the mitigation applies
+    case_studies - one row per case study
+    procedure_steps - the steps of each case study, numbered from 0
+    citations - the references cited by each object, with their titles and URLs, numbered from 0
+    object_references - each reference from an object to another object by ID, with the field it is in:
+        tactics and subtechnique-of of techniques, techniques of mitigations, and procedure of case studies
+    search - FTS5 full-text index over the names, descriptions, and summaries of objects,
+        only created if the SQLite library supports FTS5
+
+Objects repeated across matrices are stored once, as first defined. Dates are stored as ISO 8601 strings,
+and lists of strings, such as mitigation categories, as JSON arrays. Foreign key columns are indexed.
+
+Example:
+    SELECT t.id, t.name FROM techniques t
+    JOIN mitigation_techniques mt ON mt.technique_id = t.id
+    WHERE mt.mitigation_id = 'AML.M0000';
+
+    SELECT object_id, field FROM object_references WHERE referenced_id = 'AML.T0000';
+
+    SELECT id, object_type, name FROM search WHERE search MATCH 'prompt injection' ORDER BY rank;
+"""
+
+SCHEMA = """
+CREATE TABLE matrices (
+    id TEXT PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE tactics (
+    id TEXT PRIMARY KEY,
+    matrix_id TEXT REFERENCES matrices (id),
+    name TEXT,
+    description TEXT,
+    attack_id TEXT,
+    attack_url TEXT,
+    created_date TEXT,
+    modified_date TEXT
+);
+CREATE TABLE techniques (
+    id TEXT PRIMARY KEY,
+    matrix_id TEXT REFERENCES matrices (id),
+    parent_id TEXT REFERENCES techniques (id),
+    name TEXT,
+    description TEXT,
+    maturity TEXT,
+    attack_id TEXT,
+    attack_url TEXT,
+    created_date TEXT,
+    modified_date TEXT
+);
+CREATE TABLE technique_tactics (
+    technique_id TEXT REFERENCES techniques (id),
+    tactic_id TEXT REFERENCES tactics (id),
+    PRIMARY KEY (technique_id, tactic_id)
+);
+CREATE TABLE mitigations (
+    id TEXT PRIMARY KEY,
+    matrix_id TEXT REFERENCES matrices (id),
+    name TEXT,
+    description TEXT,
+    categories TEXT,
+    ml_lifecycle TEXT,
+    attack_id TEXT,
+    attack_url TEXT,
+    created_date TEXT,
+    modified_date TEXT
+);
+CREATE TABLE mitigation_techniques (
+    mitigation_id TEXT REFERENCES mitigations (id),
+    technique_id TEXT REFERENCES techniques (id),
+    use TEXT,
+    PRIMARY KEY (mitigation_id, technique_id)
+);
+CREATE TABLE case_studies (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    summary TEXT,
+    incident_date TEXT,
+    incident_date_granularity TEXT,
+    case_study_type TEXT,
+    reporter TEXT,
+    target TEXT,
+    actor TEXT
+);
+CREATE TABLE procedure_steps (
+    case_study_id TEXT REFERENCES case_studies (id),
+    step INTEGER,
+    tactic_id TEXT REFERENCES tactics (id),
+    technique_id TEXT REFERENCES techniques (id),
+    description TEXT,
+    PRIMARY KEY (case_study_id, step)
+);
+CREATE TABLE citations (
+    object_id TEXT,
+    position INTEGER,
+    title TEXT,
+    url TEXT,
+    PRIMARY KEY (object_id, position)
+);
+CREATE TABLE object_references (
+    object_id TEXT,
+    field TEXT,
+    referenced_id TEXT,
+    PRIMARY KEY (object_id, field, referenced_id)
+);
+"""
+
+# Created after the rows are inserted, which is faster than updating them on each insert
+# Foreign keys leading a primary key, i.e. procedure_steps.case_study_id, already use its index
+INDEXES = """
+CREATE INDEX tactics_matrix_id ON tactics (matrix_id);
+CREATE INDEX techniques_matrix_id ON techniques (matrix_id);
+CREATE INDEX techniques_parent_id ON techniques (parent_id);
+CREATE INDEX technique_tactics_tactic_id ON technique_tactics (tactic_id);
+CREATE INDEX mitigations_matrix_id ON mitigations (matrix_id);
+CREATE INDEX mitigation_techniques_technique_id ON mitigation_techniques (technique_id);
+CREATE INDEX procedure_steps_tactic_id ON procedure_steps (tactic_id);
+CREATE INDEX procedure_steps_technique_id ON procedure_steps (technique_id);
+CREATE INDEX object_references_referenced_id ON object_references (referenced_id);
+"""
+
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE search USING fts5 (id UNINDEXED, object_type UNINDEXED, name, text);
+"""
+
+def has_fts5(connection):
+    """Returns True if the SQLite library supports FTS5 full-text search."""
+    try:
+        connection.execute('CREATE VIRTUAL TABLE temp.fts5_check USING fts5 (text)')
+    except sqlite3.OperationalError:
+        return False
+    connection.execute('DROP TABLE temp.fts5_check')
+    return True
+
+def sql_value(value):
+    """Returns the value as stored in the database, with dates as ISO 8601 strings and lists as JSON arrays."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return json.dumps(value)
+    return value
+
+def export_sqlite(data, filepath):
+    """Writes the data to a new SQLite database at the filepath, replacing any existing file."""
+    filepath = Path(filepath)
+    if filepath.exists():
+        filepath.unlink()
+
+    # Transactions are managed explicitly, so that all tables, rows, and indexes are written in one
+    connection = sqlite3.connect(str(filepath), isolation_level=None)
+    try:
+        # The database is written in one go, so it is not journaled
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        search = has_fts5(connection)
+
+        connection.execute('BEGIN')
+        execute_statements(connection, SCHEMA)
+        for table, table_rows in database_rows(data).items():
+            if not table_rows:
+                continue
+            placeholders = ', '.join('?' * len(table_rows[0]))
+            # Objects and links repeated across matrices are stored once
+            connection.executemany(f'INSERT OR IGNORE INTO {table} VALUES ({placeholders})', table_rows)
+        execute_statements(connection, INDEXES)
+
+        if search:
+            execute_statements(connection, SEARCH_SCHEMA)
+            connection.executemany('INSERT INTO search VALUES (?, ?, ?, ?)', search_rows(data))
+        connection.execute('COMMIT')
+    finally:
+        connection.close()
+
+def execute_statements(connection, script):
+    """Executes each statement of the SQL script in the current transaction."""
+    # Note that executescript would commit the transaction first
+    for statement in script.split(';'):
+        if statement.strip():
+            connection.execute(statement)
+
+def database_rows(data):
+    """Returns the table name to the rows to insert for the data, in data order."""
+    rows = {
+        'matrices': [],
+        'tactics': [],
+        'techniques': [],
+        'technique_tactics': [],
+        'mitigations': [],
+        'mitigation_techniques': [],
+        'case_studies': [],
+        'procedure_steps': [],
+        'citations': [],
+        'object_references': []
+    }
+
+    def add_citations(obj):
+        for position, reference in enumerate(obj.get('references', [])):
+            rows['citations'].append((obj['id'], position, reference.get('title'), reference.get('url')))
+
+    def add_references(obj, field, referenced_ids):
+        # References repeated in a field, i.e. by several procedure steps, are stored once
+        for referenced_id in referenced_ids:
+            if referenced_id is not None:
+                rows['object_references'].append((obj['id'], field, referenced_id))
+
+    for matrix in data.get('matrices', []):
+        matrix_id = matrix['id']
+        rows['matrices'].append((matrix_id, matrix.get('name')))
+
+        for tactic in matrix.get('tactics', []):
+            attack_reference = tactic.get('ATT&CK-reference', {})
+            rows['tactics'].append((
+                tactic['id'], matrix_id, tactic.get('name'), tactic.get('description'),
+                attack_reference.get('id'), attack_reference.get('url'),
+                sql_value(tactic.get('created_date')), sql_value(tactic.get('modified_date'))
+            ))
+            add_citations(tactic)
+
+        for technique in matrix.get('techniques', []):
+            attack_reference = technique.get('ATT&CK-reference', {})
+            rows['techniques'].append((
+                technique['id'], matrix_id, technique.get('subtechnique-of'), technique.get('name'), technique.get('description'),
+                technique.get('maturity'), attack_reference.get('id'), attack_reference.get('url'),
+                sql_value(technique.get('created_date')), sql_value(technique.get('modified_date'))
+            ))
+            for tactic_id in technique.get('tactics', []):
+                rows['technique_tactics'].append((technique['id'], tactic_id))
+            add_references(technique, 'tactics', technique.get('tactics', []))
+            if 'subtechnique-of' in technique:
+                add_references(technique, 'subtechnique-of', [technique['subtechnique-of']])
+            add_citations(technique)
+
+        for mitigation in matrix.get('mitigations', []):
+            attack_reference = mitigation.get('ATT&CK-reference', {})
+            rows['mitigations'].append((
+                mitigation['id'], matrix_id, mitigation.get('name'), mitigation.get('description'),
+                sql_value(mitigation.get('category')), sql_value(mitigation.get('ml-lifecycle')),
+                attack_reference.get('id'), attack_reference.get('url'),
+                sql_value(mitigation.get('created_date')), sql_value(mitigation.get('modified_date'))
+            ))
+            for entry in mitigation.get('techniques', []):
+                # Entries are either technique IDs or {id, use} dictionaries
+                technique_id, use = (entry['id'], entry.get('use')) if isinstance(entry, dict) else (entry, None)
+                rows['mitigation_techniques'].append((mitigation['id'], technique_id, use))
+                add_references(mitigation, 'techniques', [technique_id])
+            add_citations(mitigation)
+
+    for case_study in data.get('case-studies', []):
+        rows['case_studies'].append((
+            case_study['id'], case_study.get('name'), case_study.get('summary'),
+            sql_value(case_study.get('incident-date')), case_study.get('incident-date-granularity'),
+            case_study.get('case-study-type'), case_study.get('reporter'), case_study.get('target'), case_study.get('actor')
+        ))
+        for step, procedure in enumerate(case_study.get('procedure', [])):
+            rows['procedure_steps'].append((
+                case_study['id'], step, procedure.get('tactic'), procedure.get('technique'), procedure.get('description')
+            ))
+            add_references(case_study, 'procedure', [procedure.get('tactic'), procedure.get('technique')])
+        add_citations(case_study)
+
+    return rows
+
+def search_rows(data):
+    """Yields the ID, object type, name, and description or summary of each object, once per ID."""
+    seen_ids = set()
+    objects = [obj for matrix in data.get('matrices', []) for key in ('tactics', 'techniques', 'mitigations') for obj in matrix.get(key, [])]
+    objects.extend(data.get('case-studies', []))
+    for obj in objects:
+        if obj['id'] in seen_ids:
+            continue
+        seen_ids.add(obj['id'])
+        yield (obj['id'], obj.get('object-type'), obj.get('name'), obj.get('description', obj.get('summary')))
+
+def write_sqlite(data, f):
+    """Writes the data as a SQLite database file to the binary stream."""
+    # SQLite writes to files, so the database is built in a temporary file and then copied
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database_filepath = Path(temp_dir) / 'atlas.sqlite'
+        export_sqlite(data, database_filepath)
+        with open(database_filepath, 'rb') as database_file:
+            shutil.copyfileobj(database_file, f)
@@ -0,0 +1,183 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+import json
+from pathlib import Path
+import re
+import sys
+
+from dateutil.parser import isoparse
+import yaml
+
+from tools.create_matrix import FastSafeLoader
+from tools.import_case_study_file import case_study_version_error
+
+# Local directory
+from schemas.compiled import validate_case_study_file, validate_contribution
+
+"""
+Validates website contribution payloads and case study files in bulk.
+
+Contribution payloads, with a submissions list, are validated against schemas.website_submission.contributions_schema,
+and case study files, with a study key, against website_case_study_wrapper_schema and the current case study
+schema version, as checked by tools/import_case_study_file.py. Every file is validated, rather than stopping
+at the first invalid one, and the errors are reported per file and per submission.
+
+Report:
+    {
+        "files": <number of files>, "valid": <number of valid files>, "invalid": <number of invalid files>,
+        "results": [
+            {
+                "path": <filepath>, "kind": "contribution" | "case-study" | null, "valid": <bool>,
+                "errors": [<errors of the file, outside of submissions>],
+                "submissions": [{"index": <index>, "object-type": <object-type or null>, "valid": <bool>, "errors": [...]}]
+            }
+        ]
+    }
+
+Run this script with `python -m tools.validate_contributions <directory or file> ...` to allow for local imports.
+"""
+
+# Extensions of the files validated in directories
+CONTRIBUTION_FILE_EXTENSIONS = ('.yaml', '.yml', '.json')
+
+# Path of an error within a payload's submissions, with the submission index and the rest of the path as groups
+REGEX_SUBMISSION_ERROR = re.compile(r'^submissions\[(\d+)\](?:\.|: )?(.*)$', re.DOTALL)
+
+def main():
+    parser = ArgumentParser('Validates website contribution payloads and case study files, reporting the errors of each.')
+    parser.add_argument("paths", type=str, nargs="+", help="Contribution or case study files, or directories of them")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Number of processes used to validate the files")
+    parser.add_argument("--output", "-o", type=str, help="Path to write the JSON report to, instead of standard output")
+    args = parser.parse_args()
+
+    filepaths = find_contribution_files(args.paths)
+    report = validate_files(filepaths, jobs=args.jobs)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f'Validated {report["files"]} file(s), {report["invalid"]} invalid - wrote {args.output}')
+    else:
+        print(json.dumps(report, indent=4))
+
+    if report['invalid']:
+        sys.exit(1)
+
+def find_contribution_files(paths):
+    """Returns the filepaths, with directories replaced by the contribution files they contain, sorted by path."""
+    filepaths = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            filepaths.extend(sorted(p for p in path.rglob('*') if p.suffix in CONTRIBUTION_FILE_EXTENSIONS and p.is_file()))
+        else:
+            filepaths.append(path)
+    return filepaths
+
+def validate_files(filepaths, jobs=1):
+    """Returns the report of the files, as described above, validating them in a pool of processes when jobs is greater than 1."""
+    if jobs <= 1 or len(filepaths) <= 1:
+        results = [validate_file(filepath) for filepath in filepaths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # Batches of files per task limit the overhead of each task
+            chunksize = max(1, len(filepaths) // (jobs * 4))
+            results = list(executor.map(validate_file, filepaths, chunksize=chunksize))
+
+    invalid = sum(1 for result in results if not result['valid'])
+    return {
+        'files': len(results),
+        'valid': len(results) - invalid,
+        'invalid': invalid,
+        'results': results
+    }
+
+def validate_file(filepath):
+    """Returns the result of validating a contribution payload or case study file."""
+    result = {
+        'path': str(filepath),
+        'kind': None,
+        'valid': False,
+        'errors': [],
+        'submissions': []
+    }
+
+    try:
+        data = load_contribution_file(filepath)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        result['errors'].append(f'Could not read file: {e}')
+        return result
+
+    if isinstance(data, dict) and 'submissions' in data:
+        result['kind'] = 'contribution'
+        validate_payload(data, result)
+    elif isinstance(data, dict) and 'study' in data:
+        result['kind'] = 'case-study'
+        result['errors'].extend(validate_case_study_file(data))
+        version_error = case_study_version_error(data)
+        if version_error:
+            result['errors'].append(version_error)
+    else:
+        result['errors'].append('Expected a contribution payload with submissions or a case study file with a study')
+
+    result['valid'] = not result['errors'] and all(submission['valid'] for submission in result['submissions'])
+    return result
+
+def validate_payload(payload, result):
+    """Adds the errors of a contribution payload to the result, under the submission they are about, if any."""
+    submissions = payload['submissions'] if isinstance(payload['submissions'], list) else []
+    submission_errors = [[] for _ in submissions]
+
+    for error in validate_contribution(payload):
+        match = REGEX_SUBMISSION_ERROR.match(error)
+        if match and int(match.group(1)) < len(submissions):
+            submission_errors[int(match.group(1))].append(match.group(2))
+        else:
+            result['errors'].append(error)
+
+    for index, submission in enumerate(submissions):
+        errors = submission_errors[index]
+        object_type = None
+        if isinstance(submission, dict):
+            object_type = submission.get('object-type')
+            if 'study' in submission:
+                object_type = object_type or 'case-study'
+                # Case study submissions are held to the same schema version as case study files
+                version_error = case_study_version_error(submission)
+                if version_error:
+                    errors.append(version_error)
+        result['submissions'].append({
+            'index': index,
+            'object-type': object_type,
+            'valid': not errors,
+            'errors': errors
+        })
+
+def load_contribution_file(filepath):
+    """Returns the data in a YAML or JSON contribution file."""
+    with open(filepath) as f:
+        if Path(filepath).suffix == '.json':
+            return parse_incident_dates(json.load(f))
+        return yaml.load(f, Loader=FastSafeLoader)
+
+def parse_incident_dates(data):
+    """Returns the JSON data with the incident dates of its case studies, and of case study submissions, as dates.
+
+    JSON has no date type, so incident dates are ISO 8601 strings, where YAML loads them as dates.
+    Date-times, i.e. 2021-11-01T00:00:00.000Z, are trimmed to dates as on import. Other strings are left for the schema to report.
+    """
+    if not isinstance(data, dict):
+        return data
+    studies = [data.get('study')]
+    if isinstance(data.get('submissions'), list):
+        studies.extend(submission.get('study') for submission in data['submissions'] if isinstance(submission, dict))
+
+    for study in studies:
+        if isinstance(study, dict) and isinstance(study.get('incident-date'), str):
+            try:
+                study['incident-date'] = isoparse(study['incident-date']).date()
+            except ValueError:
+                continue
+    return data
+
+if __name__ == '__main__':
+    main()